@@ -3,15 +3,30 @@ ljb_spotify_request
 • Channel-point “song request” + !sr command
 • Supports YouTube + music.youtube links
 • Skips any Spotify track ID present in banned_songs.txt
-• Registers EventSub subscription synchronously (no 4003 close)
+• Redemptions arrive on bot.bus (the core owns the EventSub subscription)
+• !song / !queue and an OBS overlay (http://127.0.0.1:8766/) served from one
+  shared now-playing poller (nowplaying.py) – no per-command Spotify calls
+• free-text requests are answered from a local fuzzy index of every track
+  already resolved (track_index.py); Spotify /v1/search only on a miss
+• every request (user, query, source, resolved track, outcome, latency) is
+  logged to song_requests.db (request_log.py) – !history, !topsongs,
+  !songstats read it
 """
 
+from __future__ import annotations
 import os, json, asyncio, logging, re
 from pathlib import Path
-import yt_dlp, httpx
-from twitchAPI.object.eventsub import ChannelPointsCustomRewardRedemptionAddEvent
+from typing import TYPE_CHECKING
+import httpx
 import threading, socketserver, http.server, time
 from urllib.parse import urlparse, parse_qs, quote_plus
+from ljb import endpoints
+from .nowplaying import Poller, OverlayServer
+from .track_index import TrackIndex
+from .request_log import RequestLog
+
+if TYPE_CHECKING:
+    from ljb.events import Event
 
 ASCII_ART = r"""
  _     _  _      ____ _____  ____  _____  _  ____ __  __
@@ -32,8 +47,9 @@ scopes = ["channel:read:redemptions"]
 
 # ── helper readers ----------------------------------------------------------
 def _cfg(folder): return json.load(open(Path(folder)/"addon_config.json", encoding="utf-8"))
-def _tok(folder): return json.load(open(Path(folder)/"addon_tokens.json")) if (Path(folder)/"addon_tokens.json").exists() else {}
-def _save_tok(folder, d): json.dump(d, open(Path(folder)/"addon_tokens.json","w"), indent=2)
+# Spotify tokens live in the bot's state store: bot.store.addon(ADDON_NAME)
+def _tok(state): return state.get_dict("tokens")
+def _save_tok(state, d): state.update({"tokens": d})
 
 # ── track-ID extraction -----------------------------------------------------
 def _track_id(s: str) -> str:
@@ -55,8 +71,8 @@ def _load_banned(folder):
     return out
 
 # ── OAuth helpers -----------------------------------------------------------
-def _initial_oauth(folder):
-    if (Path(folder)/"addon_tokens.json").exists():
+def _initial_oauth(state):
+    if _tok(state):
         return
     box={}
     class H(http.server.BaseHTTPRequestHandler):
@@ -70,7 +86,7 @@ def _initial_oauth(folder):
         def log_message(self,*_): pass
     sv=socketserver.TCPServer(("localhost",8765),H)
     threading.Thread(target=sv.serve_forever,daemon=True).start()
-    url=("https://accounts.spotify.com/authorize"
+    url=(f"{endpoints.SPOTIFY_ACCOUNTS}/authorize"
          f"?response_type=code&client_id={CLIENT_ID}"
          f"&redirect_uri={quote_plus(REDIRECT_URI)}"
          f"&scope={quote_plus(SCOPES)}")
@@ -79,22 +95,22 @@ def _initial_oauth(folder):
     webbrowser.open(url)
     while "code" not in box: time.sleep(.1)
     sv.server_close()
-    r=httpx.post("https://accounts.spotify.com/api/token",data={
+    r=httpx.post(f"{endpoints.SPOTIFY_ACCOUNTS}/api/token",data={
         "grant_type":"authorization_code","code":box["code"],
         "redirect_uri":REDIRECT_URI,
         "client_id":CLIENT_ID,"client_secret":CLIENT_SECRET})
     r.raise_for_status(); j=r.json()
-    _save_tok(folder,{
+    _save_tok(state,{
         "access_token":j["access_token"],
         "refresh_token":j["refresh_token"],
         "expires_at":time.time()+j["expires_in"]
     })
 
-async def _refresh(folder):
-    tok=_tok(folder)
+async def _refresh(state):
+    tok=_tok(state)
     if not tok or time.time()>tok["expires_at"]-60:
         async with httpx.AsyncClient() as cli:
-            r=await cli.post("https://accounts.spotify.com/api/token",data={
+            r=await cli.post(f"{endpoints.SPOTIFY_ACCOUNTS}/api/token",data={
                 "grant_type":"refresh_token",
                 "refresh_token":tok["refresh_token"],
                 "client_id":CLIENT_ID,
@@ -104,7 +120,7 @@ async def _refresh(folder):
         tok["expires_at"]=time.time()+j["expires_in"]
         if "refresh_token" in j:
             tok["refresh_token"]=j["refresh_token"]
-        _save_tok(folder,tok)
+        _save_tok(state,tok)
     return tok
 
 # ── regex for all YouTube domains ------------------------------------------
@@ -112,25 +128,103 @@ YTLINK = re.compile(r"(https?://)?(www\.)?"
                     r"(youtu\.be/|(?:music\.)?youtube\.com/watch\?v=)",
                     re.I)
 
+# ── shared now-playing state ----------------------------------------------
+_np: dict = {}        # "poller", "overlay", "index", "log", "ytdl" – built once per run
+
+def _fmt_ms(ms: int) -> str:
+    s = max(0, int(ms)) // 1000
+    return f"{s // 60}:{s % 60:02d}"
+
+def _poller(state) -> Poller:
+    if "poller" not in _np:
+        async def access_token():
+            return (await _refresh(state))["access_token"]
+        _np["poller"] = Poller(access_token)
+    return _np["poller"]
+
+def _index(bot, cfg) -> TrackIndex:
+    if "index" not in _np:
+        t0 = time.perf_counter()
+        _np["index"] = TrackIndex(bot.store.addon(f"{ADDON_NAME}.tracks"),
+                                  bot.store.addon(f"{ADDON_NAME}.aliases"),
+                                  threshold=cfg.get("local_match_threshold", 0.88)).load()
+        logging.info("[%s] track index: %d tracks loaded in %.0f ms", ADDON_NAME,
+                     len(_np["index"]), (time.perf_counter() - t0) * 1000)
+    return _np["index"]
+
+def _yt_info(url: str) -> dict:
+    # one YoutubeDL for the whole run (each instance loads every extractor);
+    # it is not thread-safe, so lookups take turns
+    if "ytdl" not in _np:
+        import yt_dlp   # heavy (import time + RSS) – only load it once a link shows up
+        _np["ytdl"] = (yt_dlp.YoutubeDL({"quiet": True}), threading.Lock())
+    ydl, lock = _np["ytdl"]
+    with lock:
+        return ydl.extract_info(url, download=False, process=False)
+
+def _request_log(bot) -> RequestLog:
+    if "log" not in _np:
+        p = bot.store.path
+        _np["log"] = RequestLog(":memory:" if p == ":memory:" else Path(p).with_name("song_requests.db"))
+    return _np["log"]
+
+async def start(bot, folder=os.path.dirname(__file__)):
+    cfg = _cfg(folder)
+    poller = _poller(bot.store.addon(ADDON_NAME))
+    # last known track/queue until the first poll answers (warm restart)
+    bot.snapshots.register(f"{ADDON_NAME}.nowplaying", lambda: poller.state, poller.state.update)
+    poller.start()
+    port = cfg.get("overlay_port", 8766)
+    if port and "overlay" not in _np:
+        srv = OverlayServer(poller, cfg.get("overlay_host", "127.0.0.1"), port)
+        try:
+            await srv.start()
+            _np["overlay"] = srv
+        except OSError as e:
+            logging.error("[%s] overlay server not started: %s", ADDON_NAME, e)
+
+async def stop(bot):
+    if "overlay" in _np:
+        await _np.pop("overlay").stop()
+    if "poller" in _np:
+        await _np.pop("poller").stop()
+    if "log" in _np:
+        await asyncio.to_thread(_np.pop("log").close)
+    if "ytdl" in _np:
+        _np.pop("ytdl")[0].close()
+
 # ── main register() ---------------------------------------------------------
 def register(bot, folder=os.path.dirname(__file__)):
     cfg   = _cfg(folder)
     banned= _load_banned(folder)
-    _initial_oauth(folder)
+    state = bot.store.addon(ADDON_NAME)
+    _initial_oauth(state)
+    poller = _poller(state)
+    index  = _index(bot, cfg)
+    reqlog = _request_log(bot)
+
+    async def process_query(query:str, user:str, source:str="sr"):
+        rec = {"outcome": "error", "track": None, "resolved": None}
+        t0 = time.perf_counter()
+        try:
+            await _process(query, user, rec)
+        finally:
+            reqlog.record(user, query, source, rec["outcome"],
+                          (time.perf_counter() - t0) * 1000, rec["track"], rec["resolved"])
 
-    async def process_query(query:str, user:str):
+    async def _process(query:str, user:str, rec:dict):
         # YouTube link → title
         if YTLINK.search(query):
+            rec["resolved"]="youtube"
             url=query.split()[0]
             try:
-                info=await asyncio.to_thread(
-                    yt_dlp.YoutubeDL({"quiet":True}).extract_info,
-                    url, download=False)
+                info=await asyncio.to_thread(_yt_info, url)
                 title=re.sub(r"\(.*?official.*?\)", "", info["title"], flags=re.I)
                 query=re.sub(r"\[.*?]", "", title).strip()
             except Exception as e:
                 await bot.safe_send(cfg["msg_fail"].format(
                     bot_nick=bot.bot_nick,title="YouTube link",artist="",error=str(e), user=user))
+                rec["outcome"]="failed"
                 return
 
         # Reject album / playlist / artist links
@@ -141,64 +235,75 @@ def register(bot, folder=os.path.dirname(__file__)):
             await bot.safe_send(cfg["msg_fail"].format(
                 bot_nick=bot.bot_nick, title="album / playlist",
                 artist="", error="only individual tracks can be queued", user=user))
+            rec["outcome"]="rejected"
             return
 
-        tok   = await _refresh(folder)
+        tok   = await _refresh(state)
         hdr   = {"Authorization":f"Bearer {tok['access_token']}"}
+        is_link = "open.spotify.com/track/" in query or query.startswith("spotify:track:")
 
-        async with httpx.AsyncClient() as cli:
-            if "open.spotify.com/track/" in query or query.startswith("spotify:track:"):
-                r=await cli.get(f"https://api.spotify.com/v1/tracks/{_track_id(query)}",
-                                headers=hdr)
-                if r.status_code!=200:
-                    await bot.safe_send(cfg["msg_fail"].format(
-                        bot_nick=bot.bot_nick,title=query,artist="",error=r.text, user=user))
-                    return
-                tr=r.json()
-            else:
-                sr=await cli.get("https://api.spotify.com/v1/search",
-                                 headers=hdr, params={"q":query,"type":"track","limit":1})
-                items=sr.json()['tracks']['items']
-                if not items:
-                    await bot.safe_send(cfg["msg_fail"].format(
-                        bot_nick=bot.bot_nick,title=query,artist="",error="no match", user=user))
-                    return
-                tr=items[0]
-
-            tid=tr["id"].lower()
-            if tid in banned:
-                await bot.safe_send(cfg["msg_banned"].format(
-                    bot_nick=bot.bot_nick,title=tr["name"],artist=tr["artists"][0]["name"], user=user))
+        cli   = bot.http          # shared client, within this addon's HTTP quota
+        tr = None if is_link else index.lookup(query)
+        if tr is not None:
+            rec["resolved"]=rec["resolved"] or "local"
+            logging.info("[%s] local match: %r -> %s", ADDON_NAME, query, tr["name"])
+            index.add(tr, query)          # popularity + exact phrasing for next time
+        elif is_link:
+            r=await cli.get(f"{endpoints.SPOTIFY_API}/v1/tracks/{_track_id(query)}",
+                            headers=hdr)
+            rec["resolved"]="link"
+            if r.status_code!=200:
+                await bot.safe_send(cfg["msg_fail"].format(
+                    bot_nick=bot.bot_nick,title=query,artist="",error=r.text, user=user))
+                rec["outcome"]="failed"
+                return
+            tr=r.json()
+            index.add(tr)
+        else:
+            sr=await cli.get(f"{endpoints.SPOTIFY_API}/v1/search",
+                             headers=hdr, params={"q":query,"type":"track","limit":1})
+            rec["resolved"]=rec["resolved"] or "search"
+            items=sr.json()['tracks']['items']
+            if not items:
+                await bot.safe_send(cfg["msg_fail"].format(
+                    bot_nick=bot.bot_nick,title=query,artist="",error="no match", user=user))
+                rec["outcome"]="no_match"
                 return
+            tr=items[0]
+            index.add(tr, query)
 
-            q=await cli.post("https://api.spotify.com/v1/me/player/queue",
-                             headers=hdr, params={"uri":tr["uri"]})
-            data = {"bot_nick":bot.bot_nick,
-                    "title":tr["name"],
-                    "artist":tr["artists"][0]["name"],
-                    "error":q.text,
-                    "user":user}
-            msg = "msg_success" if 200<=q.status_code<300 else "msg_fail"
-            await bot.safe_send(cfg[msg].format(**data))
-
-    # channel-point redeem
-    async def on_redeem(evt: ChannelPointsCustomRewardRedemptionAddEvent):
-        reward_title = None
-        try:
-            reward_title = evt.event.reward.title
-        except AttributeError:
-            print("[ERROR] Could not get reward title from event!")
-        except Exception as e:
-            print(f"[ERROR] Unexpected error reading reward title: {e}")
-
-        if reward_title and reward_title.lower() == cfg["redeem_name"].lower():
-            user_input = getattr(evt.event, "user_input", "").strip()
-            # Try to get user name (Twitch v5: user_login, Twitch Helix: user_name)
-            user = getattr(evt.event, "user_login", None) or getattr(evt.event, "user_name", None) or "someone"
-            if user_input:
-                await process_query(user_input, user)
-            else:
-                print("[WARN] No user_input found for this redemption.")
+        rec["track"]=tr
+        tid=tr["id"].lower()
+        if tid in banned:
+            await bot.safe_send(cfg["msg_banned"].format(
+                bot_nick=bot.bot_nick,title=tr["name"],artist=tr["artists"][0]["name"], user=user))
+            rec["outcome"]="banned"
+            return
+
+        q=await cli.post(f"{endpoints.SPOTIFY_API}/v1/me/player/queue",
+                         headers=hdr, params={"uri":tr["uri"]})
+        bot.settled()          # queued (or refused) – a restart must not replay it
+        data = {"bot_nick":bot.bot_nick,
+                "title":tr["name"],
+                "artist":tr["artists"][0]["name"],
+                "error":q.text,
+                "user":user}
+        msg = "msg_success" if 200<=q.status_code<300 else "msg_fail"
+        rec["outcome"] = "queued" if msg == "msg_success" else "failed"
+        await bot.safe_send(cfg[msg].format(**data))
+        if msg == "msg_success":
+            poller.poke()      # refresh the cached "up next"
+
+    # channel-point redeem – only our reward reaches us (key filter on the title);
+    # each one runs as its own tracked task so a slow Spotify call never queues
+    # the next, and a shutdown that cuts it off replays it after the restart
+    def on_redeem(ev: Event):
+        user = ev.login or "someone"
+        logging.info("[redeem] %s -> %s: %s", user, ev.key, ev.text)
+        if ev.text:
+            bot.track(process_query(ev.text, user, "redeem"), replay=ev)
+        else:
+            print("[WARN] No user_input found for this redemption.")
 
     # !sr command  ────────────────  (mods & streamer only)
     async def cmd_sr(msg, args):
@@ -213,23 +318,73 @@ def register(bot, folder=os.path.dirname(__file__)):
             return
 
         user = getattr(msg.author, "display_name", None) or getattr(msg.author, "name", None) or "someone"
-        await process_query(" ".join(args), user)
+        await process_query(" ".join(args), user, "sr")
 
     bot.register("sr", cmd_sr, "queue a song (mods/streamer)")
 
-    # ----- build subscription coroutine, hand it to the bot --------------
-    if hasattr(bot.es, "listen_channel_points_custom_reward_redemption_add_v1"):
-        sub_coro = bot.es.listen_channel_points_custom_reward_redemption_add_v1(
-            broadcaster_user_id=bot.b_id, callback=on_redeem)
-    else:
-        sub_coro = bot.es.listen_channel_points_custom_reward_redemption_add(
-            broadcaster_user_id=bot.b_id, callback=on_redeem)
+    # !song / !queue – answered from the poller's memory, zero Spotify calls
+    async def cmd_song(msg, args):
+        snap = poller.snapshot()
+        t = snap["track"]
+        if not t:
+            await bot.safe_send(cfg.get("msg_nothing", "nothing is playing right now"))
+            return
+        await bot.safe_send(cfg.get("msg_song", "now playing: {title} by {artist} ({progress}/{duration})").format(
+            bot_nick=bot.bot_nick, title=t["name"], artist=", ".join(t["artists"]),
+            progress=_fmt_ms(snap["progress_ms"]), duration=_fmt_ms(t["duration_ms"])))
+
+    async def cmd_queue(msg, args):
+        upcoming = poller.state["queue"][:5]
+        if not upcoming:
+            await bot.safe_send(cfg.get("msg_queue_empty", "the queue is empty"))
+            return
+        await bot.safe_send("up next: " + " | ".join(
+            f"{t['name']} by {t['artists'][0] if t['artists'] else '?'}" for t in upcoming))
+
+    # !history [user] / !topsongs [days] / !songstats [user] – from song_requests.db
+    async def cmd_history(msg, args):
+        who = args[0].lstrip("@") if args else None
+        rows = await asyncio.to_thread(reqlog.recent, 5, who)
+        if not rows:
+            await bot.safe_send(f"no song requests from {who} yet" if who else "no song requests yet")
+            return
+        await bot.safe_send(("last requests: " if not who else f"{who}'s last requests: ") + " | ".join(
+            (f"{r['title']} by {r['artist']}" if r["title"] else r["query"])
+            + ("" if r["outcome"] == "queued" else f" ({r['outcome']})")
+            + ("" if who else f" – {r['user']}") for r in rows))
+
+    async def cmd_topsongs(msg, args):
+        days = int(args[0]) if args and args[0].isdigit() else None
+        since = time.time() - days * 86400 if days else None
+        rows = await asyncio.to_thread(reqlog.top_tracks, 5, since)
+        if not rows:
+            await bot.safe_send("no songs queued yet")
+            return
+        head = f"top songs ({days}d): " if days else "top songs: "
+        await bot.safe_send(head + " | ".join(
+            f"{i}. {r['title']} by {r['artist']} ({r['count']})" for i, r in enumerate(rows, 1)))
+
+    async def cmd_songstats(msg, args):
+        who = args[0].lstrip("@") if args else msg.author.name
+        st = await asyncio.to_thread(reqlog.user_stats, who)
+        if not st:
+            await bot.safe_send(f"no song requests from {who} yet")
+            return
+        fav = st["favourite"]
+        await bot.safe_send(f"{who}: {st['requests']} requests, {st['queued']} queued"
+                            + (f", favourite: {fav['title']} by {fav['artist']} ({fav['count']}x)" if fav else ""))
+
+    bot.register("history", cmd_history, "recent song requests")
+    bot.register("topsongs", cmd_topsongs, "most requested songs [days]")
+    bot.register("songstats", cmd_songstats, "song request stats for a user")
+    bot.register("song", cmd_song, "current song")
+    bot.register("queue", cmd_queue, "next songs in the Spotify queue")
 
-    # Store coroutine so the core bot can await it synchronously
-    bot.pending_subs.append(sub_coro)
+    # same name on every register() → replaces, never duplicates
+    bot.bus.subscribe("redemption", on_redeem, name=f"{ADDON_NAME}.redeem",
+                         key=cfg["redeem_name"])
 
-    # online message once everything is wired (run after websocket starts)
+    # online message once everything is wired: timers only fire after the bot goes live
     async def announce():
-        await asyncio.sleep(1)         # give WS a moment
         await bot.safe_send(cfg["msg_online"].format(bot_nick=bot.bot_nick))
-    bot.pending_tasks.append(announce())
+    bot.schedule.after(1, announce, name="announce")   # give WS a moment
@@ -0,0 +1,252 @@
+"""
+nowplaying.py
+One shared view of Spotify playback for the addon
+• Poller – the ONLY caller of /v1/me/player; interval adapts to playback:
+  polls just after the current track should end, at most every `max_s`
+  while playing, backs off (×2 up to `idle_max_s`) while paused/idle, and
+  honours Retry-After on 429. The upcoming queue is fetched once per track.
+• chat commands and overlays read poller.state from memory
+• OverlayServer – tiny asyncio HTTP server (no extra deps) for OBS:
+    GET /now     current state as JSON
+    GET /events  Server-Sent Events, pushed on track / play-pause / seek
+    GET /        minimal browser-source overlay
+"""
+
+from __future__ import annotations
+import asyncio, json, logging, time
+from typing import Awaitable, Callable
+
+from ljb import endpoints
+
+def _track(item: dict | None) -> dict | None:
+    if not item:
+        return None
+    images = (item.get("album") or {}).get("images") or []
+    return {"id": item.get("id"), "uri": item.get("uri"), "name": item.get("name"),
+            "artists": [a.get("name") for a in item.get("artists", [])],
+            "album": (item.get("album") or {}).get("name"),
+            "image": images[0]["url"] if images else None,
+            "duration_ms": item.get("duration_ms") or 0}
+
+class Poller:
+    def __init__(self, get_token: Callable[[], Awaitable[str]], *, max_s: float = 10.0,
+                 min_s: float = 1.0, idle_s: float = 5.0, idle_max_s: float = 60.0):
+        self.get_token = get_token
+        self.max_s, self.min_s = max_s, min_s
+        self.idle_s, self.idle_max_s = idle_s, idle_max_s
+        self.state: dict = {"is_playing": False, "track": None, "progress_ms": 0,
+                            "queue": [], "updated": 0.0}
+        self.listeners: list[Callable[[dict], None]] = []
+        self.calls = 0
+        self._idle = idle_s
+        self._wake = asyncio.Event()
+        self._queue_dirty = False
+        self._task: asyncio.Task | None = None
+        self._cli = None
+
+    # ── reads (memory only) ───────────────────────────────────────────
+    def progress_ms(self) -> int:
+        """Progress extrapolated from the last poll."""
+        st = self.state
+        p = st["progress_ms"]
+        if st["is_playing"] and st["updated"]:
+            p += int((time.time() - st["updated"]) * 1000)
+        dur = (st["track"] or {}).get("duration_ms") or 0
+        return min(p, dur) if dur else p
+
+    def snapshot(self) -> dict:
+        return {**self.state, "progress_ms": self.progress_ms(), "server_ts": time.time()}
+
+    # ── polling ───────────────────────────────────────────────────────
+    def poke(self):
+        """Poll soon (e.g. right after something was queued) – queue included."""
+        self._queue_dirty = True
+        self._wake.set()
+
+    async def _get(self, path: str):
+        import httpx
+        if self._cli is None:
+            self._cli = httpx.AsyncClient(timeout=10)
+        tok = await self.get_token()
+        self.calls += 1
+        return await self._cli.get(f"{endpoints.SPOTIFY_API}{path}",
+                                   headers={"Authorization": f"Bearer {tok}"})
+
+    async def poll_once(self) -> float:
+        """One /me/player call; returns seconds until the next one."""
+        r = await self._get("/v1/me/player")
+        if r.status_code == 429:
+            return float(r.headers.get("Retry-After", 30))
+        if r.status_code == 204 or r.status_code >= 400:
+            self._update(False, None, 0)
+            return self._backoff()
+        d = r.json()
+        old_id = (self.state["track"] or {}).get("id")
+        track = _track(d.get("item"))
+        self._update(bool(d.get("is_playing")), track, d.get("progress_ms") or 0)
+        if track and (track["id"] != old_id or self._queue_dirty):
+            self._queue_dirty = False            # before the fetch: a poke during it polls again
+            await self._fetch_queue()
+        if not self.state["is_playing"]:
+            return self._backoff()
+        self._idle = self.idle_s
+        remaining = (track["duration_ms"] - self.state["progress_ms"]) / 1000 if track else self.max_s
+        # wake up right after the track should end; never sleep longer than max_s
+        return max(self.min_s, min(self.max_s, remaining + 0.5))
+
+    def _backoff(self) -> float:
+        wait, self._idle = self._idle, min(self.idle_max_s, self._idle * 2)
+        return wait
+
+    async def _fetch_queue(self):
+        try:
+            r = await self._get("/v1/me/player/queue")
+            if r.status_code == 200:
+                queue = [t for t in map(_track, r.json().get("queue", [])[:10]) if t]
+                if queue != self.state["queue"]:
+                    self.state["queue"] = queue
+                    self._notify()
+        except Exception as e:
+            logging.debug("[nowplaying] queue fetch failed: %s", e)
+
+    def _update(self, playing: bool, track: dict | None, progress: int):
+        st = self.state
+        expected = self.progress_ms()
+        changed = (playing != st["is_playing"]
+                   or (track or {}).get("id") != (st["track"] or {}).get("id")
+                   or abs(progress - expected) > 3000)             # seek
+        st.update(is_playing=playing, track=track, progress_ms=progress, updated=time.time())
+        if track is None:
+            st["queue"] = []
+        if changed:
+            self._notify()
+
+    def _notify(self):
+        snap = self.snapshot()
+        for fn in list(self.listeners):
+            try:
+                fn(snap)
+            except Exception as e:
+                logging.error("[nowplaying] listener failed: %s", e)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()                  # before the poll: a poke during it is kept
+            try:
+                wait = await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("[nowplaying] poll failed: %s", e)
+                wait = self._backoff()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+                await asyncio.sleep(0.5)     # let Spotify apply whatever triggered the poke
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._cli:
+            await self._cli.aclose()
+            self._cli = None
+
+OVERLAY_HTML = b"""<!doctype html><meta charset="utf-8">
+<style>body{margin:0;font:600 28px system-ui;color:#fff;text-shadow:0 0 6px #000}
+#np{display:flex;gap:14px;align-items:center}img{height:72px;border-radius:6px}
+small{display:block;font-weight:400;font-size:20px}</style>
+<div id="np"></div>
+<script>
+const el=document.getElementById("np");
+// titles / artists come from Spotify and are text, never markup: build nodes, no innerHTML
+new EventSource("/events").onmessage=e=>{const s=JSON.parse(e.data),t=s.track;
+ el.replaceChildren();
+ if(t){if(t.image){const i=document.createElement("img");i.src=t.image;el.append(i);}
+  const d=document.createElement("div"),a=document.createElement("small");
+  d.textContent=t.name;a.textContent=t.artists.join(", ");d.append(a);el.append(d);}
+ el.style.opacity=s.is_playing?1:.5;};
+</script>"""
+
+class OverlayServer:
+    """Fan-out of poller state to any number of local clients – no Spotify calls."""
+
+    def __init__(self, poller: Poller, host: str = "127.0.0.1", port: int = 8766):
+        self.poller, self.host, self.port = poller, host, port
+        self.clients: set[asyncio.Queue] = set()
+        self._streams: set[asyncio.Task] = set()
+        self._server: asyncio.AbstractServer | None = None
+        poller.listeners.append(self.publish)
+
+    def publish(self, snap: dict):
+        data = json.dumps(snap)
+        for q in list(self.clients):
+            if q.full():                 # slow client: drop its oldest update
+                q.get_nowait()
+            q.put_nowait(data)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logging.info("[nowplaying] overlay on http://%s:%d/", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for t in list(self._streams):       # open /events streams never end by themselves
+                t.cancel()
+            await asyncio.gather(*self._streams, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass                                   # skip request headers
+            path = line[1].split("?")[0] if len(line) > 1 else "/"
+            if path == "/events":
+                await self._sse(writer)
+            elif path == "/now":
+                self._reply(writer, b"application/json", json.dumps(self.poller.snapshot()).encode())
+            elif path == "/":
+                self._reply(writer, b"text/html; charset=utf-8", OVERLAY_HTML)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass                                       # client gone / server stopping
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _reply(writer, ctype: bytes, body: bytes):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: " + ctype
+                     + b"\r\nAccess-Control-Allow-Origin: *\r\nCache-Control: no-store"
+                     + b"\r\nContent-Length: " + str(len(body)).encode()
+                     + b"\r\nConnection: close\r\n\r\n" + body)
+
+    async def _sse(self, writer: asyncio.StreamWriter):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-store\r\nAccess-Control-Allow-Origin: *\r\n\r\n")
+        q: asyncio.Queue = asyncio.Queue(maxsize=4)
+        q.put_nowait(json.dumps(self.poller.snapshot()))
+        self.clients.add(q)
+        task = asyncio.current_task()
+        self._streams.add(task)
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(q.get(), 15)
+                    writer.write(f"data: {data}\n\n".encode())
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                await writer.drain()
+        finally:
+            self.clients.discard(q)
+            self._streams.discard(task)
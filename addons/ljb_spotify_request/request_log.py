@@ -0,0 +1,274 @@
+"""
+request_log.py
+Every song request the addon handles – who, what, how it resolved, outcome,
+latency – in its own SQLite file (song_requests.db, WAL) next to state.db.
+• record() only appends a tuple; a timer thread commits batches with one
+  executemany per table, so the request path never waits on disk
+• users / tracks are interned into small lookup tables, request rows are
+  integers + the raw query; indexed by (user, ts), (track, ts) and ts
+• all-time per-track / per-user counters are kept in summary tables by the
+  same batch commit, so !topsongs and per-user stats never scan the log;
+  windowed queries ("last 7 days") range-scan the ts index
+• export_csv() / export_parquet() stream the joined log in chunks
+  (parquet needs pyarrow):
+    python addons/ljb_spotify_request/request_log.py song_requests.db out.csv [--days 30]
+"""
+
+from __future__ import annotations
+import atexit, csv, logging, sqlite3, threading, time
+from pathlib import Path
+
+OUTCOMES = ("queued", "failed", "banned", "no_match", "rejected", "error")
+CHUNK = 50_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users  (id INTEGER PRIMARY KEY, login TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tracks (id INTEGER PRIMARY KEY, spotify_id TEXT NOT NULL UNIQUE,
+                                   name TEXT NOT NULL, artist TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, user_id INTEGER NOT NULL,
+    track_id INTEGER, query TEXT NOT NULL, source TEXT NOT NULL, resolved TEXT,
+    outcome TEXT NOT NULL, latency_ms INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS requests_user  ON requests (user_id, ts);
+CREATE INDEX IF NOT EXISTS requests_track ON requests (track_id, ts);
+CREATE INDEX IF NOT EXISTS requests_ts    ON requests (ts, outcome, track_id);   -- covers windowed top tracks
+CREATE TABLE IF NOT EXISTS track_totals (track_id INTEGER PRIMARY KEY, n INTEGER NOT NULL,
+                                         queued INTEGER NOT NULL, last_ts REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS track_totals_queued ON track_totals (queued);
+CREATE TABLE IF NOT EXISTS user_totals (user_id INTEGER PRIMARY KEY, n INTEGER NOT NULL,
+                                        queued INTEGER NOT NULL, first_ts REAL NOT NULL,
+                                        last_ts REAL NOT NULL);
+"""
+
+EXPORT_SQL = ("SELECT r.ts, u.login, r.query, r.source, r.resolved, t.spotify_id, t.name, t.artist,"
+              " r.outcome, r.latency_ms FROM requests r JOIN users u ON u.id = r.user_id"
+              " LEFT JOIN tracks t ON t.id = r.track_id WHERE r.ts >= ? ORDER BY r.ts")
+EXPORT_COLS = ("ts", "user", "query", "source", "resolved", "track_id", "title", "artist",
+               "outcome", "latency_ms")
+
+class RequestLog:
+    def __init__(self, path: str | Path = ":memory:", *, flush_s: float = 1.0, batch: int = 500):
+        self.path    = str(path)
+        self.flush_s = flush_s
+        self.batch   = batch
+        self._lock   = threading.RLock()
+        self._pending: list[tuple] = []
+        self._timer: threading.Timer | None = None
+        self._users:  dict[str, int] = {}
+        self._tracks: dict[str, int] = {}
+        self.rows_written = self.commits = 0
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(SCHEMA)
+        atexit.register(self.close)
+
+    # ── writes ────────────────────────────────────────────────────────
+    def record(self, user: str, query: str, source: str, outcome: str, latency_ms: float,
+               track: dict | None = None, resolved: str | None = None, ts: float | None = None):
+        """Queue one request row; committed by the next batch flush."""
+        artist = track["artists"][0]["name"] if track and track.get("artists") else ""
+        row = (ts or time.time(), user.lower(), query, source, resolved, outcome, int(latency_ms),
+               (track["id"], track["name"], artist) if track else None)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch:
+                self._timer_cancel()
+                threading.Thread(target=self.flush, daemon=True).start()
+            elif self._timer is None and self.flush_s > 0:
+                self._timer = threading.Timer(self.flush_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timer_cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _intern(self, table: str, cache: dict, key: str, extra: tuple = ()) -> int:
+        i = cache.get(key)
+        if i is None:
+            col = "login" if table == "users" else "spotify_id"
+            row = self.db.execute(f"SELECT id FROM {table} WHERE {col}=?", (key,)).fetchone()
+            if row:
+                i = row[0]
+                if extra:               # titles can be corrected upstream – keep the latest
+                    self.db.execute("UPDATE tracks SET name=?, artist=? WHERE id=?", (*extra, i))
+            else:
+                cols = f"{col}, name, artist" if extra else col
+                marks = ",".join("?" * (1 + len(extra)))
+                i = self.db.execute(f"INSERT INTO {table} ({cols}) VALUES ({marks})",
+                                    (key, *extra)).lastrowid
+            cache[key] = i
+        return i
+
+    def flush(self):
+        """Commit every queued row (plus the summary counters) in one transaction."""
+        with self._lock:
+            self._timer_cancel()
+            if not self._pending or self.db is None:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                self.db.execute("BEGIN IMMEDIATE")
+                rows, tracks, users = [], {}, {}
+                for ts, login, query, source, resolved, outcome, lat, tr in batch:
+                    uid = self._intern("users", self._users, login)
+                    tid = self._intern("tracks", self._tracks, tr[0], tr[1:]) if tr else None
+                    ok = outcome == "queued"
+                    rows.append((ts, uid, tid, query, source, resolved, outcome, lat))
+                    u = users.setdefault(uid, [0, 0, ts, ts])
+                    u[0] += 1; u[1] += ok; u[2] = min(u[2], ts); u[3] = max(u[3], ts)
+                    if tid is not None:
+                        t = tracks.setdefault(tid, [0, 0, ts])
+                        t[0] += 1; t[1] += ok; t[2] = max(t[2], ts)
+                self.db.executemany("INSERT INTO requests (ts, user_id, track_id, query, source,"
+                                    " resolved, outcome, latency_ms) VALUES (?,?,?,?,?,?,?,?)", rows)
+                self.db.executemany(
+                    "INSERT INTO track_totals VALUES (?,?,?,?) ON CONFLICT(track_id) DO UPDATE SET"
+                    " n=n+excluded.n, queued=queued+excluded.queued,"
+                    " last_ts=max(last_ts, excluded.last_ts)",
+                    [(k, *v) for k, v in tracks.items()])
+                self.db.executemany(
+                    "INSERT INTO user_totals VALUES (?,?,?,?,?) ON CONFLICT(user_id) DO UPDATE SET"
+                    " n=n+excluded.n, queued=queued+excluded.queued,"
+                    " first_ts=min(first_ts, excluded.first_ts), last_ts=max(last_ts, excluded.last_ts)",
+                    [(k, *v) for k, v in users.items()])
+                self.db.execute("COMMIT")
+                self.rows_written += len(rows)
+                self.commits += 1
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                self._users.clear()             # ids handed out inside the rolled-back tx
+                self._tracks.clear()
+                self._pending[:0] = batch
+                raise
+
+    def close(self):
+        with self._lock:
+            if self.db is None:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.error("[request_log] final flush failed: %s", e)
+            self.db.close()
+            self.db = None
+        atexit.unregister(self.close)
+
+    # ── queries (flush first so a request is visible right after it) ──
+    def _query(self, sql: str, args: tuple = ()) -> list[tuple]:
+        with self._lock:
+            self.flush()
+            return self.db.execute(sql, args).fetchall()
+
+    def recent(self, limit: int = 5, user: str | None = None) -> list[dict]:
+        """Newest first; one user's requests when `user` is given."""
+        sql = ("SELECT r.ts, u.login, r.query, t.name, t.artist, r.outcome, r.source, r.latency_ms"
+               " FROM requests r JOIN users u ON u.id = r.user_id"
+               " LEFT JOIN tracks t ON t.id = r.track_id")
+        if user:
+            rows = self._query(sql + " WHERE r.user_id = (SELECT id FROM users WHERE login=?)"
+                               " ORDER BY r.ts DESC LIMIT ?", (user.lower(), limit))
+        else:
+            rows = self._query(sql + " ORDER BY r.ts DESC LIMIT ?", (limit,))
+        keys = ("ts", "user", "query", "title", "artist", "outcome", "source", "latency_ms")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def top_tracks(self, limit: int = 5, since: float | None = None) -> list[dict]:
+        """Most queued tracks – all time from the counters, or since a timestamp."""
+        if since is None:
+            rows = self._query("SELECT t.name, t.artist, tt.queued FROM track_totals tt"
+                               " JOIN tracks t ON t.id = tt.track_id WHERE tt.queued > 0"
+                               " ORDER BY tt.queued DESC LIMIT ?", (limit,))
+        else:
+            rows = self._query("SELECT t.name, t.artist, c.n FROM"
+                               " (SELECT track_id, count(*) AS n FROM requests INDEXED BY requests_ts"
+                               "  WHERE ts >= ? AND outcome = 'queued' AND track_id IS NOT NULL"
+                               "  GROUP BY track_id ORDER BY n DESC LIMIT ?) c"
+                               " JOIN tracks t ON t.id = c.track_id ORDER BY c.n DESC",
+                               (since, limit))
+        return [{"title": n, "artist": a, "count": c} for n, a, c in rows]
+
+    def user_stats(self, user: str) -> dict | None:
+        rows = self._query("SELECT ut.n, ut.queued, ut.first_ts, ut.last_ts, ut.user_id"
+                           " FROM user_totals ut JOIN users u ON u.id = ut.user_id"
+                           " WHERE u.login = ?", (user.lower(),))
+        if not rows:
+            return None
+        n, queued, first, last, uid = rows[0]
+        fav = self._query("SELECT t.name, t.artist, count(*) AS c FROM requests r"
+                          " JOIN tracks t ON t.id = r.track_id WHERE r.user_id = ?"
+                          " AND r.outcome = 'queued' GROUP BY r.track_id ORDER BY c DESC LIMIT 1",
+                          (uid,))
+        return {"user": user.lower(), "requests": n, "queued": queued,
+                "first_ts": first, "last_ts": last,
+                "favourite": {"title": fav[0][0], "artist": fav[0][1], "count": fav[0][2]} if fav else None}
+
+    def stats(self) -> dict:
+        (n,), = self._query("SELECT count(*) FROM requests")
+        return {"rows": n, "rows_written": self.rows_written, "commits": self.commits,
+                "pending": len(self._pending)}
+
+    # ── export ────────────────────────────────────────────────────────
+    def _chunks(self, since: float):
+        self.flush()
+        if self.path == ":memory:":
+            with self._lock:
+                cur = self.db.execute(EXPORT_SQL, (since,))
+                while rows := cur.fetchmany(CHUNK):
+                    yield rows
+            return
+        # own connection: WAL gives it one snapshot while the batch writer carries on
+        db = sqlite3.connect(self.path)
+        try:
+            cur = db.execute(EXPORT_SQL, (since,))
+            while rows := cur.fetchmany(CHUNK):
+                yield rows
+        finally:
+            db.close()
+
+    def export_csv(self, path: str | Path, since: float = 0.0) -> int:
+        n = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(EXPORT_COLS)
+            for rows in self._chunks(since):
+                w.writerows(rows)
+                n += len(rows)
+        return n
+
+    def export_parquet(self, path: str | Path, since: float = 0.0) -> int:
+        try:
+            import pyarrow as pa, pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("parquet export needs pyarrow (pip install pyarrow)") from None
+        schema = pa.schema([("ts", pa.float64()), ("user", pa.string()), ("query", pa.string()),
+                            ("source", pa.string()), ("resolved", pa.string()),
+                            ("track_id", pa.string()), ("title", pa.string()),
+                            ("artist", pa.string()), ("outcome", pa.string()),
+                            ("latency_ms", pa.int32())])
+        n = 0
+        with pq.ParquetWriter(str(path), schema) as w:
+            for rows in self._chunks(since):
+                cols = list(zip(*rows))
+                w.write_table(pa.table({name: list(c) for name, c in zip(EXPORT_COLS, cols)},
+                                       schema=schema))
+                n += len(rows)
+        return n
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="export the song-request log (.csv or .parquet)")
+    ap.add_argument("db", help="path to song_requests.db")
+    ap.add_argument("out", help="output file; .parquet needs pyarrow, anything else is CSV")
+    ap.add_argument("--days", type=float, help="only the last N days")
+    a = ap.parse_args()
+    log = RequestLog(a.db)
+    since = time.time() - a.days * 86400 if a.days else 0.0
+    fn = log.export_parquet if a.out.endswith(".parquet") else log.export_csv
+    print(f"{fn(a.out, since)} rows -> {a.out}")
+    log.close()
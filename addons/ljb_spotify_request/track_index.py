@@ -0,0 +1,176 @@
+"""
+track_index.py
+Local fuzzy index of every track the addon has resolved, so repeat
+free-text requests skip Spotify /v1/search.
+• titles/artists are normalised (case, accents, "(Remastered 2011)",
+  "- Radio Edit", "feat. …", punctuation); asking for a remix/live/… version
+  only matches titles that name it, a plain request prefers the original
+• candidates come from a token -> track postings index (array('I'));
+  candidates are scored with character-trigram Dice similarity against
+  "title" and "title artist" – ≥ threshold answers locally, otherwise the
+  caller falls back to Spotify and add()s the result
+• exact previous phrasings ("aliases") resolve in one dict lookup
+• persisted row-per-track in the bot's state store (compact lists), loaded
+  once at start (50k tracks: ~1 s load, <0.5 ms lookup – bench/bench_track_index.py)
+"""
+
+from __future__ import annotations
+import re, sys, unicodedata
+from array import array
+from collections import Counter
+
+_PARENS   = re.compile(r"[\(\[][^\)\]]*(remaster|version|edit|live|mono|stereo|deluxe|mix|feat|ft\.|with )[^\)\]]*[\)\]]")
+_DASH_TAG = re.compile(r"\s-\s.*(remaster|version|edit|live|mono|stereo|mix).*$")
+_FEAT     = re.compile(r"\b(feat\.?|ft\.?|featuring)\s.*$")
+_NONWORD  = re.compile(r"[^\w]+")
+_APOS     = re.compile(r"['’`]")
+# asking for one of these means a specific version – only match titles that say so
+VERSION_WORDS = frozenset({"remix", "live", "acoustic", "cover", "instrumental", "slowed", "sped",
+                           "nightcore", "karaoke", "reverb", "extended", "demo", "unplugged"})
+STOP      = frozenset({"the", "a", "an", "by", "and", "of", "to", "song", "please", "pls", "play"})
+MAX_POSTING = 5000            # tokens this common say nothing about the track
+
+def normalize(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s.lower())
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = _APOS.sub("", s)                       # don't -> dont
+    s = _PARENS.sub(" ", s)
+    s = _DASH_TAG.sub(" ", s)
+    s = _FEAT.sub(" ", s)
+    return " ".join(_NONWORD.sub(" ", s).replace("_", " ").split())
+
+def trigrams(s: str) -> set[str]:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def dice(a: set[str], b: set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+def tokens(s: str) -> list[str]:
+    return [t for t in s.split() if t not in STOP and len(t) > 1]
+
+class TrackIndex:
+    """In-memory index; rows are [track_id, uri, title, artist, request_count]."""
+
+    def __init__(self, tracks_ns=None, aliases_ns=None, *, threshold: float = 0.88,
+                 max_aliases: int = 50_000):
+        self.tracks_ns, self.aliases_ns = tracks_ns, aliases_ns
+        self.threshold   = threshold
+        self.max_aliases = max_aliases
+        self.ids:     list[str] = []
+        self.rows:    list[list] = []
+        self.titles:  list[str] = []          # normalised title
+        self.artists: list[str] = []          # normalised first artist
+        self.by_id:   dict[str, int] = {}
+        self.postings: dict[str, array] = {}
+        self.aliases: dict[str, str] = {}     # normalised query -> track id
+        self.local_hits = self.alias_hits = self.misses = 0
+
+    # ── persistence ───────────────────────────────────────────────────
+    def load(self) -> "TrackIndex":
+        if self.tracks_ns is not None:
+            for tid, row in self.tracks_ns.items().items():
+                self._insert(tid, row)
+        if self.aliases_ns is not None:
+            self.aliases.update(self.aliases_ns.items())
+        return self
+
+    def _insert(self, tid: str, row: list) -> int:
+        i = self.by_id.get(tid)
+        if i is not None:
+            self.rows[i] = row
+            return i
+        i = len(self.ids)
+        self.by_id[tid] = i
+        self.ids.append(tid)
+        self.rows.append(row)
+        title, artist = normalize(row[2]), normalize(row[3])
+        self.titles.append(sys.intern(title))
+        self.artists.append(sys.intern(artist))
+        for t in set(tokens(title) + tokens(artist)):
+            self.postings.setdefault(sys.intern(t), array("I")).append(i)
+        return i
+
+    def add(self, track: dict, query: str | None = None) -> None:
+        """Record a track resolved by Spotify (and the phrasing that found it)."""
+        tid = track["id"]
+        artist = track["artists"][0]["name"] if track.get("artists") else ""
+        i = self.by_id.get(tid)
+        count = (self.rows[i][4] + 1) if i is not None else 1
+        row = [tid, track["uri"], track["name"], artist, count]
+        self._insert(tid, row)
+        if self.tracks_ns is not None:
+            self.tracks_ns.set(tid, row)
+        if query:
+            self.remember(query, tid)
+
+    def remember(self, query: str, tid: str):
+        q = normalize(query)
+        if not q or self.aliases.get(q) == tid:
+            return
+        if len(self.aliases) >= self.max_aliases:
+            old = next(iter(self.aliases))
+            del self.aliases[old]
+            if self.aliases_ns is not None:
+                self.aliases_ns.delete(old)
+        self.aliases[q] = tid
+        if self.aliases_ns is not None:
+            self.aliases_ns.set(q, tid)
+
+    # ── lookup ────────────────────────────────────────────────────────
+    def as_track(self, i: int) -> dict:
+        tid, uri, title, artist, _ = self.rows[i]
+        return {"id": tid, "uri": uri, "name": title, "artists": [{"name": artist}]}
+
+    def search(self, query: str, limit: int = 5) -> list[tuple[float, int]]:
+        """[(score, row)] best first, from trigram Dice over token candidates."""
+        q = normalize(query)
+        qtok = tokens(q)
+        if not qtok:
+            return []
+        cand: Counter = Counter()
+        for t in qtok:
+            post = self.postings.get(t)
+            if post is not None and len(post) <= MAX_POSTING:
+                cand.update(post)
+        if not cand:
+            return []
+        qg = trigrams(q)
+        wants = VERSION_WORDS.intersection(q.split())
+        scored = []
+        top = cand.most_common(50)
+        floor = max(1, top[0][1] - 1)                      # allow one misspelt token
+        for i, n in top:
+            if n < floor:
+                break
+            title, artist = self.titles[i], self.artists[i]
+            tagged = VERSION_WORDS.intersection(_NONWORD.sub(" ", self.rows[i][2].lower()).split())
+            if not wants <= tagged:
+                continue
+            s = max(dice(qg, trigrams(title)), dice(qg, trigrams(f"{title} {artist}")),
+                    dice(qg, trigrams(f"{artist} {title}")))
+            if tagged - wants:
+                s -= 0.05                                  # plain request: prefer the original
+            scored.append((s, self.rows[i][4], i))
+        scored.sort(reverse=True)                          # score, then popularity
+        return [(s, i) for s, _, i in scored[:limit]]
+
+    def lookup(self, query: str) -> dict | None:
+        """Track dict for a strong local match, else None (ask Spotify)."""
+        tid = self.aliases.get(normalize(query))
+        if tid is not None and tid in self.by_id:
+            self.alias_hits += 1
+            return self.as_track(self.by_id[tid])
+        best = self.search(query, 1)
+        if best and best[0][0] >= self.threshold:
+            self.local_hits += 1
+            return self.as_track(best[0][1])
+        self.misses += 1
+        return None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def stats(self) -> dict:
+        return {"tracks": len(self.ids), "aliases": len(self.aliases), "tokens": len(self.postings),
+                "alias_hits": self.alias_hits, "local_hits": self.local_hits, "misses": self.misses}
@@ -0,0 +1,106 @@
+"""
+bench_events.py
+Fan-out cost of the core event bus (ljb/events.py) with 20 subscribers and
+mixed filters (prefix, regex, roles, channel, none): publish() µs per chat
+message (filters + queueing), the compiled filter match alone vs. checking
+each subscriber's filters one by one, plus end-to-end throughput until
+every queue has drained.
+One deliberately slow subscriber shows drops stay local to it.
+
+    python bench/bench_events.py [--messages 100000] [--subscribers 20]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, random, re, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.events import EventBus, Event, MOD, SUB, VIP  # noqa: E402
+
+WORDS = "song request please play banger hello chat pog kappa lol skip next queue vibes".split()
+
+def filters(i: int) -> dict:
+    kind = i % 5
+    if kind == 0:
+        return {"prefix": ["!", "?"][i % 2]}
+    if kind == 1:
+        return {"regex": [r"\bpog\b", r"(?i)kappa", r"https?://\S+", r"^\d+$"][i % 4]}
+    if kind == 2:
+        return {"roles": [["mod"], ["sub", "vip"], ["broadcaster"]][i % 3]}
+    if kind == 3:
+        return {"channel": ["fakechannel", "otherchannel"][i % 2]}
+    return {}
+
+def naive_match(f: dict, ev: Event, rx: dict) -> bool:
+    if "prefix" in f and not ev.text.startswith(f["prefix"]):
+        return False
+    if "regex" in f and not rx[f["regex"]].search(ev.text):
+        return False
+    if "roles" in f:
+        want = sum({"mod": MOD, "sub": SUB, "vip": VIP, "broadcaster": 1}[r] for r in f["roles"])
+        if not ev.roles & want:
+            return False
+    if "channel" in f and ev.channel != f["channel"]:
+        return False
+    return True
+
+async def run(a) -> dict:
+    rnd = random.Random(1)
+    events = [Event("chat", channel=rnd.choice(["fakechannel", "fakechannel", "otherchannel"]),
+                    login=f"viewer{rnd.randrange(500)}", roles=rnd.choice([0, 0, 0, MOD, SUB, VIP]),
+                    text=rnd.choice(["!", "?", ""]) + " ".join(rnd.choices(WORDS, k=rnd.randint(1, 10))))
+              for _ in range(5000)]
+    bus = EventBus()
+    fs = [filters(i) for i in range(a.subscribers)]
+    counts = [0] * a.subscribers
+    for i, f in enumerate(fs):
+        def h(ev, i=i):
+            counts[i] += 1
+        bus.subscribe("chat", h, name=f"sub{i}", maxsize=a.messages, **f)
+
+    async def slow(ev):
+        await asyncio.sleep(0.001)
+    bus.subscribe("chat", slow, name="slow", maxsize=100)
+
+    t0 = time.perf_counter()
+    matched = 0
+    for i in range(a.messages):
+        matched += bus.publish(events[i % len(events)])
+    publish_us = (time.perf_counter() - t0) / a.messages * 1e6
+    await bus.drain(timeout=0.5 + a.messages / 50_000)
+    total_s = time.perf_counter() - t0
+
+    table = bus._tables["chat"]                # filter evaluation only, no queueing
+    t0 = time.perf_counter()
+    for i in range(a.messages):
+        table.match(events[i % len(events)])
+    dispatch_us = (time.perf_counter() - t0) / a.messages * 1e6
+
+    rx = {f["regex"]: re.compile(f["regex"]) for f in fs if "regex" in f}
+    t0 = time.perf_counter()
+    naive = 0
+    for i in range(a.messages):
+        ev = events[i % len(events)]
+        naive += sum(naive_match(f, ev, rx) for f in fs)
+    naive_us = (time.perf_counter() - t0) / a.messages * 1e6
+    stats = bus.stats()
+    await bus.close()
+    return {"subscribers": a.subscribers, "messages": a.messages,
+            "publish_us_per_msg": round(publish_us, 2), "dispatch_us_per_msg": round(dispatch_us, 2),
+            "naive_filter_us_per_msg": round(naive_us, 2),
+            "deliveries": matched, "naive_deliveries": naive + a.messages,
+            "end_to_end_msgs_per_s": round(a.messages / total_s),
+            "slow_subscriber": stats["slow"], "fast_dropped": sum(stats[f"sub{i}"]["dropped"]
+                                                              for i in range(a.subscribers))}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--subscribers", type=int, default=20)
+    a = ap.parse_args()
+    print(json.dumps(asyncio.run(run(a)), indent=2))
+
+if __name__ == "__main__":
+    main()
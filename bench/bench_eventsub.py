@@ -0,0 +1,114 @@
+"""
+bench_eventsub.py
+Per-event CPU cost of a channel-points redemption notification, from the raw
+websocket frame to the bot's handler having read its fields:
+  • twitchapi – what EventSubWebsocket does per notification: json.loads,
+    the full model tree (ChannelPointsCustomRewardRedemptionAddEvent(**payload)),
+    a task for the callback, which reads the fields with getattr (as
+    LJB._on_redemption does)
+  • lite      – ljb/eventsub.py: fast parse, only the declared fields into a
+    __slots__ record, same callback
+Frames are processed in batches on one loop; CPU time is process time.
+
+    python bench/bench_eventsub.py [--events 20000] [--batch 500]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, sys, time, uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb import eventsub  # noqa: E402
+
+SUB_ID = "sub-1"
+
+def frame(i: int) -> str:
+    return json.dumps({
+        "metadata": {"message_id": uuid.uuid4().hex, "message_type": "notification",
+                     "message_timestamp": "2024-01-01T00:00:00.000000000Z",
+                     "subscription_type": eventsub.REDEMPTION_ADD, "subscription_version": "1"},
+        "payload": {
+            "subscription": {"id": SUB_ID, "status": "enabled", "type": eventsub.REDEMPTION_ADD,
+                             "version": "1", "condition": {"broadcaster_user_id": "1000", "reward_id": ""},
+                             "transport": {"method": "websocket", "session_id": "s"},
+                             "created_at": "2024-01-01T00:00:00.000000000Z", "cost": 0},
+            "event": {"id": uuid.uuid4().hex, "broadcaster_user_id": "1000",
+                      "broadcaster_user_login": "streamer", "broadcaster_user_name": "Streamer",
+                      "user_id": str(2000 + i % 300), "user_login": f"user{i % 300}",
+                      "user_name": f"User{i % 300}", "user_input": f"song {i} by artist {i % 50}",
+                      "status": "unfulfilled",
+                      "reward": {"id": "reward-1", "title": "Song Request", "cost": 100, "prompt": ""},
+                      "redeemed_at": "2024-01-01T00:00:00.123456789Z"},
+        },
+    })
+
+seen = 0
+
+async def handler(evt):
+    """The fields LJB._on_redemption reads."""
+    global seen
+    e = evt.event
+    (getattr(e, "id", None), getattr(e, "user_login", None), getattr(e, "user_id", None),
+     getattr(e, "user_input", ""), getattr(e, "broadcaster_user_login", ""),
+     getattr(getattr(e, "reward", None), "title", ""))
+    seen += 1
+
+def twitchapi_path():
+    try:
+        from twitchAPI.object.eventsub import ChannelPointsCustomRewardRedemptionAddEvent
+    except ImportError:
+        return None
+
+    def on_text(raw):
+        # EventSubWebsocket._task_receive + _handle_notification
+        data = json.loads(raw)
+        payload = data.get("payload", {})
+        asyncio.ensure_future(handler(ChannelPointsCustomRewardRedemptionAddEvent(**payload)))
+    return on_text
+
+def lite_path():
+    es = eventsub.EventSubLite(twitch=None, connection_url="ws://unused")
+    es._subs[SUB_ID] = eventsub._Sub(eventsub.REDEMPTION_ADD, "1", {}, handler,
+                                     eventsub.record_type("Redemption", eventsub.FIELDS[eventsub.REDEMPTION_ADD]))
+    return es._on_text
+
+async def measure(on_text, warm: list[str], frames: list[str], batch: int) -> dict:
+    global seen
+    seen = 0
+    for raw in warm:
+        on_text(raw)
+    while seen < len(warm):
+        await asyncio.sleep(0)
+    seen = 0
+    c0, w0 = time.process_time(), time.perf_counter()
+    for i in range(0, len(frames), batch):
+        for raw in frames[i:i + batch]:
+            on_text(raw)
+        while seen < min(i + batch, len(frames)):
+            await asyncio.sleep(0)
+    cpu, wall = time.process_time() - c0, time.perf_counter() - w0
+    n = len(frames)
+    return {"events": n, "cpu_us_per_event": round(cpu / n * 1e6, 2),
+            "wall_us_per_event": round(wall / n * 1e6, 2), "events_per_cpu_s": round(n / cpu) if cpu else None}
+
+async def run(a) -> dict:
+    warm, frames = [frame(i) for i in range(a.batch)], [frame(i) for i in range(a.events)]
+    out = {"json": "orjson" if eventsub._loads is not json.loads else "json"}
+    ta = twitchapi_path()
+    out["twitchapi"] = await measure(ta, warm, frames, a.batch) if ta else "twitchAPI not installed"
+    out["lite"] = await measure(lite_path(), warm, frames, a.batch)
+    if ta:
+        out["speedup"] = round(out["twitchapi"]["cpu_us_per_event"] / out["lite"]["cpu_us_per_event"], 1)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=20000)
+    ap.add_argument("--batch", type=int, default=500)
+    a = ap.parse_args()
+    print(json.dumps(asyncio.run(run(a)), indent=2))
+
+if __name__ == "__main__":
+    main()
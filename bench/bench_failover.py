@@ -0,0 +1,96 @@
+"""
+bench_failover.py
+Hot-standby takeover time (ljb/standby.py) with real processes: a leader
+child process takes the lock on a shared state.db and heartbeats; this
+process waits as standby. The leader is killed (SIGKILL – a crash, no
+cleanup) or stopped cleanly, and we measure
+  • kill → lock acquired   (how fast leader loss is detected)
+  • last heartbeat → lock  (how stale the old leader's last sign of life is)
+The rest of a takeover (EventSub connect + subscribe) is network-bound and
+shows up as the "promoted" phase in the bot's startup report.
+
+    python bench/bench_failover.py [--trials 10] [--poll 0.5]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, os, random, signal, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.standby import Standby  # noqa: E402
+from ljb.store import Store      # noqa: E402
+
+LEADER = """
+import asyncio, sys
+sys.path.insert(0, {root!r})
+from ljb.standby import Standby
+from ljb.store import Store
+async def main():
+    store = Store({db!r}, coalesce_s=0.05)
+    sb = Standby({lock!r}, store.meta, heartbeat_s={hb})
+    assert sb.try_lead()
+    sb.start_heartbeat()
+    print("leading", flush=True)
+    try:
+        await asyncio.sleep(3600)
+    finally:
+        sb.stop(); store.close()
+try:
+    asyncio.run(main())
+except KeyboardInterrupt:
+    pass
+"""
+
+async def trial(tmp: Path, poll: float, hb: float, crash: bool) -> dict:
+    db, lock = tmp / "state.db", tmp / "leader.lock"
+    child = subprocess.Popen([sys.executable, "-c", LEADER.format(root=str(ROOT), db=str(db),
+                                                                  lock=str(lock), hb=hb)],
+                             stdout=subprocess.PIPE, text=True)
+    assert child.stdout.readline().strip() == "leading"
+    store = Store(db, coalesce_s=0.05)
+    sb = Standby(lock, store.meta, poll_s=poll)
+    assert not sb.try_lead()
+    waiter = asyncio.ensure_future(sb.wait_for_leadership())
+    await asyncio.sleep(hb * 2 + random.uniform(0, max(poll, hb)))   # a few heartbeats in, random phase
+    t_kill = time.time()
+    if crash:
+        child.kill()
+    else:
+        child.send_signal(signal.SIGINT if os.name != "nt" else signal.CTRL_C_EVENT)
+    await waiter
+    t_lock = time.time()
+    last_hb = sb.last_heartbeat()
+    child.wait()
+    sb.stop()
+    store.close()
+    return {"detect_ms": (t_lock - t_kill) * 1000,
+            "since_heartbeat_ms": (t_lock - last_hb) * 1000 if last_hb else None}
+
+async def run(a) -> list[dict]:
+    out = []
+    for crash in (True, False):
+        rows = []
+        for _ in range(a.trials):
+            with tempfile.TemporaryDirectory(prefix="ljb_failover_") as d:
+                rows.append(await trial(Path(d), a.poll, a.heartbeat, crash))
+        det = [r["detect_ms"] for r in rows]
+        hbs = [r["since_heartbeat_ms"] for r in rows if r["since_heartbeat_ms"] is not None]
+        out.append({"leader": "killed (SIGKILL)" if crash else "clean stop", "trials": a.trials,
+                    "poll_s": a.poll, "heartbeat_s": a.heartbeat,
+                    "detect_ms_p50": round(statistics.median(det), 1), "detect_ms_max": round(max(det), 1),
+                    "since_heartbeat_ms_p50": round(statistics.median(hbs), 1) if hbs else None,
+                    "since_heartbeat_ms_max": round(max(hbs), 1) if hbs else None})
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--trials", type=int, default=10)
+    ap.add_argument("--poll", type=float, default=0.5, help="standby_poll_s")
+    ap.add_argument("--heartbeat", type=float, default=1.0)
+    a = ap.parse_args()
+    print(json.dumps(asyncio.run(run(a)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+bench_filter.py
+Outbound content filter (ljb/content_filter.py) against a large term list:
+per-message cost of the bot's song-request replies (titles / artists
+dropped into msg_success etc.) for
+  • automaton – the compiled Aho-Corasick filter LJB.safe_send uses
+  • loop      – one `term in text` check per term on the folded text
+  • regex     – one big alternation (re), the other "single pattern" option
+plus compile time. Some messages carry a blocked term, a few of them in
+look-alike letters.
+
+    python bench/bench_filter.py [--terms 50000] [--messages 2000]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, random, re, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.content_filter import ContentFilter, normalize  # noqa: E402
+
+TEMPLATES = ["NemuJam i queued {title} by {artist} for {user}",
+             "notCinema i couldn't queue {title} by {artist} for {user}: no results",
+             "FERAL i couldn't queue {title} by {artist} for {user}: BANNED SONG!",
+             "NemuJam now playing: {title} by {artist} (1:02/3:45)"]
+LOOKALIKE = str.maketrans("aeopcx", "аеорсх")     # Latin → Cyrillic
+
+def word(rnd: random.Random, lo: int = 2, hi: int = 4) -> str:
+    return "".join(rnd.choice("bcdfghjklmnprstvwz") + rnd.choice("aeiou") for _ in range(rnd.randint(lo, hi)))
+
+def build(a, rnd: random.Random):
+    terms = list({word(rnd, 3, 5): None for _ in range(a.terms * 2)})[:a.terms]
+    msgs = []
+    for i in range(a.messages):
+        title = " ".join(word(rnd) for _ in range(rnd.randint(1, 5))).title()
+        r = rnd.random()
+        if r < a.hit_rate:
+            t = rnd.choice(terms)
+            title += " " + (t.translate(LOOKALIKE) if r < a.hit_rate / 4 else t.upper())
+        msgs.append(rnd.choice(TEMPLATES).format(title=title, artist=word(rnd).title(), user=f"user{i % 300}"))
+    return terms, msgs
+
+def timed(fn, msgs) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    hits = sum(1 for m in msgs if fn(m))
+    return (time.perf_counter() - t0) / len(msgs) * 1e6, hits
+
+async def run(a) -> dict:
+    rnd = random.Random(a.seed)
+    terms, msgs = build(a, rnd)
+    out = {"terms": len(terms), "messages": len(msgs)}
+
+    f = ContentFilter()
+    t0 = time.perf_counter()
+    await f.set_terms(terms)
+    out["automaton_compile_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    us, hits = timed(f.spans, msgs)
+    out["automaton_us_per_msg"], out["automaton_hits"] = round(us, 1), hits
+
+    folded = [normalize(t)[0] for t in terms]
+
+    def loop(m):
+        s = normalize(m)[0]
+        return any(t in s for t in folded)
+    us, hits = timed(loop, msgs[:a.slow_messages])
+    out["loop_us_per_msg"], out["loop_hits_in_sample"] = round(us, 1), hits
+
+    t0 = time.perf_counter()
+    rx = re.compile(r"\b(?:" + "|".join(map(re.escape, folded)) + r")\b")
+    out["regex_compile_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    us, hits = timed(lambda m: rx.search(normalize(m)[0]), msgs[:a.slow_messages])
+    out["regex_us_per_msg"], out["regex_hits_in_sample"] = round(us, 1), hits
+    out["sample_for_loop_regex"] = min(a.slow_messages, len(msgs))
+    out["example"] = next((f"{m!r} → {f.apply(m)!r}" for m in msgs if f.spans(m) and not m.isascii()), None)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--terms", type=int, default=50000)
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--slow-messages", type=int, default=200, help="messages run through loop / regex")
+    ap.add_argument("--hit-rate", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    print(json.dumps(asyncio.run(run(a)), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+bench_history.py
+Sustained-rate check for the chat history ring (ljb/history.py):
+per-message append cost, query latency, and traced memory after N messages –
+memory must plateau once the ring is full, whatever N is.
+
+    python bench/bench_history.py [--messages 200000] [--capacity 5000] [--users 2000] [--log-dir DIR]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, random, sys, time, tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.history import ChatHistory  # noqa: E402
+
+WORDS = ("song request please play this banger again hello chat pog kappa lol "
+         "what is the name of this track skip next queue vibes").split()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=200_000)
+    ap.add_argument("--capacity", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--log-dir", help="also write the segment log here (default: off)")
+    a = ap.parse_args()
+
+    rnd = random.Random(1)
+    users = [f"viewer{i}" for i in range(a.users)]
+    msgs = [(rnd.choice(users), " ".join(rnd.choices(WORDS, k=rnd.randint(2, 12))))
+            for _ in range(10_000)]
+
+    # pass 1: timing only (tracemalloc would skew it)
+    h = ChatHistory(a.capacity, log_dir=a.log_dir)
+    t0 = time.perf_counter()
+    for i in range(a.messages):
+        login, text = msgs[i % len(msgs)]
+        h.append(login, login, None, text)
+    append_us = (time.perf_counter() - t0) / a.messages * 1e6
+
+    async def queries():
+        t = time.perf_counter()
+        for u in users[:1000]:
+            await h.recent(20, user=u)
+            await h.last_seen(u)
+        return (time.perf_counter() - t) / 2000 * 1e6
+    query_us = asyncio.run(queries())
+    h.close()
+
+    # pass 2: memory after the ring fills, and again much later
+    tracemalloc.start()
+    h = ChatHistory(a.capacity)
+    mem = {}
+    for i in range(a.messages):
+        login, text = msgs[i % len(msgs)]
+        h.append(login, login, None, text)
+        if i + 1 in (a.capacity, a.capacity * 4, a.messages):
+            mem[i + 1] = round(tracemalloc.get_traced_memory()[0] / 2**20, 2)
+    tracemalloc.stop()
+
+    print(json.dumps({"append_us": round(append_us, 2), "query_us": round(query_us, 2),
+                      "traced_mib_at": mem, **h.stats()}, indent=2))
+
+if __name__ == "__main__":
+    main()
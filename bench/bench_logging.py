@@ -0,0 +1,70 @@
+"""
+bench_logging.py
+Per-call latency of logging.info() as seen by the event loop:
+  • sync   – FileHandler + StreamHandler (the old setup)
+  • queued – ljb.log_setup (QueueHandler → background writer thread)
+The console is simulated by a sink that costs --console-us per write
+(a Windows console easily takes 100µs+ per line).
+usage: python bench/bench_logging.py [--calls N] [--console-us US]
+"""
+
+import argparse, logging, statistics, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ljb.log_setup import setup_logging, stop_logging, TEXT_FORMAT
+
+class SlowSink:
+    def __init__(self, cost_us: float):
+        self.cost = cost_us / 1e6
+    def write(self, s):
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+    def flush(self):
+        pass
+
+def _run(n: int) -> list[float]:
+    log = logging.getLogger("bench")
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        log.info("chat message %d from %s", i, "someone")
+        out.append((time.perf_counter() - t0) * 1e6)
+        if i % 50 == 0:
+            time.sleep(0.001)   # the loop does other work between log calls
+    return out
+
+def _report(name: str, xs: list[float]):
+    xs = sorted(xs)
+    p = lambda q: xs[min(len(xs) - 1, int(q * len(xs)))]
+    print(f"{name:<12} mean {statistics.fmean(xs):8.2f}µs  p50 {p(.5):8.2f}µs  "
+          f"p99 {p(.99):8.2f}µs  max {xs[-1]:9.2f}µs")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=5000)
+    ap.add_argument("--console-us", type=float, default=100.0)
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = logging.getLogger()
+        root.handlers.clear()
+        fh = logging.FileHandler(Path(tmp) / "sync.txt", encoding="utf-8")
+        sh = logging.StreamHandler(SlowSink(a.console_us))
+        for h in (fh, sh):
+            h.setFormatter(logging.Formatter(TEXT_FORMAT))
+            root.addHandler(h)
+        root.setLevel(logging.INFO)
+        _report("sync", _run(a.calls))
+        fh.close()
+        root.handlers.clear()
+
+        for fmt in ("text", "json"):
+            listener = setup_logging(Path(tmp) / fmt, json_format=fmt == "json")
+            listener.handlers[1].setStream(SlowSink(a.console_us))
+            _report(f"queued/{fmt}", _run(a.calls))
+            stop_logging()
+
+if __name__ == "__main__":
+    main()
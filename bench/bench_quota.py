@@ -0,0 +1,100 @@
+"""
+bench_quota.py
+Per-addon quotas (ljb/quota.py): one well-behaved addon next to one that
+floods – thousands of tasks, a burst of slow HTTP calls and a chat spam loop.
+Reports how long the good addon's reply and HTTP call take with and without
+quotas, plus the flooder's throttle / drop counters. The core is a minimal
+stand-in (Limiter + recording send, simulated 50 ms HTTP); pacing windows are
+scaled down (20 msgs / 2 s) so a run takes seconds.
+
+    python bench/bench_quota.py [--tasks 5000] [--http 200] [--spam 200]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, logging, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.quota import Quotas       # noqa: E402
+from ljb.rate_limit import Limiter  # noqa: E402
+
+class Core:
+    """Just what AddonContext uses from LJB."""
+
+    def __init__(self, burst: int, window: float, http_slots: int):
+        self.limiter = Limiter(burst, window)
+        self.sent: list[tuple[float, str]] = []
+        self.http = Http(http_slots)
+
+    async def safe_send(self, txt, channel=None, *, pace=None):
+        if pace is not None:
+            await pace.wait()
+        await self.limiter.wait()
+        self.sent.append((time.perf_counter(), txt))
+
+    def track(self, coro, replay=None):
+        return asyncio.ensure_future(coro)
+
+class Http:
+    """Connection pool of N slots, 50 ms per call."""
+
+    def __init__(self, slots: int):
+        self.pool = asyncio.Semaphore(slots)
+
+    async def request(self, method, url, **kw):
+        async with self.pool:
+            await asyncio.sleep(0.05)
+            return url
+
+async def scenario(a, quotas: bool) -> dict:
+    core = Core(20, 2.0, 10)
+    if quotas:
+        q = Quotas({"addon_quota": {"tasks": 20, "task_queue": 500, "http": 2, "chat_queue": 10}})
+        bad, good = q.context(core, "flood"), q.context(core, "good")
+    else:
+        bad = good = None
+    spawn = bad.create_task if bad else asyncio.ensure_future
+    bad_http = bad.http if bad else core.http
+    bad_send = bad.safe_send if bad else core.safe_send
+
+    async def busy():
+        await asyncio.sleep(0.5)
+    for i in range(a.http):
+        spawn(bad_http.request("GET", f"/flood/{i}"))
+    # spam from one loop of its own (a chat flood needs no task per message)
+    asyncio.ensure_future(asyncio.gather(*(bad_send(f"spam {i}") for i in range(a.spam)), return_exceptions=True))
+    for _ in range(a.tasks):
+        spawn(busy())
+    await asyncio.sleep(0.01)
+
+    t0 = time.perf_counter()
+    await (good.http if good else core.http).request("GET", "/good")
+    http_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    await (good.safe_send if good else core.safe_send)("good reply")
+    reply_ms = (time.perf_counter() - t0) * 1000
+    out = {"quotas": quotas, "good_http_ms": round(http_ms, 1), "good_reply_ms": round(reply_ms, 1)}
+    if quotas:
+        st = bad.stats()
+        out["flood"] = {k: st[k] for k in ("tasks_live", "tasks_waiting", "tasks_throttled", "tasks_dropped",
+                                           "http_throttled", "chat_throttled", "chat_dropped")}
+    for t in asyncio.all_tasks() - {asyncio.current_task()}:
+        t.cancel()
+    return out
+
+async def main_async(a):
+    return [await scenario(a, False), await scenario(a, True)]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tasks", type=int, default=5000)
+    ap.add_argument("--http", type=int, default=200)
+    ap.add_argument("--spam", type=int, default=200)
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(asyncio.run(main_async(a)), indent=2))
+
+if __name__ == "__main__":
+    main()
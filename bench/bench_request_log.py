@@ -0,0 +1,77 @@
+"""
+bench_request_log.py
+Song-request log (addons/ljb_spotify_request/request_log.py) at scale:
+bulk record()+flush throughput, then the !history / !topsongs / !songstats
+queries and a CSV export against N rows on disk.
+
+    python bench/bench_request_log.py [--rows 2000000] [--users 20000] [--tracks 50000] [--db PATH]
+"""
+
+from __future__ import annotations
+import argparse, json, random, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "addons"))
+
+from ljb_spotify_request.request_log import RequestLog  # noqa: E402
+
+def timed(fn, *args, reps: int = 20) -> float:
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn(*args)
+    return round((time.perf_counter() - t) / reps * 1000, 3)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--users", type=int, default=20_000)
+    ap.add_argument("--tracks", type=int, default=50_000)
+    ap.add_argument("--db", help="database file (default: a temp dir)")
+    a = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(a.db) if a.db else Path(tmp.name) / "song_requests.db"
+    log = RequestLog(path, flush_s=0, batch=10**9)           # flush by hand below
+    rnd = random.Random(1)
+    tracks = [{"id": f"t{i:07d}", "name": f"Song {i}", "artists": [{"name": f"Artist {i % 997}"}]}
+              for i in range(a.tracks)]
+    weights = [1 / (i + 1) for i in range(a.tracks)]           # a few hits, a long tail
+    now = time.time()
+    outcomes = ["queued"] * 8 + ["failed", "banned"]
+
+    t0 = time.perf_counter()
+    for start in range(0, a.rows, 100_000):
+        n = min(100_000, a.rows - start)
+        picks = rnd.choices(tracks, weights, k=n)
+        for i, tr in enumerate(picks):
+            log.record(f"viewer{rnd.randrange(a.users)}", tr["name"].lower(), "redeem",
+                       rnd.choice(outcomes), rnd.randint(80, 900), tr,
+                       "search", ts=now - (a.rows - start - i) * 10)
+        log.flush()
+    insert_us = (time.perf_counter() - t0) / a.rows * 1e6
+
+    t0 = time.perf_counter()
+    for i in range(1000):                                      # steady state: small batches
+        log.record("viewer1", "song 1", "sr", "queued", 100, tracks[1], "local")
+        if i % 10 == 9:
+            log.flush()
+    steady_flush_ms = round((time.perf_counter() - t0) / 100 * 1000, 3)
+
+    res = {"rows": log.stats()["rows"], "insert_us_per_row": round(insert_us, 2),
+           "flush_10_rows_ms": steady_flush_ms,
+           "history_ms": timed(log.recent, 5),
+           "history_user_ms": timed(log.recent, 5, "viewer42"),
+           "topsongs_all_ms": timed(log.top_tracks, 5),
+           "topsongs_7d_ms": timed(log.top_tracks, 5, now - 7 * 86400, reps=5),
+           "songstats_ms": timed(log.user_stats, "viewer42"),
+           "db_mib": round(sum(p.stat().st_size for p in path.parent.glob(path.name + "*")) / 2**20, 1)}
+    t0 = time.perf_counter()
+    res["csv_rows"] = log.export_csv(Path(tmp.name) / "export.csv", now - 30 * 86400)
+    res["csv_s"] = round(time.perf_counter() - t0, 2)
+    log.close()
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    main()
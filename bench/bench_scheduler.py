@@ -0,0 +1,85 @@
+"""
+bench_scheduler.py
+N periodic timers (intervals spread over --min-s..--max-s) for --seconds:
+  • loops     – one long-lived task per timer sleeping until its next run
+                (how resub_loop / announce / pollers were written)
+  • scheduler – the same timers as bot.schedule jobs (ljb/scheduler.py)
+Reports live tasks while idle, traced memory held by the timers, CPU time
+for the whole run and lateness of each run against its nominal time.
+
+    python bench/bench_scheduler.py [--timers 2000] [--seconds 5]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, random, statistics, sys, time, tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ljb.scheduler import Scheduler  # noqa: E402
+
+def pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+async def loops(intervals: list[float], late: list[float]):
+    async def timer(iv: float):
+        nxt = time.monotonic() + iv
+        while True:
+            await asyncio.sleep(max(0.0, nxt - time.monotonic()))
+            late.append(time.monotonic() - nxt)
+            nxt += iv
+    tasks = [asyncio.create_task(timer(iv)) for iv in intervals]
+    return lambda: [t.cancel() for t in tasks]
+
+async def scheduled(intervals: list[float], late: list[float]):
+    s = Scheduler()
+    now = time.monotonic()
+    for i, iv in enumerate(intervals):
+        nxt = [now + iv]
+
+        def run(iv=iv, nxt=nxt):
+            late.append(time.monotonic() - nxt[0])
+            nxt[0] += iv
+        s.every(iv, run, name=f"t{i}", first_in=nxt[0] - time.monotonic())
+    s.start()
+    return s.stop
+
+async def scenario(kind: str, a, intervals: list[float]) -> dict:
+    late: list[float] = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    stop = await (loops if kind == "loops" else scheduled)(intervals, late)
+    await asyncio.sleep(0)
+    held_kb = (tracemalloc.get_traced_memory()[0] - before) / 1024
+    tracemalloc.stop()
+    tasks = len(asyncio.all_tasks()) - 1
+    c0 = time.process_time()
+    await asyncio.sleep(a.seconds)
+    cpu = time.process_time() - c0
+    stop()
+    await asyncio.sleep(0.05)
+    return {"mode": kind, "timers": len(intervals), "live_tasks": tasks, "held_kb": round(held_kb, 1),
+            "runs": len(late), "cpu_s": round(cpu, 3),
+            "cpu_us_per_run": round(cpu / len(late) * 1e6, 1) if late else None,
+            "late_ms_p50": round(statistics.median(late) * 1000, 2) if late else None,
+            "late_ms_p99": round(pct(late, 0.99) * 1000, 2)}
+
+async def run(a) -> list[dict]:
+    rnd = random.Random(a.seed)
+    intervals = [rnd.uniform(a.min_s, a.max_s) for _ in range(a.timers)]
+    return [await scenario("loops", a, intervals), await scenario("scheduler", a, intervals)]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--timers", type=int, default=2000)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--min-s", type=float, default=0.2)
+    ap.add_argument("--max-s", type=float, default=2.0)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    print(json.dumps(asyncio.run(run(a)), indent=2))
+
+if __name__ == "__main__":
+    main()
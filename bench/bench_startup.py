@@ -0,0 +1,70 @@
+"""
+bench_startup.py
+Startup budget check – exits non-zero when a budget is exceeded.
+  entry    `import ljb.twitch_bot` in a fresh interpreter (-X importtime);
+           must stay cheap since bootstrap.py imports it before the menu
+  runtime  full startup against the local stand-ins (harness.py) in a child
+           process: import time of everything loaded until ready + RSS
+
+    python bench/bench_startup.py [--entry-ms 150] [--runtime-ms 2500] [--rss-mb 150]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, subprocess, sys, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT))
+
+def child():
+    from ljb.diagnostics import ImportTracker, rss_mb
+    tracker = ImportTracker().start()
+    sys.path.insert(0, str(HERE))
+    from harness import Harness
+
+    async def go():
+        async with Harness() as h:
+            tracker.stop()
+            return {"time_to_ready_ms": h.bot.timer.time_to_ready * 1e3,
+                    "import_ms": tracker.total_s * 1e3,
+                    "import_top_ms": {k: round(v * 1e3, 1) for k, v in tracker.top(10)},
+                    "rss_mb": rss_mb()}
+    print(json.dumps(asyncio.run(go())))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entry-ms", type=float, default=150.0, help="budget for import ljb.twitch_bot")
+    ap.add_argument("--runtime-ms", type=float, default=2500.0, help="budget for all startup imports")
+    ap.add_argument("--rss-mb", type=float, default=150.0, help="budget for RSS once ready")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    a = ap.parse_args()
+    if a.child:
+        return child()
+
+    from ljb.diagnostics import measure_imports
+    entry = measure_imports(["ljb.twitch_bot"], cwd=str(ROOT))
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, str(HERE / "bench_startup.py"), "--child"],
+                       capture_output=True, text=True, cwd=str(ROOT))
+    if p.returncode:
+        print(p.stderr)
+        sys.exit(2)
+    runtime = json.loads(p.stdout.strip().splitlines()[-1])
+    runtime["wall_ms"] = (time.perf_counter() - t0) * 1e3
+
+    checks = [
+        ("entry import", entry["total_ms"], a.entry_ms, "ms"),
+        ("runtime imports", runtime["import_ms"], a.runtime_ms, "ms"),
+        ("rss when ready", runtime["rss_mb"] or 0.0, a.rss_mb, "MiB"),
+    ]
+    print(json.dumps({"entry": entry, "runtime": runtime}, indent=2))
+    failed = False
+    for name, val, budget, unit in checks:
+        ok = val <= budget
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<16} {val:8.1f} {unit} (budget {budget:g} {unit})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+bench_track_index.py
+Lookup latency, load time and traced memory for the Spotify addon's local
+track index (addons/ljb_spotify_request/track_index.py) on a synthetic
+catalogue, plus how many misspelt repeat requests it answers locally.
+
+    python bench/bench_track_index.py [--tracks 50000] [--queries 5000]
+"""
+
+from __future__ import annotations
+import argparse, json, random, sys, time, tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "addons"))
+
+from ljb.store import Store                               # noqa: E402
+from ljb_spotify_request.track_index import TrackIndex    # noqa: E402
+
+SYLL = "ka lo mi ra ne to su vi da ze pa ri mo la fe no".split()
+
+def word(rnd):
+    return "".join(rnd.choices(SYLL, k=rnd.randint(2, 4)))
+
+def typo(rnd, s):
+    i = rnd.randrange(len(s))
+    return s[:i] + s[i + 1:] if s[i] != " " else s
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tracks", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=5000)
+    a = ap.parse_args()
+
+    rnd = random.Random(1)
+    artists = [" ".join(word(rnd) for _ in range(rnd.randint(1, 2))).title() for _ in range(a.tracks // 10)]
+    tracks = [{"id": f"t{i:07d}", "uri": f"spotify:track:t{i:07d}",
+               "name": " ".join(word(rnd) for _ in range(rnd.randint(1, 5))).title(),
+               "artists": [{"name": rnd.choice(artists)}]} for i in range(a.tracks)]
+
+    store = Store()
+    tracemalloc.start()
+    ix = TrackIndex(store.addon("bench.tracks"), store.addon("bench.aliases"))
+    for t in tracks:
+        ix.add(t)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    TrackIndex(store.addon("bench.tracks"), store.addon("bench.aliases")).load()
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    picks = rnd.choices(tracks, k=a.queries)
+    queries = [(t, typo(rnd, f"{t['name']} {t['artists'][0]['name']}".lower())) for t in picks]
+    right = wrong = 0
+    t0 = time.perf_counter()
+    for t, q in queries:
+        hit = ix.lookup(q)
+        if hit is not None:
+            right += hit["id"] == t["id"]
+            wrong += hit["id"] != t["id"]
+    lookup_us = (time.perf_counter() - t0) / a.queries * 1e6
+    store.close()
+
+    print(json.dumps({"lookup_us": round(lookup_us, 1), "load_ms": round(load_ms, 1),
+                      "traced_mib": round(traced / 2**20, 2),
+                      "local_right": right, "local_wrong": wrong,
+                      "to_spotify": a.queries - right - wrong, **ix.stats()}, indent=2))
+
+if __name__ == "__main__":
+    main()
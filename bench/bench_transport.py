@@ -0,0 +1,90 @@
+"""
+bench_transport.py
+Outbound chat transports (ljb/transport.py) against the local stand-ins:
+sustained messages/s and send→delivery latency for IRC only, Helix only and
+"auto" (both budgets), then a failover run where Helix starts answering 500
+after 1.5 windows. Pacing windows are scaled down (default 20 msgs / 3 s
+instead of / 30 s) so a run takes seconds; the ratios are what matter.
+The bot's Limiter paces IRC, chat_helix_rate paces Helix. Every mode must
+deliver every message (exit 1 otherwise).
+
+    python bench/bench_transport.py [--messages 200] [--burst 20] [--window 3]
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, statistics, sys, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from harness import Harness  # noqa: E402
+
+async def run(mode: str, n: int, burst: int, window: float, fail_helix_after: float | None = None) -> dict:
+    from ljb.rate_limit import Limiter
+    from twitchio import abcs
+    abcs.limiter.buckets.clear()                  # twitchio's IRC buckets are per process, not per bot
+    async with Harness(addons=False, limiter=Limiter(burst, window),
+                       cfg={"chat_transport": mode, "chat_helix_rate": [burst, window]}) as h:
+        tw = h.fakes.twitch
+        await asyncio.sleep(0.5)                  # let the "i'm alive!" ping through
+        base_irc, base_helix = len(tw.irc_out), len(tw.helix_chat)
+        sent_at: dict[str, float] = {}
+        errors: dict[str, int] = {}
+
+        async def one(i: int):
+            txt = f"bench {mode} {i}"
+            sent_at[txt] = time.perf_counter()
+            try:
+                await h.bot.safe_send(txt)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+        if fail_helix_after is not None:
+            asyncio.get_running_loop().call_later(fail_helix_after, setattr, tw, "chat_status", 500)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        try:
+            await tw.irc_out.wait_for(
+                lambda _: len(tw.irc_out) - base_irc + len(tw.helix_chat) - base_helix >= n,
+                timeout=window * 4 + 10)
+        except asyncio.TimeoutError:
+            pass
+        got = [(ts, m) for ts, m in tw.irc_out.items[base_irc:] + tw.helix_chat.items[base_helix:]
+               if m in sent_at]
+        lat = sorted((ts - sent_at[m]) * 1000 for ts, m in got)
+        span = max(ts for ts, _ in got) - t0 if got else 0.0
+        st = h.bot.chat.stats()
+        return {"mode": mode, "sent": n, "delivered": len(got),
+                "via_irc": len(tw.irc_out) - base_irc, "via_helix": len(tw.helix_chat) - base_helix,
+                "msgs_per_s": round(len(got) / span, 2) if span else None,
+                "latency_ms_p50": round(statistics.median(lat), 1) if lat else None,
+                "latency_ms_max": round(lat[-1], 1) if lat else None,
+                "failovers": st["failovers"], "send_errors": errors,
+                "irc_held": st["irc"]["held"], "irc_failed": st["irc"]["failed"],
+                "helix_held": st["helix"]["held"], "helix_failed": st["helix"]["failed"],
+                "helix_available": st["helix"]["available"]}
+
+async def main_async(a) -> list[dict]:
+    out = []
+    for mode in ("irc", "helix", "auto"):
+        out.append(await run(mode, a.messages, a.burst, a.window))
+    out.append({**await run("helix", a.messages, a.burst, a.window, fail_helix_after=a.window * 1.5),
+                "mode": "helix→irc failover"})
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--burst", type=int, default=20)
+    ap.add_argument("--window", type=float, default=3.0)
+    a = ap.parse_args()
+    res = asyncio.run(main_async(a))
+    print(json.dumps(res, indent=2))
+    short = [f"{r['mode']}: delivered {r['delivered']}/{r['sent']}" for r in res if r["delivered"] != r["sent"]]
+    if short:
+        sys.exit("FAIL – " + "; ".join(short))
+
+if __name__ == "__main__":
+    main()
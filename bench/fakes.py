@@ -0,0 +1,448 @@
+"""
+fakes.py
+Local stand-ins for every remote service the bot uses, all served by one
+aiohttp app on 127.0.0.1:
+  /irc                 Twitch IRC over websocket (welcome, CAP, JOIN, PING, PRIVMSG)
+  /eventsub            EventSub websocket (welcome, keepalive, notification, reconnect)
+  /oauth2/...          Twitch id.twitch.tv (token, validate)
+  /helix/...           Helix (users, eventsub/subscriptions, chat/messages)
+  /spotify-accounts/…  accounts.spotify.com (api/token)
+  /spotify/v1/...      api.spotify.com (search, tracks, me/player/queue, me/player)
+Every inbound call is recorded with a perf_counter timestamp so benchmarks
+can measure latency between an injected event and the resulting request.
+"""
+
+from __future__ import annotations
+import asyncio, hashlib, itertools, json, time, uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from aiohttp import web, WSMsgType
+
+SCOPES = [
+    "chat:read", "chat:edit", "channel:read:redemptions", "channel:moderate",
+    "user:write:chat", "user:bot", "channel:bot", "moderator:read:followers",
+]
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+class Recorder:
+    """Append-only list of (perf_counter, item) with awaitable predicates."""
+
+    def __init__(self):
+        self.items: list[tuple[float, object]] = []
+        self._cond = asyncio.Condition()
+
+    async def add(self, item):
+        async with self._cond:
+            self.items.append((time.perf_counter(), item))
+            self._cond.notify_all()
+
+    async def wait_for(self, pred, timeout: float = 10.0):
+        """Wait until pred(items) is truthy; returns its value."""
+        async def _w():
+            async with self._cond:
+                while not (res := pred(self.items)):
+                    await self._cond.wait()
+                return res
+        return await asyncio.wait_for(_w(), timeout)
+
+    async def wait_count(self, n: int, timeout: float = 10.0):
+        return await self.wait_for(lambda xs: len(xs) >= n, timeout)
+
+    def __len__(self):
+        return len(self.items)
+
+def fake_track(query: str) -> dict:
+    tid = hashlib.sha1(query.lower().encode()).hexdigest()[:22]
+    title, _, artist = query.partition(" by ")
+    return {
+        "id": tid, "uri": f"spotify:track:{tid}", "name": title.strip() or query,
+        "artists": [{"name": artist.strip() or "Fake Artist"}],
+        "duration_ms": 180_000, "album": {"name": "Fake Album"},
+    }
+
+@dataclass
+class FakeTwitch:
+    channel: str = "fakechannel"
+    bot_nick: str = "liljuicerbot"
+    users: dict = field(default_factory=dict)           # login -> user dict
+    irc_sockets: list = field(default_factory=list)
+    es_sockets: dict = field(default_factory=dict)      # session_id -> ws
+    conns: dict = field(default_factory=dict)           # ws -> TCP transport (for hard drops)
+    subs: dict = field(default_factory=dict)            # sub id -> sub dict
+    keepalive_s: int = 10
+    latency_s: float = 0.0      # artificial latency for OAuth/Helix calls
+    chat_status: int = 200      # answer Send Chat Message with this (e.g. 500 to force failover)
+    chat_bucket: int = 800      # Helix points per minute for Send Chat Message
+
+    def __post_init__(self):
+        self.irc_in     = Recorder()   # every raw line the bot sent
+        self.irc_out    = Recorder()   # PRIVMSGs the bot sent: text
+        self.irc_joins  = Recorder()
+        self.es_welcome = Recorder()   # session ids
+        self.sub_calls  = Recorder()   # subscription create calls
+        self.helix_chat = Recorder()   # Helix Send Chat Message bodies
+        self.helix_calls = Recorder()  # (method, path) for every Helix hit
+        self._ids = itertools.count(1000)
+        self._chat_window: list[float] = []
+        for login in (self.channel, self.bot_nick):
+            self.user(login)
+
+    def user(self, login: str) -> dict:
+        login = login.lower()
+        if login not in self.users:
+            uid = str(next(self._ids))
+            self.users[login] = {
+                "id": uid, "login": login, "display_name": login.title(),
+                "type": "", "broadcaster_type": "", "description": "",
+                "profile_image_url": "", "offline_image_url": "",
+                "view_count": 0, "created_at": "2020-01-01T00:00:00Z",
+            }
+        return self.users[login]
+
+    # ── IRC ─────────────────────────────────────────────────────────────
+    async def irc_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.irc_sockets.append(ws)
+        self.conns[ws] = request.transport
+        nick = self.bot_nick
+        try:
+            async for m in ws:
+                if m.type != WSMsgType.TEXT:
+                    continue
+                for line in m.data.split("\r\n"):
+                    if not line:
+                        continue
+                    await self.irc_in.add(line)
+                    cmd, _, rest = line.partition(" ")
+                    if cmd == "NICK":
+                        nick = rest.strip()
+                        for code, text in (("001", "Welcome, GLHF!"), ("002", "Your host is tmi.twitch.tv"),
+                                           ("003", "This server is rather new"), ("004", "-"),
+                                           ("375", "-"), ("372", "You are in a maze of twisty passages."),
+                                           ("376", ">")):
+                            await ws.send_str(f":tmi.twitch.tv {code} {nick} :{text}\r\n")
+                    elif cmd == "CAP":
+                        await ws.send_str(f":tmi.twitch.tv CAP * ACK :{rest.split(':', 1)[-1]}\r\n")
+                    elif cmd == "PING":
+                        await ws.send_str("PONG :tmi.twitch.tv\r\n")
+                    elif cmd == "JOIN":
+                        for ch in rest.strip().split(","):
+                            ch = ch.strip()
+                            await ws.send_str(f":{nick}!{nick}@{nick}.tmi.twitch.tv JOIN {ch}\r\n")
+                            await ws.send_str(f":{nick}.tmi.twitch.tv 353 {nick} = {ch} :{nick}\r\n")
+                            await ws.send_str(f":{nick}.tmi.twitch.tv 366 {nick} {ch} :End of /NAMES list\r\n")
+                            await ws.send_str(
+                                f"@badge-info=;badges=;color=;display-name={nick};emote-sets=0;mod=0;"
+                                f"subscriber=0;user-type= :tmi.twitch.tv USERSTATE {ch}\r\n")
+                            await ws.send_str(
+                                f"@emote-only=0;followers-only=-1;r9k=0;room-id={self.user(self.channel)['id']};"
+                                f"slow=0;subs-only=0 :tmi.twitch.tv ROOMSTATE {ch}\r\n")
+                            await self.irc_joins.add(ch)
+                    elif cmd == "PRIVMSG":
+                        await self.irc_out.add(rest.split(" :", 1)[-1])
+        finally:
+            if ws in self.irc_sockets:
+                self.irc_sockets.remove(ws)
+            self.conns.pop(ws, None)
+        return ws
+
+    def privmsg_line(self, login: str, text: str, *, mod: bool = False, badges: str = "") -> str:
+        u = self.user(login)
+        if mod and "moderator" not in badges:
+            badges = ",".join(filter(None, [badges, "moderator/1"]))
+        tags = (f"@badge-info=;badges={badges};color=;display-name={u['display_name']};emotes=;"
+                f"first-msg=0;flags=;id={uuid.uuid4()};mod={int(mod)};"
+                f"room-id={self.user(self.channel)['id']};subscriber=0;"
+                f"tmi-sent-ts={int(time.time() * 1000)};turbo=0;user-id={u['id']};user-type=")
+        return f"{tags} :{login}!{login}@{login}.tmi.twitch.tv PRIVMSG #{self.channel} :{text}\r\n"
+
+    async def chat(self, login: str, text: str, **kw):
+        """Inject one chat line to every connected IRC client."""
+        line = self.privmsg_line(login, text, **kw)
+        for ws in list(self.irc_sockets):
+            await ws.send_str(line)
+
+    def _cut(self, ws):
+        """Lost connection: the TCP socket goes away without a close handshake."""
+        if ws in self.irc_sockets:
+            self.irc_sockets.remove(ws)          # nothing more is sent on it
+        t = self.conns.pop(ws, None)
+        if t is not None:
+            t.abort()
+
+    async def drop_irc(self):
+        for ws in list(self.irc_sockets):
+            self._cut(ws)
+
+    # ── EventSub websocket ──────────────────────────────────────────────
+    async def eventsub_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sid = request.query.get("session") or uuid.uuid4().hex
+        self.es_sockets[sid] = ws
+        self.conns[ws] = request.transport
+        await ws.send_json({
+            "metadata": {"message_id": uuid.uuid4().hex, "message_type": "session_welcome",
+                         "message_timestamp": _now_iso()},
+            "payload": {"session": {"id": sid, "status": "connected", "connected_at": _now_iso(),
+                                    "keepalive_timeout_seconds": self.keepalive_s,
+                                    "reconnect_url": None}},
+        })
+        await self.es_welcome.add(sid)
+
+        async def keepalive():
+            while not ws.closed:
+                await asyncio.sleep(self.keepalive_s * 0.8)
+                if not ws.closed:
+                    await ws.send_json({
+                        "metadata": {"message_id": uuid.uuid4().hex, "message_type": "session_keepalive",
+                                     "message_timestamp": _now_iso()},
+                        "payload": {}})
+        ka = asyncio.create_task(keepalive())
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            ka.cancel()
+            self._end_session(sid, ws)
+            self.conns.pop(ws, None)
+        return ws
+
+    async def notify(self, sub_type: str, event: dict) -> int:
+        """Send a notification for every live subscription of sub_type; returns count."""
+        n = 0
+        for sub in list(self.subs.values()):
+            if sub["type"] != sub_type:
+                continue
+            ws = self.es_sockets.get(sub["transport"]["session_id"])
+            if ws is None or ws.closed:
+                continue
+            await ws.send_json({
+                "metadata": {"message_id": uuid.uuid4().hex, "message_type": "notification",
+                             "message_timestamp": _now_iso(),
+                             "subscription_type": sub_type, "subscription_version": sub["version"]},
+                "payload": {"subscription": sub, "event": event},
+            })
+            n += 1
+        return n
+
+    def redemption_event(self, login: str, reward_title: str, user_input: str) -> dict:
+        u, b = self.user(login), self.user(self.channel)
+        return {
+            "id": uuid.uuid4().hex,
+            "broadcaster_user_id": b["id"], "broadcaster_user_login": b["login"],
+            "broadcaster_user_name": b["display_name"],
+            "user_id": u["id"], "user_login": u["login"], "user_name": u["display_name"],
+            "user_input": user_input, "status": "unfulfilled",
+            "reward": {"id": "reward-1", "title": reward_title, "cost": 100, "prompt": ""},
+            "redeemed_at": _now_iso(),
+        }
+
+    async def redeem(self, login: str, reward_title: str, user_input: str) -> int:
+        return await self.notify("channel.channel_points_custom_reward_redemption.add",
+                                 self.redemption_event(login, reward_title, user_input))
+
+    async def eventsub_reconnect(self, base_url: str):
+        """Ask every client to move to a new connection (session_reconnect)."""
+        for sid, ws in list(self.es_sockets.items()):
+            await ws.send_json({
+                "metadata": {"message_id": uuid.uuid4().hex, "message_type": "session_reconnect",
+                             "message_timestamp": _now_iso()},
+                "payload": {"session": {"id": sid, "status": "reconnecting", "connected_at": _now_iso(),
+                                        "keepalive_timeout_seconds": None,
+                                        "reconnect_url": f"{base_url}?session={sid}"}},
+            })
+
+    def _end_session(self, sid: str, ws):
+        # like Twitch: a session that is gone (not handed over) takes its subscriptions along
+        if self.es_sockets.get(sid) is ws:
+            del self.es_sockets[sid]
+            for sub_id in [k for k, v in self.subs.items() if v["transport"]["session_id"] == sid]:
+                del self.subs[sub_id]
+
+    async def drop_eventsub(self):
+        for sid, ws in list(self.es_sockets.items()):
+            self._end_session(sid, ws)
+            self._cut(ws)
+
+    # ── OAuth + Helix ──────────────────────────────────────────────────
+    @web.middleware
+    async def lag(self, request, handler):
+        if self.latency_s and not request.path.startswith(("/irc", "/eventsub", "/spotify")):
+            await asyncio.sleep(self.latency_s)
+        return await handler(request)
+
+    async def oauth_token(self, request):
+        return web.json_response({
+            "access_token": uuid.uuid4().hex, "refresh_token": uuid.uuid4().hex,
+            "expires_in": 14400, "scope": SCOPES, "token_type": "bearer",
+        })
+
+    async def oauth_validate(self, request):
+        if not request.headers.get("Authorization"):
+            return web.json_response({"status": 401, "message": "missing authorization token"}, status=401)
+        bot = self.user(self.bot_nick)
+        return web.json_response({
+            "client_id": "fake-client-id", "login": bot["login"], "user_id": bot["id"],
+            "scopes": SCOPES, "expires_in": 14400,
+        })
+
+    async def helix_users(self, request):
+        await self.helix_calls.add(("GET", "/users"))
+        out = [self.user(l) for l in request.query.getall("login", [])]
+        ids = set(request.query.getall("id", []))
+        out += [u for u in self.users.values() if u["id"] in ids]
+        return web.json_response({"data": out})
+
+    async def helix_eventsub_create(self, request):
+        body = await request.json()
+        await self.helix_calls.add(("POST", "/eventsub/subscriptions"))
+        sub = {
+            "id": uuid.uuid4().hex, "status": "enabled", "type": body["type"],
+            "version": body.get("version", "1"), "condition": body.get("condition", {}),
+            "transport": {"method": "websocket",
+                          "session_id": body.get("transport", {}).get("session_id"),
+                          "connected_at": _now_iso()},
+            "created_at": _now_iso(), "cost": 0,
+        }
+        self.subs[sub["id"]] = sub
+        await self.sub_calls.add(sub)
+        return web.json_response({"data": [sub], "total": len(self.subs),
+                                  "total_cost": 0, "max_total_cost": 10}, status=202)
+
+    async def helix_eventsub_delete(self, request):
+        self.subs.pop(request.query.get("id"), None)
+        return web.Response(status=204)
+
+    async def helix_eventsub_list(self, request):
+        return web.json_response({"data": list(self.subs.values()), "total": len(self.subs),
+                                  "total_cost": 0, "max_total_cost": 10, "pagination": {}})
+
+    async def helix_chat_message(self, request):
+        body = await request.json()
+        await self.helix_calls.add(("POST", "/chat/messages"))
+        if self.chat_status != 200:
+            return web.json_response({"status": self.chat_status, "message": "fake failure"},
+                                     status=self.chat_status)
+        now = time.time()
+        self._chat_window = [t for t in self._chat_window if now - t < 60]
+        reset = str(int((self._chat_window[0] if self._chat_window else now) + 60))
+        if len(self._chat_window) >= self.chat_bucket:
+            return web.json_response({"status": 429, "message": "Too Many Requests"}, status=429,
+                                     headers={"Ratelimit-Remaining": "0", "Ratelimit-Reset": reset})
+        self._chat_window.append(now)
+        await self.helix_chat.add(body.get("message", ""))
+        return web.json_response({"data": [{"message_id": uuid.uuid4().hex, "is_sent": True}]},
+                                 headers={"Ratelimit-Limit": str(self.chat_bucket), "Ratelimit-Reset": reset,
+                                          "Ratelimit-Remaining": str(self.chat_bucket - len(self._chat_window))})
+
+@dataclass
+class FakeSpotify:
+    latency_s: float = 0.0      # artificial server-side latency per call
+
+    def __post_init__(self):
+        self.queued   = Recorder()   # track uris queued
+        self.searches = Recorder()
+        self.calls    = Recorder()
+        self.playing: dict | None = None
+        self.progress_ms = 0
+        self.is_playing = False
+
+    async def _lag(self, name: str):
+        await self.calls.add(name)
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    async def token(self, request):
+        await self._lag("token")
+        return web.json_response({"access_token": uuid.uuid4().hex, "token_type": "Bearer",
+                                  "expires_in": 3600, "refresh_token": uuid.uuid4().hex})
+
+    async def search(self, request):
+        await self._lag("search")
+        q = request.query.get("q", "")
+        await self.searches.add(q)
+        return web.json_response({"tracks": {"items": [fake_track(q)] if q else []}})
+
+    async def track(self, request):
+        await self._lag("track")
+        tid = request.match_info["tid"]
+        t = fake_track(tid)
+        t["id"], t["uri"] = tid, f"spotify:track:{tid}"
+        return web.json_response(t)
+
+    async def queue(self, request):
+        await self._lag("queue")
+        await self.queued.add(request.query.get("uri"))
+        return web.Response(status=204)
+
+    async def player(self, request):
+        await self._lag("player")
+        if not self.playing:
+            return web.Response(status=204)
+        return web.json_response({"is_playing": self.is_playing, "progress_ms": self.progress_ms,
+                                  "item": self.playing, "timestamp": int(time.time() * 1000)})
+
+class Fakes:
+    """Start/stop all stand-ins; .urls maps ljb.endpoints keys to local URLs."""
+
+    def __init__(self, channel: str = "fakechannel", bot_nick: str = "liljuicerbot"):
+        self.twitch  = FakeTwitch(channel=channel, bot_nick=bot_nick)
+        self.spotify = FakeSpotify()
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    def _app(self) -> web.Application:
+        t, s = self.twitch, self.spotify
+        app = web.Application(middlewares=[t.lag])
+        app.router.add_get("/irc", t.irc_ws)
+        app.router.add_get("/eventsub", t.eventsub_ws)
+        app.router.add_post("/oauth2/token", t.oauth_token)
+        app.router.add_get("/oauth2/validate", t.oauth_validate)
+        app.router.add_get("/helix/users", t.helix_users)
+        app.router.add_post("/helix/eventsub/subscriptions", t.helix_eventsub_create)
+        app.router.add_delete("/helix/eventsub/subscriptions", t.helix_eventsub_delete)
+        app.router.add_get("/helix/eventsub/subscriptions", t.helix_eventsub_list)
+        app.router.add_post("/helix/chat/messages", t.helix_chat_message)
+        app.router.add_post("/spotify-accounts/api/token", s.token)
+        app.router.add_get("/spotify/v1/search", s.search)
+        app.router.add_get("/spotify/v1/tracks/{tid}", s.track)
+        app.router.add_post("/spotify/v1/me/player/queue", s.queue)
+        app.router.add_get("/spotify/v1/me/player", s.player)
+        return app
+
+    async def start(self) -> "Fakes":
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        for ws in [*self.twitch.irc_sockets, *self.twitch.es_sockets.values()]:
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    @property
+    def base(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    @property
+    def urls(self) -> dict:
+        return {
+            "TWITCH_ID":        f"http://{self.base}",
+            "TWITCH_HELIX":     f"http://{self.base}/helix",
+            "TWITCH_IRC":       f"ws://{self.base}/irc",
+            "TWITCH_EVENTSUB":  f"ws://{self.base}/eventsub",
+            "SPOTIFY_ACCOUNTS": f"http://{self.base}/spotify-accounts",
+            "SPOTIFY_API":      f"http://{self.base}/spotify",
+        }
+
+    def dumps(self) -> str:
+        return json.dumps(self.urls, indent=2)
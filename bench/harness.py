@@ -0,0 +1,114 @@
+"""
+harness.py
+Boots the local stand-ins (fakes.py) and the *real* LJB + addons against them.
+
+    async with Harness() as h:
+        await h.fakes.twitch.chat("viewer", "!sr some song")
+        ...
+
+Addons are copied to a temp dir and run against a temp state store (with
+pre-seeded Spotify tokens) so nothing in the working tree is touched.
+"""
+
+from __future__ import annotations
+import asyncio, json, os, shutil, sys, tempfile, time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fakes import Fakes  # noqa: E402  (bench/ is on sys.path when run as a script)
+
+def fake_message(login: str, content: str, *, mod: bool = False, broadcaster: bool = False):
+    """Just enough of a twitchio Message for LJB.event_message and the addons."""
+    author = SimpleNamespace(name=login, display_name=login.title(), is_mod=mod,
+                             is_broadcaster=broadcaster, id=None, badges={})
+    return SimpleNamespace(echo=False, author=author, content=content, tags={}, channel=None)
+
+class Harness:
+    def __init__(self, *, addons: bool = True, limiter=None, cfg: dict | None = None,
+                 ready_timeout: float = 30.0, net_latency: float = 0.0):
+        self.with_addons   = addons
+        self.limiter       = limiter
+        self.extra_cfg     = cfg or {}
+        self.ready_timeout = ready_timeout
+        self.fakes   = Fakes()
+        self.fakes.twitch.latency_s = net_latency
+        self.bot     = None
+        self.store   = None
+        self.tmp     = None
+        self.t_ready = None
+        self._task   = None
+
+    async def __aenter__(self) -> "Harness":
+        await self.fakes.start()
+        os.environ.update({
+            "CLIENT_ID": "fake-client-id", "CLIENT_SECRET": "fake-secret",
+            "BOT_ACCESS_TOKEN": "fake-bot-token", "BOT_REFRESH_TOKEN": "fake-bot-refresh",
+        })
+        from ljb import endpoints
+        endpoints.configure(**self.fakes.urls)
+        endpoints.patch_twitchio()
+
+        from ljb.startup import run_bot
+        from ljb.rate_limit import Limiter
+        from twitchAPI.type import AuthScope
+
+        self.tmp = Path(tempfile.mkdtemp(prefix="ljb_bench_"))
+        addons_dir = self.tmp / "addons"
+        addons_dir.mkdir()
+        if self.with_addons:
+            for src in (ROOT / "addons").iterdir():
+                if src.name.startswith("ljb_") and (src / "addon.py").exists():
+                    dst = addons_dir / src.name
+                    shutil.copytree(src, dst, ignore=shutil.ignore_patterns("addon_tokens.json", "*.db*"))
+                    acfg = dst / "addon_config.json"
+                    if acfg.exists():      # no overlay HTTP server during benchmarks
+                        acfg.write_text(json.dumps({**json.loads(acfg.read_text()), "overlay_port": 0}))
+        from ljb.store import Store
+        self.store = Store(self.tmp / "state.db")
+        self.store.addon("ljb_spotify_request").update({"tokens": {
+            "access_token": "fake-spotify", "refresh_token": "fake-spotify-refresh",
+            "expires_at": time.time() + 86400}})
+        cfg = {
+            "streamer_access_token": "fake-streamer", "streamer_refresh_token": "fake-streamer-refresh",
+            "twitch_channel": self.fakes.twitch.channel, "bot_nick": self.fakes.twitch.bot_nick,
+            "chat_helix_rate": [10**6, 30],
+            "shutdown_drain_s": 2,          # benches wait for their own deliveries
+            **self.extra_cfg,
+        }
+        core = [AuthScope.CHAT_READ, AuthScope.CHAT_EDIT, AuthScope.CHANNEL_READ_REDEMPTIONS]
+        t0 = time.perf_counter()
+        self._task = asyncio.create_task(run_bot(
+            cfg, addons_dir, lambda c: None, core, t0=t0,
+            limiter=self.limiter or Limiter(burst=10**6, window=30),
+            on_bot=lambda b: setattr(self, "bot", b), store=self.store,
+        ))
+        await self.wait_ready()
+        self.t_ready = time.perf_counter() - t0
+        return self
+
+    async def wait_ready(self):
+        """event_ready registers !lilhelp as its very last step."""
+        end = time.perf_counter() + self.ready_timeout
+        while self.bot is None or "lilhelp" not in self.bot.cmds:
+            if self._task.done():
+                self._task.result()
+            if time.perf_counter() > end:
+                raise TimeoutError("bot did not become ready")
+            await asyncio.sleep(0.01)
+
+    async def __aexit__(self, *exc):
+        try:
+            if self.bot:
+                await self.bot.shutdown()
+            if self._task:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+        finally:
+            await self.fakes.stop()
+            if self.store:
+                self.store.close()
+            if self.tmp:
+                shutil.rmtree(self.tmp, ignore_errors=True)
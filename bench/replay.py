@@ -0,0 +1,220 @@
+"""
+replay.py
+Chat-log replay load generator for capacity testing.
+Feeds recorded (or synthetic) traffic into the real LJB + addons running
+against the local stand-ins (fakes.py):
+  • chat lines  → LJB.event_message (directly, or over the fake IRC socket)
+  • redemptions → fake EventSub websocket → the addons' EventSub callbacks
+
+    python bench/replay.py logs/capture.jsonl --speed 4
+    python bench/replay.py logs/bot_2024-05-01.txt.gz --speed max --users 500
+    python bench/replay.py --synthetic 20000 --rate 50 --mix "chat=.85,sr=.1,redeem=.04,lilhelp=.01"
+
+Inputs: JSONL captures written by the bot ("capture_file" in config.json,
+see ljb/capture.py) or its own logs/bot_*.txt[.gz] / *.jsonl logs.
+Reports achieved throughput, latency percentiles, queue depths and drops.
+"""
+
+from __future__ import annotations
+import argparse, asyncio, hashlib, json, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import Harness, fake_message, ROOT  # noqa: E402
+from fakes import fake_track                      # noqa: E402
+from run_offline import summary_ms                # noqa: E402
+from ljb.capture import read_events               # noqa: E402
+
+def parse_mix(s: str) -> dict[str, float]:
+    out = {}
+    for part in filter(None, s.split(",")):
+        k, _, v = part.partition("=")
+        out[k.strip()] = float(v or 1)
+    total = sum(out.values()) or 1
+    return {k: v / total for k, v in out.items()}
+
+def synthetic(n: int, rate: float, users: int, mix: dict[str, float], mod_share: float,
+              reward: str, seed: int = 1) -> list[dict]:
+    rnd   = random.Random(seed)
+    kinds = list(mix)
+    w     = [mix[k] for k in kinds]
+    out, t = [], 0.0
+    for i in range(n):
+        t += rnd.expovariate(rate)
+        u = rnd.randrange(users)
+        user = f"user{u}"
+        kind = rnd.choices(kinds, w)[0]
+        if kind == "redeem":
+            out.append({"t": t, "kind": "redeem", "user": user, "reward": reward,
+                        "input": f"song {rnd.randrange(5000)} by artist {rnd.randrange(300)}"})
+        elif kind == "chat":
+            out.append({"t": t, "kind": "chat", "user": user, "text": f"message {i} Kappa",
+                        "mod": u < users * mod_share, "broadcaster": False})
+        else:
+            arg = f" song {rnd.randrange(5000)} by artist {rnd.randrange(300)}" if kind == "sr" else ""
+            out.append({"t": t, "kind": "chat", "user": user, "text": f"!{kind}{arg}",
+                        "mod": u < users * mod_share, "broadcaster": False})
+    return out
+
+def remap_users(events: list[dict], users: int) -> list[dict]:
+    def m(u):
+        return f"user{int(hashlib.md5(str(u).encode()).hexdigest(), 16) % users}"
+    return [{**e, "user": m(e.get("user"))} for e in events]
+
+class Meter:
+    """Wraps bot.safe_send and samples queue depths while the replay runs."""
+
+    def __init__(self, h: Harness):
+        self.h = h
+        self.handler_lat: list[float] = []
+        self.redeem_lat: list[float] = []
+        self.handler_errors = 0
+        self.in_flight = 0
+        self.sends_started = self.sends_done = self.sends_failed = 0
+        self.sends_in_flight = 0
+        self.send_errors: dict[str, int] = {}              # exception type -> count
+        self.samples: list[tuple[int, int, float]] = []   # (handlers, sends, loop lag s)
+        self._orig_send = h.bot.safe_send
+        h.bot.safe_send = self.safe_send
+
+    async def safe_send(self, txt: str, channel: str | None = None, **kw):
+        self.sends_started += 1
+        self.sends_in_flight += 1
+        try:
+            await self._orig_send(txt, channel, **kw)     # pace= from an AddonContext
+            self.sends_done += 1
+        except Exception as e:
+            self.sends_failed += 1
+            k = type(e).__name__
+            self.send_errors[k] = self.send_errors.get(k, 0) + 1
+            raise
+        finally:
+            self.sends_in_flight -= 1
+
+    async def run_handler(self, coro):
+        self.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await coro
+        except Exception:
+            self.handler_errors += 1
+        finally:
+            self.in_flight -= 1
+            self.handler_lat.append(time.perf_counter() - t0)
+
+    async def sampler(self, every: float = 0.05):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(every)
+            lag = time.perf_counter() - t0 - every
+            self.samples.append((self.in_flight, self.sends_in_flight, max(lag, 0.0)))
+
+def _depth(xs: list[int]) -> dict:
+    return {"max": max(xs, default=0), "mean": sum(xs) / len(xs) if xs else 0}
+
+async def replay(events: list[dict], *, speed: float, via: str, drain_s: float,
+                 limiter_burst: int | None) -> dict:
+    from ljb.rate_limit import Limiter
+    limiter = Limiter(burst=limiter_burst) if limiter_burst else Limiter(burst=10**6)
+    async with Harness(limiter=limiter) as h:
+        tw, sp = h.fakes.twitch, h.fakes.spotify
+        meter   = Meter(h)
+        sampler = asyncio.create_task(meter.sampler())
+        pending_uris: dict[str, float] = {}
+        tasks: set[asyncio.Task] = set()
+
+        t_first = events[0]["t"] if events else 0.0
+        start   = time.perf_counter()
+        for i, e in enumerate(events):
+            if speed > 0:
+                delay = (e["t"] - t_first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 200 == 0:
+                await asyncio.sleep(0)
+            if e["kind"] == "chat":
+                if via == "irc":
+                    await tw.chat(e["user"], e["text"], mod=bool(e.get("mod")))
+                else:
+                    msg = fake_message(e["user"], e["text"], mod=bool(e.get("mod")),
+                                       broadcaster=bool(e.get("broadcaster")))
+                    t = asyncio.create_task(meter.run_handler(h.bot.event_message(msg)))
+                    tasks.add(t)
+                    t.add_done_callback(tasks.discard)
+            else:
+                pending_uris[fake_track(e.get("input", ""))["uri"]] = time.perf_counter()
+                await tw.redeem(e["user"], e.get("reward") or "", e.get("input", ""))
+        injected_s = time.perf_counter() - start
+
+        # let handlers + outbound messages drain
+        end = time.perf_counter() + drain_s
+        while (tasks or meter.sends_in_flight) and time.perf_counter() < end:
+            await asyncio.sleep(0.05)
+        total_s = time.perf_counter() - start
+        sampler.cancel()
+
+        for t, uri in sp.queued.items:
+            if uri in pending_uris:
+                meter.redeem_lat.append(t - pending_uris.pop(uri))
+
+        n_chat = sum(1 for e in events if e["kind"] == "chat")
+        return {
+            "events": len(events), "chat": n_chat, "redemptions": len(events) - n_chat,
+            "speed": speed or "max", "via": via,
+            "inject_s": injected_s, "total_s": total_s,
+            "achieved_events_per_s": len(events) / injected_s if injected_s else None,
+            "handler_latency": summary_ms(meter.handler_lat) if meter.handler_lat else None,
+            "redemption_to_queue": summary_ms(meter.redeem_lat) if meter.redeem_lat else None,
+            "queue_depth": {
+                "handlers":  _depth([s[0] for s in meter.samples]),
+                "outbound":  _depth([s[1] for s in meter.samples]),
+                "loop_lag_ms": {"max": max((s[2] for s in meter.samples), default=0) * 1e3},
+            },
+            "outbound": {"started": meter.sends_started, "delivered": meter.sends_done,
+                         "failed": meter.sends_failed, "errors": meter.send_errors,
+                         "seen_by_irc": len(tw.irc_out)},
+            "dropped": {
+                "handler_errors": meter.handler_errors,
+                "handlers_unfinished": len(tasks),
+                "outbound_undelivered": meter.sends_started - meter.sends_done,
+                "redemptions_not_queued": len(pending_uris),
+            },
+        }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inputs", nargs="*", type=Path, help="JSONL captures and/or bot_*.txt[.gz] logs")
+    ap.add_argument("--speed", default="1", help="1 = real time, N = N× faster, max = no pacing")
+    ap.add_argument("--users", type=int, help="remap recorded users onto N synthetic users")
+    ap.add_argument("--synthetic", type=int, default=0, help="add N generated events")
+    ap.add_argument("--rate", type=float, default=20.0, help="synthetic events per second")
+    ap.add_argument("--mix", default="chat=.85,sr=.1,redeem=.04,lilhelp=.01",
+                    help="synthetic mix: chat, redeem or any command name")
+    ap.add_argument("--mods", type=float, default=0.1, help="share of synthetic users that are mods")
+    ap.add_argument("--via", choices=("direct", "irc"), default="direct")
+    ap.add_argument("--limit", type=int, help="outbound burst per 30s (default: unlimited)")
+    ap.add_argument("--drain", type=float, default=30.0, help="seconds to wait for in-flight work")
+    ap.add_argument("--out", type=Path)
+    a = ap.parse_args()
+
+    reward = json.loads((ROOT / "addons/ljb_spotify_request/addon_config.json").read_text()).get("redeem_name", "")
+    events = sorted(read_events(a.inputs), key=lambda e: e["t"]) if a.inputs else []
+    if a.users and events:
+        events = remap_users(events, a.users)
+    if a.synthetic:
+        base = events[-1]["t"] if events else 0.0
+        events += [{**e, "t": e["t"] + base}
+                   for e in synthetic(a.synthetic, a.rate, a.users or 200, parse_mix(a.mix), a.mods, reward)]
+    if not events:
+        ap.error("nothing to replay – pass capture/log files and/or --synthetic N")
+
+    speed = 0.0 if a.speed == "max" else float(a.speed)
+    res = asyncio.run(replay(events, speed=speed, via=a.via, drain_s=a.drain, limiter_burst=a.limit))
+    txt = json.dumps(res, indent=2)
+    print(txt)
+    if a.out:
+        a.out.parent.mkdir(parents=True, exist_ok=True)
+        a.out.write_text(txt)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+run_offline.py
+Offline benchmark suite – no Twitch channel or Spotify account needed.
+Drives the real LJB + addons against bench/fakes.py and writes a JSON
+result file so releases can be compared:
+
+    python bench/run_offline.py [--quick] [--out bench/results/x.json]
+
+Benchmarks
+  dispatch_direct     LJB.event_message() calls/s for a no-op command
+  dispatch_irc        end-to-end: PRIVMSG on the fake IRC socket → handler
+  limiter             achieved rate + wake-up error of rate_limit.Limiter
+  redemption_queue    EventSub redemption → Spotify /me/player/queue latency
+  reconnect           EventSub session_reconnect / hard drop, IRC hard drop → recovered
+  startup             time-to-ready and per-phase timings with --net-latency per
+                      OAuth/Helix call, vs. the sum of the phases (serial cost)
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, platform, statistics, sys, time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import Harness, fake_message, ROOT  # noqa: E402
+
+def pct(xs: list[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else float("nan")
+
+def summary_ms(xs: list[float]) -> dict:
+    return {"n": len(xs), "mean_ms": statistics.fmean(xs) * 1e3 if xs else None,
+            "p50_ms": pct(xs, .5) * 1e3, "p95_ms": pct(xs, .95) * 1e3,
+            "p99_ms": pct(xs, .99) * 1e3, "max_ms": max(xs) * 1e3 if xs else None}
+
+# ── benchmarks ─────────────────────────────────────────────────────────
+async def bench_dispatch_direct(h: Harness, n: int) -> dict:
+    hits = 0
+    async def noop(msg, args):
+        nonlocal hits
+        hits += 1
+    h.bot.register("benchnoop", noop, "bench")
+    msgs = [fake_message("viewer", f"!benchnoop {i}") for i in range(n)]
+    t0 = time.perf_counter()
+    for m in msgs:
+        await h.bot.event_message(m)
+    dt = time.perf_counter() - t0
+    return {"messages": n, "handled": hits, "msgs_per_s": n / dt, "us_per_msg": dt / n * 1e6}
+
+async def bench_dispatch_irc(h: Harness, n: int) -> dict:
+    done = asyncio.Event()
+    hits = 0
+    async def count(msg, args):
+        nonlocal hits
+        hits += 1
+        if hits >= n:
+            done.set()
+    h.bot.register("benchirc", count, "bench")
+    t0 = time.perf_counter()
+    for i in range(n):
+        await h.fakes.twitch.chat("viewer", f"!benchirc {i}")
+    await asyncio.wait_for(done.wait(), 60)
+    dt = time.perf_counter() - t0
+    return {"messages": n, "msgs_per_s": n / dt, "us_per_msg": dt / n * 1e6}
+
+async def bench_limiter(burst: int = 20, window: float = 1.0, sends: int = 60) -> dict:
+    from ljb.rate_limit import Limiter
+    lim = Limiter(burst=burst, window=window)
+    stamps = []
+    t0 = time.perf_counter()
+    async def one():
+        await lim.wait()
+        stamps.append(time.perf_counter() - t0)
+    await asyncio.gather(*(one() for _ in range(sends)))
+    stamps.sort()
+    # ideal: message k is released at floor(k / burst) * window
+    err = [s - (k // burst) * window for k, s in enumerate(stamps)]
+    in_any_window = max(sum(1 for s in stamps if a <= s < a + window) for a in stamps)
+    return {"burst": burst, "window_s": window, "sends": sends,
+            "elapsed_s": stamps[-1], "achieved_per_window": sends / (stamps[-1] / window + 1),
+            "max_in_any_window": in_any_window, "over_limit": in_any_window > burst,
+            "release_error_ms": summary_ms([max(e, 0) for e in err])}
+
+async def bench_redemption(h: Harness, n: int) -> dict:
+    if not any(getattr(m, "ADDON_NAME", "") == "ljb_spotify_request" for m in h.bot.mods):
+        return {"skipped": "ljb_spotify_request not loaded"}
+    folder = next(d for d in h.bot.dirs if d.name == "ljb_spotify_request")
+    reward = json.loads((folder / "addon_config.json").read_text())["redeem_name"]
+    sp, lat = h.fakes.spotify, []
+    for i in range(n):
+        base = len(sp.queued)
+        t0 = time.perf_counter()
+        await h.fakes.twitch.redeem("viewer", reward, f"bench song {i} by bench artist")
+        await sp.queued.wait_count(base + 1, timeout=10)
+        lat.append(sp.queued.items[base][0] - t0)
+    return summary_ms(lat)
+
+async def bench_reconnect(h: Harness, timeout: float = 60.0) -> dict:
+    tw, out = h.fakes.twitch, {}
+
+    async def timed(action, rec, extra=None):
+        base, base_extra = len(rec), len(extra) if extra is not None else 0
+        t0 = time.perf_counter()
+        await action()
+        try:
+            await rec.wait_count(base + 1, timeout)
+            if extra is not None:
+                await extra.wait_count(base_extra + 1, timeout)
+            return (time.perf_counter() - t0) * 1e3
+        except asyncio.TimeoutError:
+            return None
+
+    out["eventsub_session_reconnect_ms"] = await timed(
+        lambda: tw.eventsub_reconnect(h.fakes.urls["TWITCH_EVENTSUB"]), tw.es_welcome)
+    # the welcome is counted when the fake sends it; give the client time to
+    # handle it – a drop in the middle of the handover is a different case
+    await asyncio.sleep(0.5)
+    # a hard drop (TCP cut) needs a new session *and* the subscriptions re-created on it
+    out["eventsub_drop_resubscribed_ms"] = await timed(tw.drop_eventsub, tw.es_welcome, tw.sub_calls)
+    out["irc_drop_rejoined_ms"] = await timed(tw.drop_irc, tw.irc_joins)
+    return out
+
+async def bench_startup(net_latency: float) -> dict:
+    async with Harness(net_latency=net_latency) as h:
+        t = h.bot.timer
+        serial = sum(b - a for k, (a, b) in t.phases.items() if k != "api")
+        return {"net_latency_ms": net_latency * 1e3,
+                "time_to_ready_ms": t.time_to_ready * 1e3,
+                "serial_sum_ms": serial * 1e3,
+                "phases": t.as_ms()}
+
+# ── driver ─────────────────────────────────────────────────────────────
+async def run(quick: bool, net_latency: float) -> dict:
+    n_disp  = 2_000 if quick else 20_000
+    n_irc   = 500 if quick else 5_000
+    n_red   = 20 if quick else 200
+    results = {"limiter": await bench_limiter(),
+               "startup": await bench_startup(net_latency)}
+    async with Harness() as h:
+        results["time_to_ready_ms"] = h.t_ready * 1e3
+        results["dispatch_direct"]  = await bench_dispatch_direct(h, n_disp)
+        results["dispatch_irc"]     = await bench_dispatch_irc(h, n_irc)
+        results["redemption_queue"] = await bench_redemption(h, n_red)
+        results["reconnect"]        = await bench_reconnect(h, timeout=10 if quick else 60)
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--quick", action="store_true", help="smaller iteration counts")
+    ap.add_argument("--net-latency", type=float, default=0.05,
+                    help="seconds added to each fake OAuth/Helix call in the startup bench")
+    ap.add_argument("--out", type=Path, help="result file (default bench/results/<version>_<time>.json)")
+    a = ap.parse_args()
+
+    version = (ROOT / "version.txt").read_text().strip() if (ROOT / "version.txt").exists() else ""
+    results = asyncio.run(run(a.quick, a.net_latency))
+    doc = {
+        "suite": "offline", "version": version or "unknown",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "quick": a.quick, "results": results,
+    }
+    out = a.out or ROOT / "bench" / "results" / f"{version or 'dev'}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(doc, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nresults written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+soak.py
+Long-running memory soak for the real LJB + addons against the local
+stand-ins (fakes.py). Hours of simulated stream go by in minutes: every
+simulated minute feeds a batch of chat, !sr / !song / !queue commands and
+channel-point redemptions, and EventSub / IRC connections are dropped on a
+schedule so the reconnect paths run many times.
+
+Every --sample-min simulated minutes it records traced Python memory
+(tracemalloc), RSS, live asyncio tasks, GC objects and live EventSub
+subscriptions. At the end it prints the growth by allocation site between
+the end of warm-up and the last sample, and fails (exit 1) when steady-state
+memory grew past --budget-kb, or tasks / subscriptions kept piling up.
+
+    python bench/soak.py [--minutes 240] [--chat-per-min 60] [--budget-kb 512]
+    python bench/soak.py --minutes 30 --quick       # smoke run
+"""
+
+from __future__ import annotations
+import argparse, asyncio, gc, json, os, random, sys, time, traceback, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import Harness, fake_message  # noqa: E402
+
+WRAP = 70        # > one 64-entry deque block
+IGNORE = (tracemalloc.Filter(False, tracemalloc.__file__),
+          tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+          tracemalloc.Filter(False, "<unknown>"),
+          tracemalloc.Filter(False, str(Path(__file__).resolve().parent / "*")))  # the stand-ins
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource                       # no /proc (macOS); Windows has neither
+        ru = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # peak, not current
+        return ru // 1024 if sys.platform == "darwin" else ru
+
+def trim_fakes(h: Harness):
+    """The stand-ins record every call – forget them so only the bot's memory counts."""
+    tw = h.fakes.twitch
+    for rec in (tw.irc_in, tw.irc_out, tw.irc_joins, tw.es_welcome, tw.sub_calls,
+                tw.helix_chat, tw.helix_calls):
+        rec.items.clear()
+    sp = h.fakes.spotify
+    for rec in (sp.queued, sp.searches, sp.calls):
+        rec.items.clear()
+
+def song(rnd: random.Random, a) -> str:
+    """One of a.songs fixed phrasings – the addon's track index is a library that grows with every new track."""
+    k = rnd.randrange(a.songs)
+    return f"song {k} by artist {k % (a.songs // 5 + 1)}"
+
+def failed(errors: dict, e: Exception, quiet: bool):
+    """Count a message that raised and keep soaking – twitchio's event_error would log it and go on."""
+    k = type(e).__name__
+    errors[k] = errors.get(k, 0) + 1
+    if errors[k] == 1 and not quiet:
+        traceback.print_exception(e, file=sys.stderr)
+
+async def minute(h: Harness, rnd: random.Random, a, reward: str, errors: dict, chat: int):
+    """One simulated minute of stream traffic."""
+    bot, tw = h.bot, h.fakes.twitch
+    for _ in range(chat):
+        user = f"user{rnd.randrange(a.users)}"
+        r = rnd.random()
+        if r < 0.05:
+            text = f"!sr {song(rnd, a)}"
+            msg = fake_message(user, text, mod=True)
+        elif r < 0.08:
+            msg = fake_message(user, rnd.choice(["!song", "!queue", "!history", "!lilhelp"]))
+        else:
+            msg = fake_message(user, f"message {rnd.randrange(10**6)} Kappa pog {user}")
+        try:
+            await bot.event_message(msg)
+        except Exception as e:
+            failed(errors, e, a.quiet)
+    for _ in range(a.redeems_per_min):
+        try:
+            await tw.redeem(f"user{rnd.randrange(a.users)}", reward, song(rnd, a))
+        except Exception as e:
+            failed(errors, e, a.quiet)
+    await asyncio.sleep(a.minute_s)           # let handlers, sends and pollers run
+
+def sample(t_min: int, h: Harness) -> dict:
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {"minute": t_min, "traced_kb": traced // 1024, "rss_kb": rss_kb(),
+            "tasks": len(asyncio.all_tasks()), "gc_objects": len(gc.get_objects()),
+            "eventsub_subs": len(h.fakes.twitch.subs)}
+
+def growth_sites(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, n: int) -> list[dict]:
+    stats = after.filter_traces(IGNORE).compare_to(before.filter_traces(IGNORE), "lineno")
+    return [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+             "growth_kb": round(s.size_diff / 1024, 1), "count_diff": s.count_diff}
+            for s in stats[:n] if s.size_diff > 0]
+
+def slope(xs: list[float], ys: list[float]) -> float:
+    """Least-squares slope (units of y per unit of x)."""
+    if len(xs) < 2:
+        return 0.0
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+async def run(a) -> dict:
+    rnd = random.Random(a.seed)
+    warm = max(1, int(a.minutes * a.warmup))
+    # bounded caches are sized to fill up by half-way through the warm-up, so
+    # steady state measures eviction, not caches still growing to their cap
+    caches = {"chat_history_size": max(50, a.chat_per_min * warm // 2),
+              "user_cache_size": max(10, a.users // 2)}
+    # warm-up chat is stepped up until every user has sent WRAP messages: a
+    # per-user history index (deque) keeps a spare block once it has wrapped one
+    warm_chat = max(a.chat_per_min, -(-WRAP * a.users // warm))
+    if a.songs is None:
+        # every song requested ~5 times during warm-up, so the track index is full before we measure
+        per_min = a.chat_per_min * 0.05 + a.redeems_per_min
+        a.songs = max(10, int(warm * per_min / 5))
+    # hours of chat go out in seconds: real-time send limits would only turn
+    # replies into errors, so chat goes over the fake Helix with no bucket
+    cfg = {"eventsub_watch_s": a.minute_s, "chat_log_dir": None, "chat_transport": "helix", **caches}
+    errors: dict[str, int] = {}
+    async with Harness(cfg=cfg) as h:
+        h.fakes.twitch.chat_bucket = 10**9
+        reward = json.loads((h.tmp / "addons" / "ljb_spotify_request" / "addon_config.json")
+                            .read_text())["redeem_name"]
+        tracemalloc.start(a.frames)
+        samples, snaps = [], {}
+        t0 = time.perf_counter()
+        for m in range(1, a.minutes + 1):
+            await minute(h, rnd, a, reward, errors, warm_chat if m <= warm else a.chat_per_min)
+            if a.eventsub_drop_min and m % a.eventsub_drop_min == 0:
+                await h.fakes.twitch.drop_eventsub()
+            if a.irc_drop_min and m % a.irc_drop_min == 0:
+                await h.fakes.twitch.drop_irc()
+            trim_fakes(h)
+            if m % a.sample_min == 0 or m in (warm, a.minutes):
+                await asyncio.sleep(a.minute_s * 4)   # reconnects settle before we measure
+                s = sample(m, h)
+                samples.append(s)
+                if m == warm:
+                    snaps["warm"] = tracemalloc.take_snapshot()
+                if not a.quiet:
+                    print(json.dumps(s), file=sys.stderr)
+        snaps["end"] = tracemalloc.take_snapshot()
+        wall = time.perf_counter() - t0
+        quotas = h.bot.quotas.stats()
+        tracemalloc.stop()
+
+    steady = [s for s in samples if s["minute"] >= warm]
+    first, last = steady[0], steady[-1]
+    growth_kb = last["traced_kb"] - first["traced_kb"]
+    per_hour = slope([s["minute"] for s in steady], [s["traced_kb"] for s in steady]) * 60
+    failures = []
+    if growth_kb > a.budget_kb:
+        failures.append(f"traced memory grew {growth_kb} KB after warm-up (budget {a.budget_kb} KB)")
+    if last["tasks"] - first["tasks"] > a.task_budget:
+        failures.append(f"live tasks {first['tasks']} → {last['tasks']}")
+    if last["eventsub_subs"] > first["eventsub_subs"]:
+        failures.append(f"EventSub subscriptions {first['eventsub_subs']} → {last['eventsub_subs']}")
+    return {"simulated_minutes": a.minutes, "wall_s": round(wall, 1), "warmup_minutes": warm,
+            "warmup_chat_per_min": warm_chat,
+            "caches": caches, "songs": a.songs, "message_errors": errors,
+            "steady_growth_kb": growth_kb, "steady_kb_per_sim_hour": round(per_hour, 1),
+            "rss_kb": {"warm": first["rss_kb"], "end": last["rss_kb"]},
+            "tasks": {"warm": first["tasks"], "end": last["tasks"]},
+            "top_growth": growth_sites(snaps["warm"], snaps["end"], a.top),
+            "addon_quotas": {k: {n: v for n, v in st.items() if n != "quota"} for k, st in quotas.items()},
+            "samples": samples, "verdict": "FAIL" if failures else "PASS", "failures": failures}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--minutes", type=int, default=240, help="simulated stream minutes")
+    ap.add_argument("--minute-s", type=float, default=0.05, help="wall seconds per simulated minute")
+    ap.add_argument("--chat-per-min", type=int, default=60)
+    ap.add_argument("--redeems-per-min", type=int, default=1)
+    ap.add_argument("--users", type=int, default=300)
+    ap.add_argument("--songs", type=int, help="distinct songs requested (default: sized to the warm-up)")
+    ap.add_argument("--eventsub-drop-min", type=int, default=20, help="0 = never")
+    ap.add_argument("--irc-drop-min", type=int, default=45, help="0 = never")
+    ap.add_argument("--sample-min", type=int, default=10)
+    ap.add_argument("--warmup", type=float, default=0.25, help="share of the run before measuring")
+    ap.add_argument("--budget-kb", type=int, default=512, help="allowed steady-state growth")
+    ap.add_argument("--task-budget", type=int, default=5)
+    ap.add_argument("--frames", type=int, default=1, help="tracemalloc traceback depth")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--quick", action="store_true", help="smaller batches for a smoke run")
+    ap.add_argument("--quiet", action="store_true", help="no per-sample lines on stderr")
+    ap.add_argument("--out", type=Path)
+    a = ap.parse_args()
+    if a.quick:
+        a.chat_per_min, a.sample_min = min(a.chat_per_min, 20), min(a.sample_min, 5)
+    res = asyncio.run(run(a))
+    out = json.dumps(res, indent=2)
+    if a.out:
+        a.out.parent.mkdir(parents=True, exist_ok=True)
+        a.out.write_text(out)
+    print(out)
+    sys.exit(0 if res["verdict"] == "PASS" else 1)
+
+if __name__ == "__main__":
+    main()
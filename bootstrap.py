@@ -39,48 +39,101 @@ def fake_loading_bar(text="loading", total=30, delay=0.04):
 def print_divider():
     print("\n" + "#" * 73 + "\n")
 
-def ensure_requirements_installed():
-    """Install all core requirements from requirements.txt, only if needed."""
-    try:
-        import pkg_resources
-        with open("requirements.txt") as req:
-            packages = [line.strip() for line in req if line.strip() and not line.startswith("#")]
+DEPS_CACHE = Path(".deps_cache.json")
+
+def requirement_files(addons_dir="addons"):
+    """Core requirements.txt followed by every addon's requirements.txt."""
+    files = [Path("requirements.txt")] if Path("requirements.txt").exists() else []
+    addons_path = Path(addons_dir)
+    if addons_path.exists():
+        files += sorted(a / "requirements.txt" for a in addons_path.iterdir()
+                        if (a / "requirements.txt").exists())
+    return files
+
+def _read_requirements(path):
+    with open(path) as reqf:
+        return [line.strip() for line in reqf if line.strip() and not line.startswith("#")]
+
+def _deps_fingerprint(files):
+    """Hash of all requirement files + the state of every site-packages dir.
+    Installing or removing a distribution touches its site dir, so a changed
+    mtime (or a new/removed dir) invalidates the cache."""
+    import hashlib, site
+    h = hashlib.sha256(sys.version.encode())
+    for f in files:
+        h.update(str(f).encode())
+        h.update(f.read_bytes())
+    dirs = set(p for p in sys.path if p.endswith("site-packages"))
+    dirs.update(site.getsitepackages() if hasattr(site, "getsitepackages") else [])
+    dirs.add(site.getusersitepackages())
+    for d in sorted(dirs):
         try:
-            pkg_resources.require(packages)
-            return
-        except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict):
-            print("[bootstrap] installing missing core dependencies from requirements.txt...")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "--user", "-r", "requirements.txt"])
-    except ImportError:
-        print("[bootstrap] installing core dependencies from requirements.txt...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "--user", "-r", "requirements.txt"])
+            h.update(f"{d}:{os.stat(d).st_mtime_ns}".encode())
+        except OSError:
+            h.update(f"{d}:-".encode())
+    return h.hexdigest()
 
-def install_addon_requirements(addons_dir="addons"):
-    """Scan each addon's requirements.txt and install only if required, with confirmation output."""
+def _missing_requirements(packages):
+    """Requirements that are not installed (or whose version does not match)."""
+    from importlib import metadata
     try:
-        import pkg_resources
+        from packaging.requirements import Requirement
     except ImportError:
-        print("[bootstrap] installing all addon requirements...")
-        for addon in Path(addons_dir).iterdir():
-            req = addon / "requirements.txt"
-            if req.exists():
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "--user", "-r", str(req)])
-        return
-
-    addons_path = Path(addons_dir)
-    if not addons_path.exists():
-        return
-    for addon in addons_path.iterdir():
-        req = addon / "requirements.txt"
-        if req.exists():
-            with req.open() as reqf:
-                packages = [line.strip() for line in reqf if line.strip() and not line.startswith("#")]
+        Requirement = None
+    missing = []
+    for spec in packages:
+        if Requirement:
             try:
-                pkg_resources.require(packages)
-                print(f"[bootstrap] all requirements satisfied for addon '{addon.name}'.")
-            except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict):
-                print(f"[bootstrap] installing requirements for addon '{addon.name}'...")
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "--user", "-r", str(req)])
+                req = Requirement(spec)
+            except Exception:
+                missing.append(spec)
+                continue
+            name, specifier = req.name, req.specifier
+        else:
+            name, specifier = spec.split(";")[0].split("[")[0].strip(), None
+            for op in ("==", ">=", "<=", "~=", "!=", ">", "<"):
+                name = name.split(op)[0].strip()
+        try:
+            version = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            missing.append(spec)
+            continue
+        if specifier and not specifier.contains(version, prereleases=True):
+            missing.append(spec)
+    return missing
+
+def ensure_all_requirements(addons_dir="addons"):
+    """
+    Verify core + addon requirements, installing anything missing with ONE pip run.
+    Skipped entirely when neither the requirement files nor the installed
+    distributions changed since the last successful check.
+    Returns "cached", "verified" or "installed".
+    """
+    files = requirement_files(addons_dir)
+    fp = _deps_fingerprint(files)
+    try:
+        if json.loads(DEPS_CACHE.read_text()).get("fingerprint") == fp:
+            return "cached"
+    except (OSError, ValueError):
+        pass
+
+    status = "verified"
+    missing = [(f, spec) for f in files for spec in _missing_requirements(_read_requirements(f))]
+    if missing:
+        print("[bootstrap] installing missing requirements: " + ", ".join(s for _, s in missing))
+        cmd = [sys.executable, "-m", "pip", "install", "--user"]
+        for f in files:
+            cmd += ["-r", str(f)]
+        subprocess.check_call(cmd)
+        status = "installed"
+        fp = _deps_fingerprint(files)   # pip changed the site dirs
+    else:
+        print(f"[bootstrap] all requirements satisfied ({len(files)} requirement file(s)).")
+    try:
+        DEPS_CACHE.write_text(json.dumps({"fingerprint": fp, "checked": time.time()}))
+    except OSError:
+        pass
+    return status
 
 def list_loaded_addons(addons_dir="addons"):
     """Print a list of all detected/loaded addons (those with addon.py), and return dict of versions."""
@@ -111,6 +164,17 @@ def read_core_version():
         return version_file.read_text().strip()
     return "unknown"
 
+def finish_interrupted_update():
+    """Roll back an update that was cut off mid-swap before anything imports the half-replaced files."""
+    try:
+        from update_checker import rollback
+    except ImportError:
+        return
+    try:
+        rollback()
+    except (OSError, ValueError) as e:
+        print(f"[bootstrap] warning: could not roll back an unfinished update: {e}")
+
 def check_for_updates_menu(core_version, addon_versions):
     print_divider()
     try:
@@ -150,10 +214,11 @@ def main_menu(core_version, addon_versions):
         else:
             print("invalid choice. please select a number from the menu.")
 
-def launch_bot():
+def launch_bot(pause=True):
     print_divider()
     print("launching lilrotbot. the bot console will now run below.\n")
-    time.sleep(0.7)
+    if pause:
+        time.sleep(0.7)
     from ljb.twitch_bot import main
     main()  # Hands over control to the bot
 
@@ -210,31 +275,64 @@ def reset_user_tokens():
                 n += 1
     print(f"[reset] {n} addon token file(s) removed.")
 
+    # 3. Streamer + addon tokens in the state store (bot tokens stay – they come from .env)
+    if Path("state.db").exists():
+        from ljb.store import Store, TOKEN_FIELDS
+        store = Store("state.db")
+        addon_ns = [ns for ns in store.namespaces() if ns.startswith("addon.")]   # flushes – not inside the transaction
+        with store.transaction() as tx:
+            for field in TOKEN_FIELDS:
+                tx.delete("tokens", field)
+            tx.delete("config", "twitch_channel")
+            for ns in addon_ns:
+                tx.delete(ns, "tokens")
+        store.close()
+        print("[reset] state.db tokens reset.")
+
     print_divider()
     print("all user tokens and OAuth credentials have been reset.")
     print("you will need to re-authorize on next launch.")
     input("press enter to return to the menu...")
 
+def parse_args(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="lilrotbot launcher")
+    ap.add_argument("--launch", action="store_true",
+                    help="skip splash + menu and start the bot right away")
+    ap.add_argument("--no-splash", action="store_true", help="skip the loading animation")
+    return ap.parse_args(argv)
+
 if __name__ == "__main__":
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(ASCII_ART_ROTSOFT)
+    T0 = time.perf_counter()
+    args = parse_args()
+    splash = not (args.launch or args.no_splash)
+
+    if splash:
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print(ASCII_ART_ROTSOFT)
+
+    finish_interrupted_update()
 
     # Show fake loading bar and versions
     print_divider()
-    fake_loading_bar("loading core", total=40, delay=0.04)
+    if splash:
+        fake_loading_bar("loading core", total=40, delay=0.04)
     CORE_VERSION = read_core_version()
     print(f"loaded core version: {CORE_VERSION}")
     print_divider()
-    fake_loading_bar("loading addons", total=38, delay=0.03)
+    if splash:
+        fake_loading_bar("loading addons", total=38, delay=0.03)
     addon_versions = list_loaded_addons()
     print_divider()
-    
-    # Install requirements from requirements.txt
-    ensure_requirements_installed()
 
-    # Install requirements for all addons (if any)
-    install_addon_requirements()
+    # Verify core + addon requirements (cached; one pip run if anything is missing)
+    deps = ensure_all_requirements()
+    print(f"[bootstrap] ready in {time.perf_counter() - T0:.2f}s "
+          f"({'warm' if deps == 'cached' else 'cold'}: dependencies {deps})")
 
     # NO more auto-update check!
 
-    main_menu(CORE_VERSION, addon_versions)
+    if args.launch:
+        launch_bot(pause=False)
+    else:
+        main_menu(CORE_VERSION, addon_versions)
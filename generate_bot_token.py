@@ -36,7 +36,7 @@ httpd = socketserver.TCPServer(("localhost", PORT), Handler)
 threading.Thread(target=httpd.serve_forever, daemon=True).start()
 
 # ── BUILD AND OPEN THE AUTH URL ────────────────────────────────
-scopes = "chat:read chat:edit channel:moderate"
+scopes = "chat:read chat:edit channel:moderate user:write:chat"
 params = {
     "response_type": "code",
     "client_id":     CLIENT_ID,
@@ -1,5 +1,5 @@
 @echo off
 chcp 65001
 color 5E
-python bootstrap.py
+python bootstrap.py %*
 pause
\ No newline at end of file
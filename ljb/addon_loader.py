@@ -6,14 +6,19 @@ Each add-on can optionally define:
   • scopes : list[str|AuthScope]
   • register(bot, folder)
   • start(bot) -> coroutine
+  • stop(bot) [-> coroutine]  – called from LJB.shutdown()
+  `bot` there is the addon's quota.AddonContext: the bot, with its own task /
+  HTTP / chat quotas (ctx.create_task, ctx.http, ctx.safe_send)
+addon.py is loaded as the package `ljb_<name>` with its folder on __path__,
+so it can split code into sibling modules (`from . import helpers`).
 """
 
 from __future__ import annotations
 import importlib.util, json, os, sys
 from pathlib import Path
-from twitchAPI.type import AuthScope
 
 def discover(addons_dir: Path):
+    from twitchAPI.type import AuthScope
     mods      = []
     dirs      = []
     extra     = []
@@ -25,9 +30,15 @@ def discover(addons_dir: Path):
         if not addon_py.exists():
             continue
         try:
-            spec = importlib.util.spec_from_file_location(folder.name, addon_py)
+            spec = importlib.util.spec_from_file_location(
+                folder.name, addon_py, submodule_search_locations=[str(folder)])
             mod  = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
+            sys.modules[folder.name] = mod          # needed for relative imports
+            try:
+                spec.loader.exec_module(mod)
+            except BaseException:
+                sys.modules.pop(folder.name, None)
+                raise
             mods.append(mod); dirs.append(folder)
 
             extra.extend(
@@ -0,0 +1,28 @@
+"""
+atomic.py
+Crash-safe file replacement: write a temp file next to the target, fsync,
+then os.replace() – readers see either the old or the new file, never half.
+"""
+
+from __future__ import annotations
+import os, tempfile
+from pathlib import Path
+
+def atomic_write_text(path: str | Path, text: str, encoding: str = "utf-8"):
+    atomic_write_bytes(path, text.encode(encoding))
+
+def atomic_write_bytes(path: str | Path, data: bytes):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
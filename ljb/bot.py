@@ -0,0 +1,546 @@
+"""
+bot.py
+LJB – the twitchio bot itself, importable without running main() so the
+benchmark harness (bench/) can drive the real class against local stand-ins.
+Shutdown drains before it closes: no new chat work or redemptions are taken
+on, in-flight work (bot.track) and queued chat get `shutdown_drain_s`, then
+warm state goes to bot.snapshots and is restored on the next start –
+unfinished redemptions and unsent chat are replayed once the bot is ready.
+A second instance on the same host waits as hot standby (standby.py) and
+promote()s itself when the leader's lock goes away.
+"""
+
+from __future__ import annotations
+import os
+import time
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from twitchio.ext import commands
+from twitchAPI.twitch import Twitch
+from twitchAPI.eventsub.websocket import EventSubWebsocket
+
+from . import endpoints
+from .rate_limit import Limiter
+from .transport import for_bot as chat_router
+from .capture import Capture
+from .content_filter import ContentFilter
+from .eventsub import EventSubLite
+from .events import EventBus, Event, role_mask
+from .history import ChatHistory, SegmentLog
+from .snapshot import Snapshots
+from .quota import Quotas, QuotaExceeded
+from .scheduler import Scheduler
+from .standby import Standby
+from .users import for_bot as user_directory
+from .startup import PhaseTimer
+from .store import Store, current as current_store
+from .tokens import follow_twitchapi_refresh
+
+class LJB(commands.Bot):
+    def __init__(self, cfg: dict, mods=(), dirs=(), scopes=(), limiter: Limiter | None = None,
+                 store: Store | None = None):
+        token = f"oauth:{os.getenv('BOT_ACCESS_TOKEN')}"
+        super().__init__(
+            token=token,
+            prefix="!",
+            initial_channels=[cfg["twitch_channel"]]
+        )
+        self.cfg           = cfg
+        self.mods          = list(mods)
+        self.dirs          = list(dirs)
+        self.all_scopes    = list(scopes)
+        self.limiter       = limiter or Limiter()
+        self.store         = store or current_store() or Store()   # addons: self.store.addon(name)
+        self.bot_nick      = cfg["bot_nick"]
+        self.cmds: dict[str, tuple] = {}
+        self.pending_subs  = []
+        self.pending_tasks = []
+        self.es = None
+        self.b_id = None
+        in_memory = self.store.path == ":memory:"
+        self.standby = (None if in_memory or not cfg.get("hot_standby", True) else
+                        Standby(Path(self.store.path).with_name("leader.lock"), self.store.meta,
+                                poll_s=cfg.get("standby_poll_s", 0.5)))
+        if self.standby and not self.standby.try_lead():
+            logging.warning("[standby] another instance is leading – waiting as hot standby")
+        self.capture = Capture(cfg["capture_file"]) if cfg.get("capture_file") and self.leading else None
+        self.users   = user_directory(self)   # cached/batched Helix users, seeded from IRC tags
+        self.history = ChatHistory(cfg.get("chat_history_size", 5000),
+                                   log_dir=cfg.get("chat_log_dir") if self.leading else None,
+                                   segment_mb=cfg.get("chat_log_segment_mb", 8),
+                                   keep_segments=cfg.get("chat_log_keep_segments", 10))
+        self.timer     = PhaseTimer()
+        self.http      = None        # shared httpx.AsyncClient when started via startup.run_bot
+        self._api_task = None
+        self.import_tracker = None   # diagnostics.ImportTracker when "import_report" is on
+        self.tokens    = None        # tokens.TokenRotator (bot + streamer credentials)
+        self.chat      = chat_router(self)   # outbound chat: IRC / Helix with failover
+        self.filter    = ContentFilter(cfg.get("blocked_terms_file"), cfg.get("blocked_terms_mode", "mask"),
+                                       poll_s=cfg.get("blocked_terms_poll_s", 5))
+        self.bus       = EventBus()          # chat / command / redemption / … for addons
+        self.quotas    = Quotas(cfg)         # addons see an AddonContext, not the bot itself
+        self.schedule  = Scheduler()         # one-shot / interval / cron jobs; fire once live
+        spath = None if in_memory else Path(self.store.path).with_name("warm_state.snap")
+        self.snapshots = Snapshots(spath, max_age=cfg.get("snapshot_max_age_s", 3600))
+        if self.leading:
+            self.snapshots.load_file()
+        self.draining  = False
+        self._hurry    = asyncio.Event()     # second Ctrl-C: stop waiting for the drain
+        self._work: dict[asyncio.Task, Event | None] = {}   # tracked task -> redemption to replay
+        self._outbox: dict[int, tuple] = {}                 # (ts, channel, text, task) being sent
+        self._out_ids  = itertools.count()
+        self._unsent: list = []
+        self._seen_ids: OrderedDict[str, None] = OrderedDict()
+        self._deferred: list[Event] = []     # redemptions that arrived while draining
+        self._replay: dict[str, list] = {}   # from the snapshot, acted on in event_ready
+        self._es_last: str | None = None
+        self._ready_once = False
+        self._lead_task: asyncio.Task | None = None
+        self._missed: deque = deque(maxlen=200)   # standby: (ts, msg) commands, for the backfill
+        self._cmd_ids: dict[asyncio.Future, str] = {}   # tracked command work → its IRC message id
+        self._core_snapshots()
+
+    @property
+    def leading(self) -> bool:
+        return self.standby is None or self.standby.leading
+
+    async def safe_send(self, txt: str, channel: str | None = None, *, pace: Limiter | None = None):
+        """pace: an extra limiter to wait on first (an addon's share of the budget)."""
+        if not self.leading:
+            logging.debug("[standby] not sending: %s", txt)
+            return
+        await self.filter.ready()
+        txt = self.filter.apply(txt)
+        if txt is None:
+            return
+        channel = channel or self.cfg["twitch_channel"]
+        k = next(self._out_ids)
+        self._outbox[k] = (time.time(), channel, txt, asyncio.current_task())
+        try:
+            if pace is not None:
+                await pace.wait()
+            await self.chat.send(channel, txt)
+        finally:
+            del self._outbox[k]
+
+    # ── in-flight work + warm state ───────────────────────────────────
+    def track(self, coro, replay: Event | None = None) -> asyncio.Task:
+        """Run coro as work the shutdown drain waits for; if it has to be cut
+        off, `replay` is published again after the restart."""
+        task = asyncio.ensure_future(coro)
+        self._work[task] = replay
+        task.add_done_callback(self._work.pop)
+        if replay is not None and self.standby:
+            # a standby replays it if this process dies first
+            key = str(id(task))
+            self.standby.journal(key, self._event_row(replay))
+            task.add_done_callback(lambda _: self.standby.settle(key))
+        return task
+
+    def settled(self):
+        """From inside tracked work: its side effects happened – never replay it."""
+        task = asyncio.current_task()
+        if task in self._work:
+            self._work[task] = None
+            if self.standby:
+                self.standby.settle(str(id(task)))
+                if (mid := self._cmd_ids.pop(task, None)):
+                    self.standby.command_done(mid)
+
+    @staticmethod
+    def _event_row(e: Event) -> list:
+        return [e.ts, e.channel, e.login, e.user_id, e.text, int(e.roles), e.key]
+
+    @staticmethod
+    def _row_event(row: list) -> Event:
+        ts, channel, login, user_id, text, roles, key = row
+        ev = Event("redemption", channel=channel, login=login, user_id=user_id,
+                   text=text, roles=roles, key=key)
+        ev.ts = ts
+        return ev
+
+    def _core_snapshots(self):
+        snap = self.snapshots
+        snap.register("users", self.users.snapshot, self.users.restore)
+        snap.register("history", self.history.snapshot, self.history.restore)
+        snap.register("redemption_ids", lambda: list(self._seen_ids),
+                      lambda ids: self._seen_ids.update(dict.fromkeys(ids)))
+        snap.register("outbox", lambda: self._unsent,
+                      lambda rows: self._replay.__setitem__("outbox", rows))
+        snap.register("redemptions", lambda: [self._event_row(e)
+                                              for e in sorted(self._deferred, key=lambda e: e.ts)],
+                      lambda rows: self._replay.__setitem__("redemptions", rows))
+
+    def _replay_snapshot(self):
+        oldest = time.time() - self.cfg.get("snapshot_replay_max_s", 300)
+        n = 0
+        for ts, channel, txt in self._replay.pop("outbox", ()):
+            if ts >= oldest:
+                self.track(self.safe_send(txt, channel))
+                n += 1
+        for row in self._replay.pop("redemptions", ()):
+            if row[0] >= oldest:
+                self.bus.publish(self._row_event(row))
+                n += 1
+        if n:
+            logging.info("[snapshot] replayed %d unsent message(s) / redemption(s)", n)
+
+    async def setup_api(self):
+        """Twitch API client, broadcaster id and EventSub socket – independent of IRC."""
+        cfg, t = self.cfg, self.timer
+        twitch = await t.time("helix_app_auth", Twitch(
+            os.getenv("CLIENT_ID"), os.getenv("CLIENT_SECRET"), **endpoints.twitch_api_kwargs()))
+        await t.time("helix_user_auth", twitch.set_user_authentication(
+            cfg["streamer_access_token"],
+            self.all_scopes,
+            cfg["streamer_refresh_token"]
+        ))
+        self.t_api = twitch
+        if self.tokens:
+            follow_twitchapi_refresh(self)
+        # the broadcaster id never changes for a login – ask Helix only once
+        channel = cfg["twitch_channel"].lower()
+        known = self.store.meta.get_dict("broadcaster_ids")
+        self.b_id = known.get(channel)
+        if self.b_id:
+            self.users.seed(channel, self.b_id)
+        else:
+            user = await t.time("broadcaster_lookup", self.users.get(login=channel))
+            if user is None:
+                raise RuntimeError(f"Twitch channel {channel!r} not found")
+            self.b_id = user.id
+            self.store.meta.set("broadcaster_ids", {**known, channel: self.b_id})
+        if self.leading:
+            await self.start_eventsub()
+
+    async def start_eventsub(self):
+        if self.es is not None:
+            return
+        if self.cfg.get("eventsub_client") == "lite":
+            self.es = EventSubLite(self.t_api, **endpoints.eventsub_kwargs())
+            start = self.es.start()
+        else:
+            # callbacks run on the bot's loop, not the websocket thread's
+            self.es = EventSubWebsocket(self.t_api, callback_loop=asyncio.get_running_loop(),
+                                        **endpoints.eventsub_kwargs())
+            # start() blocks until the socket is connected – keep it off the loop
+            start = asyncio.to_thread(self.es.start)
+        if self.capture:
+            self.capture.wrap_eventsub(self.es)
+        await self.timer.time("eventsub_connect", start)
+        logging.info("EventSub websocket started")
+
+    # ── redemptions: one core EventSub subscription, fanned out on bot.bus ──
+    async def _on_redemption(self, evt):
+        e = evt.event
+        rid = getattr(e, "id", None)
+        if rid:
+            if rid in self._seen_ids:
+                logging.info("[events] duplicate redemption %s ignored", rid)
+                return
+            self._seen_ids[rid] = None
+            if len(self._seen_ids) > 500:
+                self._seen_ids.popitem(last=False)
+        login = getattr(e, "user_login", None) or getattr(e, "user_name", None) or ""
+        ev = Event(
+            "redemption", channel=getattr(e, "broadcaster_user_login", "") or self.cfg["twitch_channel"],
+            login=login, user_id=getattr(e, "user_id", None),
+            text=(getattr(e, "user_input", "") or "").strip(),
+            roles=role_mask(self.users.peek(login=login)) if login else 0,
+            key=getattr(getattr(e, "reward", None), "title", "") or "", raw=evt)
+        if self.draining:
+            self._deferred.append(ev)            # handled after the restart
+        else:
+            self.bus.publish(ev)
+
+    def _subscribe_redemptions(self):
+        if hasattr(self.es, "listen_channel_points_custom_reward_redemption_add_v1"):
+            return self.es.listen_channel_points_custom_reward_redemption_add_v1(
+                broadcaster_user_id=self.b_id, callback=self._on_redemption)
+        return self.es.listen_channel_points_custom_reward_redemption_add(
+            broadcaster_user_id=self.b_id, callback=self._on_redemption)
+
+    def _es_session(self) -> str | None:
+        sess = getattr(self.es, "active_session", None)
+        return getattr(sess, "id", None) or getattr(self.es, "_session_id", None)
+
+    def _check_eventsub(self):
+        # twitchAPI re-creates its own subscriptions after a reconnect; re-running
+        # register() or subscribing again here would only pile up duplicates
+        cur = self._es_session()
+        if cur and cur != self._es_last:
+            logging.warning("EventSub reconnected (session %s)", cur)
+            self._es_last = cur
+            self.bus.publish(Event("reconnect", key="eventsub", text=cur))
+
+    def start_api(self) -> asyncio.Task:
+        if self._api_task is None:
+            self._api_task = asyncio.create_task(self.timer.time("api", self.setup_api()))
+        return self._api_task
+
+    async def event_ready(self):
+        cfg = self.cfg
+        if self._ready_once:
+            # twitchio fires "ready" after every IRC re-login – set up only once
+            logging.warning("IRC reconnected")
+            self.bus.publish(Event("reconnect", key="irc"))
+            return
+        self._ready_once = True
+        self.timer.mark("irc_ready")
+        self.filter.start()              # the term list compiles while the rest comes up
+        print(f"Connected as {self.bot_nick} in {cfg['twitch_channel']}"
+              + ("" if self.leading else " (hot standby)"))
+        logging.info("IRC ready; requesting channel JOIN")
+
+        await self.start_api()
+
+        for mod, folder in zip(self.mods, self.dirs):
+            if hasattr(mod, "register"):
+                try:
+                    mod.register(self.addon_context(mod), folder)
+                except Exception as e:
+                    logging.error("[%s] register %s", mod.__name__, e)
+        if self.leading:
+            await self._go_live()
+        else:
+            self._lead_task = asyncio.create_task(self._await_leadership())
+        self.register("lilhelp", self.cmd_help, "List commands")
+        self.timer.mark("ready")
+        self.timer.report()
+        if self.import_tracker:
+            self.import_tracker.stop()
+            self.import_tracker.report()
+
+    async def _go_live(self):
+        """Everything only the leader does: addons start, EventSub, replies."""
+        async def _ping():
+            try:
+                # straight to IRC (it checks the JOIN), but paced and counted like any send
+                await self.chat.transports["irc"].send(self.cfg["twitch_channel"], "i'm alive!")
+                logging.info("Successfully sent 'i'm alive!' to chat")
+            except Exception as e:
+                logging.error("JOIN failed: %s", e)
+        asyncio.create_task(_ping())
+
+        for mod, folder in zip(self.mods, self.dirs):
+            if hasattr(mod, "start"):
+                ctx = self.addon_context(mod)
+                try:
+                    coro = mod.start(ctx, folder)
+                    if asyncio.iscoroutine(coro):
+                        ctx.create_task(coro)
+                except Exception as e:
+                    logging.error("[%s] start %s", mod.__name__, e)
+        if self.bus.wants("redemption"):
+            self.pending_subs.append(self._subscribe_redemptions())
+        if self.pending_subs:
+            await self.timer.time("eventsub_subscribe", asyncio.gather(*self.pending_subs))
+        for task in self.pending_tasks:
+            asyncio.create_task(task)
+        self.pending_subs.clear()
+        self.pending_tasks.clear()
+        for ctx in self.quotas.contexts.values():
+            ctx.start_pending()
+        self._replay_snapshot()
+        self._es_last = self._es_session()
+        self.schedule.every(self.cfg.get("eventsub_watch_s", 30), self._check_eventsub, name="eventsub_watch")
+        self.schedule.start()
+        if self.standby:
+            self.standby.start_heartbeat()
+
+    # ── hot standby ───────────────────────────────────────────────────
+    async def _await_leadership(self):
+        await self.standby.wait_for_leadership()
+        try:
+            await self.promote()
+        except Exception as e:
+            logging.error("[standby] takeover failed: %s", e)
+
+    async def promote(self):
+        """Standby → leader: EventSub, addons, backfill of what the old leader left."""
+        hb = self.standby.last_heartbeat()
+        logging.warning("[standby] leader lock acquired – taking over")
+        await self.start_api()
+        await self.start_eventsub()
+        cfg = self.cfg
+        if cfg.get("chat_log_dir") and self.history.log is None:
+            self.history.log = SegmentLog(cfg["chat_log_dir"], cfg.get("chat_log_segment_mb", 8),
+                                          cfg.get("chat_log_keep_segments", 10))
+        if cfg.get("capture_file") and self.capture is None:
+            self.capture = Capture(cfg["capture_file"])
+        self.snapshots.load_file()          # a leader that shut down cleanly left its warm state
+        await self._go_live()
+        self._backfill(hb)
+        self.timer.mark("promoted")
+        self.standby.promoted(hb)
+
+    def _backfill(self, leader_hb: float | None):
+        rows = self.standby.take_journal()
+        for row in rows:
+            self.bus.publish(self._row_event(row))
+        # commands the old leader left in flight or never started – by message id;
+        # anything older than its record is taken as answered
+        rec = self.standby.take_commands()
+        since, inflight, done = rec["since"], rec["inflight"], rec["done"]
+
+        def rerun(ts: float, msg) -> bool:
+            mid = self._msg_id(msg)
+            if mid is None:                  # no IRC tags: only the heartbeat to go by
+                return leader_hb is None or ts > leader_hb
+            if mid in inflight:
+                return True
+            return mid not in done and (since is None or ts >= since)
+        missed = [msg for ts, msg in self._missed if rerun(ts, msg)]
+        self._missed.clear()
+        for msg in missed:
+            info = self.users.peek(login=msg.author.name) or self.users.observe(msg)
+            asyncio.create_task(self._dispatch(msg, info))
+        if rows or missed:
+            logging.info("[standby] backfill: %d redemption(s), %d command(s)", len(rows), len(missed))
+
+    async def event_message(self, msg):
+        if msg.echo or self.draining or msg.author.name.lower() == self.bot_nick.lower():
+            return
+        if self.capture:
+            self.capture.chat(msg)
+        self.history.add(msg)
+        info = self.users.observe(msg)
+        if not self.leading:
+            if msg.content.startswith("!"):
+                self._missed.append((time.time(), msg))
+            return
+        await self._dispatch(msg, info)
+
+    async def _dispatch(self, msg, info):
+        ev = self.bus
+        if ev.wants("chat"):
+            ev.publish(Event("chat", channel=self._channel_of(msg), login=msg.author.name,
+                             user_id=info.id, text=msg.content, roles=role_mask(info), raw=msg))
+        if not msg.content.startswith("!"):
+            return
+        mid = self._msg_id(msg) if self.standby else None
+        if mid:
+            self.standby.command_started(mid, time.time())
+        cut = False
+        try:
+            await self._run_command(msg, info, mid)
+        except asyncio.CancelledError:
+            cut = True                       # cut off by the drain: left in flight for the standby
+            raise
+        finally:
+            if mid and not cut:
+                self.standby.command_done(mid)
+
+    @staticmethod
+    def _msg_id(msg) -> str | None:
+        return (getattr(msg, "tags", None) or {}).get("id")
+
+    async def _run_command(self, msg, info, mid: str | None):
+        ev = self.bus
+        cmd, *args = msg.content[1:].split() or [""]
+        if ev.wants("command"):
+            ev.publish(Event("command", channel=self._channel_of(msg), login=msg.author.name,
+                             user_id=info.id, text=msg.content, roles=role_mask(info),
+                             key=cmd, args=args, raw=msg))
+        if (entry := self.cmds.get(cmd.lower())):
+            func, _, owner = entry
+            logging.info("[cmd] %s%s: %s", msg.author.name,
+                         " (mod)" if getattr(msg.author, "is_mod", False) else "", msg.content)
+            try:
+                fut = owner.track(func(msg, args))
+                if mid:
+                    self._cmd_ids[fut] = mid         # settled() inside it marks the command done
+                    fut.add_done_callback(lambda f: self._cmd_ids.pop(f, None))
+                await fut
+            except QuotaExceeded:
+                pass                                 # the addon's quota already logged it
+            except Exception as e:
+                await self.safe_send(f"Error: {e}")
+
+    def _channel_of(self, msg) -> str:
+        return getattr(getattr(msg, "channel", None), "name", None) or self.cfg["twitch_channel"]
+
+    async def event_join(self, channel, user):
+        if self.bus.wants("join"):
+            self.bus.publish(Event("join", channel=channel.name, login=user.name, raw=user))
+
+    def addon_context(self, mod):
+        return self.quotas.context(self, mod.__name__)
+
+    def register(self, name, func, help_text, owner=None):
+        """owner: the AddonContext the command runs under (None = the core)."""
+        self.cmds[name.lower()] = (func, help_text, owner or self)
+
+    async def cmd_help(self, msg, _):
+        await self.safe_send("Commands: " + ", ".join(sorted(self.cmds)))
+
+    async def _drain(self, timeout: float):
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        await self.bus.drain(timeout)
+        while not self._hurry.is_set() and loop.time() < end:
+            if not self._work and not self._outbox:
+                break
+            await asyncio.sleep(0.05)
+        # cut off what is left: redemptions are replayed from the start, so their
+        # half-sent replies are dropped; everything else still unsent is kept
+        cut = dict(self._work)
+        self._unsent = [[ts, ch, txt] for ts, ch, txt, task in self._outbox.values()
+                        if cut.get(task) is None]
+        self._deferred += [ev for ev in cut.values() if ev is not None]
+        for task in cut:
+            task.cancel()
+        await asyncio.gather(*cut, return_exceptions=True)
+        if cut or self._unsent or self._deferred:
+            logging.warning("[shutdown] drain cut off %d task(s); kept %d message(s), %d redemption(s)",
+                            len(cut), len(self._unsent), len(self._deferred))
+
+    async def shutdown(self):
+        if self.draining:
+            self._hurry.set()
+            return
+        self.draining = True
+        self.schedule.stop()                 # no new timer runs; running ones are cut off
+        if self._lead_task:
+            self._lead_task.cancel()
+        if self.leading:
+            print("\n[liljuicerbot] Shutting down … (Ctrl-C again to skip the drain)")
+            await self._drain(self.cfg.get("shutdown_drain_s", 10))
+            try:
+                self.snapshots.save()
+            except OSError as e:
+                logging.error("[snapshot] save failed: %s", e)
+        else:
+            print("\n[liljuicerbot] Shutting down standby …")
+        if self.tokens:
+            self.tokens.stop()
+        self.filter.stop()
+        self.history.close()
+        await self.chat.close()
+        await self.bus.close()
+        for mod in self.mods:
+            if hasattr(mod, "stop"):
+                try:
+                    res = mod.stop(self.addon_context(mod))
+                    if asyncio.iscoroutine(res):
+                        await res
+                except Exception as e:
+                    logging.error("[%s] stop %s", mod.__name__, e)
+            self.schedule.cancel_owner(mod.__name__)
+        for name, st in self.quotas.stats().items():
+            if st["tasks_dropped"] or st["chat_dropped"] or st["tasks_throttled"] or st["chat_throttled"]:
+                logging.info("[quota] %s: %s", name, {k: v for k, v in st.items() if k != "quota"})
+        await self.quotas.aclose()
+        try:
+            if self.es:
+                await self.es.stop()
+            if hasattr(self, "t_api"):
+                await self.t_api.close()
+        finally:
+            await self.close()
+            if self.standby:
+                self.standby.stop()          # last: a standby takes over from here
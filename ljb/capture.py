@@ -0,0 +1,111 @@
+"""
+capture.py
+Chat / redemption capture format shared by the live bot and bench/replay.py
+• Capture  – appends inbound traffic as JSON lines while the bot runs
+             (enabled with "capture_file" in config.json)
+• read_events() – loads a JSONL capture or our own logs/bot_*.txt[.gz]
+One event per line:
+  {"t": 1712345678.12, "kind": "chat",   "user": "x", "text": "!sr ...", "mod": false, "broadcaster": false}
+  {"t": 1712345679.50, "kind": "redeem", "user": "x", "reward": "song request", "input": "..."}
+"""
+
+from __future__ import annotations
+import datetime, gzip, json, logging, re, time
+from pathlib import Path
+from typing import Iterator
+
+# "[cmd] someuser (mod): !sr never gonna give you up"
+# "[redeem] someuser -> song request: never gonna give you up"
+_MSG = (r"\[(?P<kind>cmd|redeem)\] (?P<user>[^:\s]+)(?P<mod> \(mod\))?"
+        r"(?: -> (?P<reward>[^:]*))?: (?P<text>.*)$")
+# text log: "2024-05-01 20:13:02,118 [INFO] " + _MSG
+_LOG_LINE = re.compile(r"^(?P<ts>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) \[\w+\] " + _MSG)
+_JSON_MSG = re.compile("^" + _MSG)
+
+class Capture:
+    """Append-only JSONL writer; line-buffered so a crash loses at most one event."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def _write(self, rec: dict):
+        try:
+            self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logging.error("[capture] write failed: %s", e)
+
+    def chat(self, msg):
+        a = msg.author
+        self._write({"t": round(time.time(), 3), "kind": "chat", "user": a.name,
+                     "text": msg.content, "mod": bool(getattr(a, "is_mod", False)),
+                     "broadcaster": bool(getattr(a, "is_broadcaster", False))})
+
+    def redeem(self, evt):
+        e = getattr(evt, "event", evt)
+        reward = getattr(getattr(e, "reward", None), "title", None)
+        self._write({"t": round(time.time(), 3), "kind": "redeem",
+                     "user": getattr(e, "user_login", None) or getattr(e, "user_name", None),
+                     "reward": reward, "input": getattr(e, "user_input", "")})
+
+    def wrap_eventsub(self, es):
+        """Wrap es.listen_*redemption* so every callback records the event first."""
+        for name in dir(es):
+            if not (name.startswith("listen_") and "redemption" in name):
+                continue
+            orig = getattr(es, name)
+
+            def listen(*a, _orig=orig, callback=None, **kw):
+                if callback is None and len(a) >= 2:      # (broadcaster_user_id, callback, ...)
+                    a, callback = (a[0], *a[2:]), a[1]
+                async def wrapped(evt, _cb=callback):
+                    self.redeem(evt)
+                    return await _cb(evt)
+                return _orig(*a, callback=wrapped, **kw)
+            setattr(es, name, listen)
+
+    def close(self):
+        self._f.close()
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+def read_events(paths) -> Iterator[dict]:
+    """
+    Yield events from JSONL captures and/or bot log files, in file order.
+    Text logs only carry what the bot logs ([cmd] lines, [redeem] lines),
+    so a JSONL capture is the richer source.
+    """
+    for p in map(Path, paths):
+        with _open_text(p) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if rec.get("kind") in ("chat", "redeem"):
+                        yield rec
+                        continue
+                    # JSON-format bot log (log_format = "json")
+                    m = _JSON_MSG.match(str(rec.get("msg", "")))
+                    if not m:
+                        continue
+                    t = datetime.datetime.fromisoformat(rec["ts"]).timestamp()
+                else:
+                    m = _LOG_LINE.match(line)
+                    if not m:
+                        continue
+                    t = datetime.datetime.strptime(m["ts"], "%Y-%m-%d %H:%M:%S,%f").timestamp()
+                if m["kind"] == "cmd":
+                    yield {"t": t, "kind": "chat", "user": m["user"], "text": m["text"],
+                           "mod": bool(m["mod"]), "broadcaster": False}
+                else:
+                    yield {"t": t, "kind": "redeem", "user": m["user"],
+                           "reward": m["reward"] or "", "input": m["text"]}
@@ -0,0 +1,223 @@
+"""
+content_filter.py
+Outbound chat filter in LJB.safe_send – bot.filter
+• every term on the list is compiled into ONE Aho-Corasick automaton: a
+  message is scanned in a single pass, however long the list is
+• text and terms are folded the same way first – case, accents / fullwidth
+  (NFKD), look-alike Cyrillic / Greek letters, digit / @ / $ leetspeak,
+  zero-width characters – and matches are mapped back onto the original
+  characters
+• a term matches whole words; a leading / trailing * lets it match inside
+  a word on that side ("*bad*" also hits "notbad")
+• mode "mask" stars out the match, "suppress" drops the whole message
+• the term file (one per line, # comments) is polled; a changed list is
+  compiled in a worker thread and swapped in, the old automaton keeps
+  serving until then
+"""
+
+from __future__ import annotations
+import asyncio, logging, os, time, unicodedata
+from pathlib import Path
+from typing import Iterable, Iterator
+
+OPEN_LEFT, OPEN_RIGHT = 1, 2
+MODES = ("mask", "suppress")
+
+# ── normalisation ─────────────────────────────────────────────────────
+_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+         "@": "a", "$": "s"}
+_CONFUSABLE = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ї": "i", "ј": "j", "ѕ": "s", "ԁ": "d",
+    "ɡ": "g", "һ": "h", "ԛ": "q", "ԝ": "w",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # other look-alikes
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ħ": "h", "ß": "ss", "æ": "ae", "œ": "oe",
+}
+_ZERO_WIDTH = frozenset("\u200b\u200c\u200d\u2060\ufeff\u00ad")
+_ASCII = str.maketrans({**{c: c.lower() for c in map(chr, range(65, 91))}, **_LEET})
+
+def _fold_char(ch: str) -> str:
+    ch = ch.lower()
+    if ch in _CONFUSABLE:
+        return _CONFUSABLE[ch]
+    if ch.isascii():
+        return _LEET.get(ch, ch)
+    out = []
+    for c in unicodedata.normalize("NFKD", ch):
+        if unicodedata.combining(c):
+            continue
+        c = c.lower()
+        out.append(_CONFUSABLE.get(c) or _LEET.get(c, c))
+    return "".join(out)
+
+def normalize(text: str) -> tuple[str, list[int] | None]:
+    """Folded text + the original index of each folded char (None: same positions)."""
+    if text.isascii():
+        return text.translate(_ASCII), None
+    text_idx: list[int] = []
+    out: list[str] = []
+    for i, ch in enumerate(text):
+        if ch in _ZERO_WIDTH:
+            continue
+        f = _fold_char(ch)
+        out.append(f)
+        text_idx.extend([i] * len(f))
+    return "".join(out), text_idx
+
+def parse_terms(lines: Iterable[str]) -> list[tuple[str, int]]:
+    terms = {}
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        flags = 0
+        if line.startswith("*"):
+            flags |= OPEN_LEFT
+        if line.endswith("*"):
+            flags |= OPEN_RIGHT
+        term = normalize(line.strip("*").strip())[0]
+        if term:
+            terms[term] = terms.get(term, 0) | flags
+    return list(terms.items())
+
+# ── automaton ─────────────────────────────────────────────────────────
+class Automaton:
+    """Aho-Corasick over folded terms; find() is one pass over the text."""
+    __slots__ = ("goto", "fail", "out", "link", "terms")
+
+    def __init__(self, terms: list[tuple[str, int]]):
+        goto: list[dict] = [{}]
+        out: list[tuple] = [()]
+        for term, flags in terms:
+            node = 0
+            for c in term:
+                nxt = goto[node].get(c)
+                if nxt is None:
+                    nxt = goto[node][c] = len(goto)
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] += ((len(term), flags),)
+        fail = [0] * len(goto)
+        link = [0] * len(goto)          # next node down the fail chain that ends a term (0: none)
+        queue = list(goto[0].values())
+        for node in queue:              # breadth-first; the list grows while we walk it
+            for c, nxt in goto[node].items():
+                f = fail[node]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(c, 0) if node else 0
+                link[nxt] = fail[nxt] if out[fail[nxt]] else link[fail[nxt]]
+                queue.append(nxt)
+        self.goto, self.fail, self.out, self.link = goto, fail, out, link
+        self.terms = len(terms)
+
+    def find(self, s: str) -> Iterator[tuple[int, int, int]]:
+        """(start, end, flags) of every term occurrence in folded text s."""
+        goto, fail, out, link = self.goto, self.fail, self.out, self.link
+        node = 0
+        for i, c in enumerate(s):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            m = node if out[node] else link[node]
+            while m:
+                for n, flags in out[m]:
+                    yield i - n + 1, i + 1, flags
+                m = link[m]
+
+# ── filter ────────────────────────────────────────────────────────────
+class ContentFilter:
+    def __init__(self, path: str | Path | None = None, mode: str = "mask", poll_s: float = 5.0):
+        self.path = Path(path) if path else None
+        self.mode = mode if mode in MODES else "mask"
+        self.poll_s = poll_s
+        self.auto: Automaton | None = None
+        self.compile_ms: float | None = None
+        self._mtime: float | None = None
+        self._loaded = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.counts = {"checked": 0, "masked": 0, "suppressed": 0, "reloads": 0}
+        if self.path is None:
+            self._loaded.set()
+
+    def start(self):
+        if self.path is None or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._watch())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def ready(self):
+        """Until the first list is compiled, sends wait here instead of going out unfiltered."""
+        if not self._loaded.is_set():
+            self.start()
+            await self._loaded.wait()
+
+    async def set_terms(self, lines: Iterable[str]):
+        """Compile a new list off the loop, then swap it in."""
+        t0 = time.perf_counter()
+        auto = await asyncio.to_thread(lambda: Automaton(parse_terms(lines)))
+        self.compile_ms = (time.perf_counter() - t0) * 1000
+        self.auto = auto if auto.terms else None
+        self._loaded.set()
+        logging.info("[filter] %d blocked term(s) compiled in %.0f ms", auto.terms, self.compile_ms)
+
+    async def _watch(self):
+        while True:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime or not self._loaded.is_set():
+                self._mtime = mtime
+                try:
+                    text = await asyncio.to_thread(self.path.read_text, encoding="utf-8") if mtime else ""
+                    await self.set_terms(text.splitlines())
+                    self.counts["reloads"] += 1
+                except Exception as e:
+                    logging.error("[filter] loading %s: %s", self.path, e)
+                    self._loaded.set()       # keep sending with the old list rather than stall chat
+            await asyncio.sleep(self.poll_s)
+
+    def spans(self, text: str) -> list[tuple[int, int]]:
+        """Blocked spans as (start, end) indexes into the original text."""
+        auto = self.auto
+        if auto is None:
+            return []
+        folded, idx = normalize(text)
+        n, out = len(folded), []
+        for a, b, flags in auto.find(folded):
+            if not flags & OPEN_LEFT and a and folded[a - 1].isalnum():
+                continue
+            if not flags & OPEN_RIGHT and b < n and folded[b].isalnum():
+                continue
+            out.append((a, b) if idx is None else (idx[a], idx[b - 1] + 1))
+        return out
+
+    def apply(self, text: str) -> str | None:
+        """The text to send: masked, unchanged, or None when it must not go out."""
+        if self.auto is None:
+            return text
+        self.counts["checked"] += 1
+        spans = self.spans(text)
+        if not spans:
+            return text
+        if self.mode == "suppress":
+            self.counts["suppressed"] += 1
+            logging.warning("[filter] suppressed a message with %d blocked term(s)", len(spans))
+            return None
+        self.counts["masked"] += 1
+        chars = list(text)
+        for a, b in spans:
+            chars[a:b] = "*" * (b - a)
+        return "".join(chars)
+
+    def stats(self) -> dict:
+        return {"terms": self.auto.terms if self.auto else 0, "mode": self.mode,
+                "compile_ms": self.compile_ms, **self.counts}
@@ -0,0 +1,122 @@
+"""
+diagnostics.py
+Process self-inspection helpers
+• ImportTracker – in-process import timing (like `python -X importtime`),
+  summarised per top-level package; enable with "import_report" in config.json
+• summarize_importtime() – same summary from real `-X importtime` stderr
+• rss_mb() – current resident set size of this process
+CLI:  python -m ljb.diagnostics [module ...]   (default: the bot's runtime imports)
+"""
+
+from __future__ import annotations
+import builtins, json, logging, os, re, subprocess, sys, threading, time
+
+class ImportTracker:
+    """
+    Wraps builtins.__import__ and times every *first* import of a module.
+    Self time = cumulative time minus nested first imports, attributed to the
+    top-level package name. Cheap enough to leave on for one startup.
+    """
+
+    def __init__(self):
+        self.self_s: dict[str, float] = {}
+        self.count: dict[str, int] = {}
+        self._orig = None
+        self._tls = threading.local()      # per-thread stack of child time per frame
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._orig(name, globals, locals, fromlist, level)
+        stack = self._tls.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return self._orig(name, globals, locals, fromlist, level)
+        finally:
+            took = time.perf_counter() - t0
+            child = stack.pop()
+            top = name.partition(".")[0]
+            self.self_s[top] = self.self_s.get(top, 0.0) + took - child
+            self.count[top] = self.count.get(top, 0) + 1
+            if stack:
+                stack[-1] += took
+
+    def start(self) -> "ImportTracker":
+        if self._orig is None:
+            self._orig = builtins.__import__
+            builtins.__import__ = self._import
+        return self
+
+    def stop(self):
+        if self._orig is not None:
+            builtins.__import__ = self._orig
+            self._orig = None
+
+    @property
+    def total_s(self) -> float:
+        return sum(self.self_s.values())
+
+    def top(self, n: int = 12) -> list[tuple[str, float]]:
+        return sorted(self.self_s.items(), key=lambda kv: -kv[1])[:n]
+
+    def report(self, n: int = 12):
+        logging.info("[imports] %.0fms in %d packages; top: %s",
+                     self.total_s * 1e3, len(self.self_s),
+                     ", ".join(f"{k} {v * 1e3:.0f}ms" for k, v in self.top(n)),
+                     extra={"import_ms": {k: round(v * 1e3, 1) for k, v in self.top(n)}})
+
+# "import time:       412 |       1043 |   twitchio.ext"
+_IT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def summarize_importtime(stderr: str) -> dict[str, float]:
+    """Per top-level package self time (ms) from `-X importtime` output."""
+    out: dict[str, float] = {}
+    for line in stderr.splitlines():
+        m = _IT_LINE.match(line)
+        if m:
+            top = m[4].partition(".")[0]
+            out[top] = out.get(top, 0.0) + int(m[1]) / 1e3
+    return dict(sorted(out.items(), key=lambda kv: -kv[1]))
+
+def measure_imports(modules: list[str], cwd: str | None = None) -> dict:
+    """Import modules in a fresh interpreter with -X importtime; return summary + RSS."""
+    code = ("import sys, json\n"
+            + "".join(f"import {m}\n" for m in modules)
+            + "from ljb.diagnostics import rss_mb\n"
+            + "print(json.dumps({'rss_mb': rss_mb()}))\n")
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                       capture_output=True, text=True, cwd=cwd)
+    if p.returncode:
+        raise RuntimeError(p.stderr.strip().splitlines()[-1] if p.stderr.strip() else "import failed")
+    per_pkg = summarize_importtime(p.stderr)
+    return {"total_ms": sum(per_pkg.values()), "per_package_ms": per_pkg,
+            **json.loads(p.stdout.strip().splitlines()[-1])}
+
+def rss_mb() -> float | None:
+    """Current RSS in MiB (psutil if present, /proc on Linux, peak RSS elsewhere)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    except ImportError:
+        return None
+
+RUNTIME_MODULES = ["ljb.twitch_bot", "ljb.startup", "ljb.bot"]
+
+if __name__ == "__main__":
+    mods = sys.argv[1:] or RUNTIME_MODULES
+    res = measure_imports(mods)
+    print(f"{'package':<24}{'self ms':>10}")
+    for k, v in list(res["per_package_ms"].items())[:25]:
+        print(f"{k:<24}{v:>10.1f}")
+    print(f"{'TOTAL':<24}{res['total_ms']:>10.1f}   rss {res['rss_mb']:.1f} MiB")
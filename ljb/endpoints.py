@@ -0,0 +1,88 @@
+"""
+endpoints.py
+Base URLs for every remote service the bot talks to.
+Each one can be overridden through an environment variable (or configure())
+so the bot and its addons can be pointed at local stand-ins – see bench/fakes.py.
+Always read them as endpoints.X at call time, never `from endpoints import X`.
+"""
+
+from __future__ import annotations
+import os
+
+DEFAULTS = {
+    "TWITCH_ID":        "https://id.twitch.tv",
+    "TWITCH_HELIX":     "https://api.twitch.tv/helix",
+    "TWITCH_IRC":       "wss://irc-ws.chat.twitch.tv:443",
+    "TWITCH_EVENTSUB":  "wss://eventsub.wss.twitch.tv/ws",
+    "SPOTIFY_ACCOUNTS": "https://accounts.spotify.com",
+    "SPOTIFY_API":      "https://api.spotify.com",
+}
+
+TWITCH_ID        = DEFAULTS["TWITCH_ID"]
+TWITCH_HELIX     = DEFAULTS["TWITCH_HELIX"]
+TWITCH_IRC       = DEFAULTS["TWITCH_IRC"]
+TWITCH_EVENTSUB  = DEFAULTS["TWITCH_EVENTSUB"]
+SPOTIFY_ACCOUNTS = DEFAULTS["SPOTIFY_ACCOUNTS"]
+SPOTIFY_API      = DEFAULTS["SPOTIFY_API"]
+
+def configure(**overrides: str):
+    """Set base URLs explicitly (keys as in DEFAULTS); None restores the default."""
+    g = globals()
+    for key, url in overrides.items():
+        if key not in DEFAULTS:
+            raise KeyError(f"unknown endpoint {key!r}")
+        g[key] = (url or DEFAULTS[key]).rstrip("/")
+
+def load_env():
+    """Pick up LJB_<NAME>_URL overrides, e.g. LJB_TWITCH_HELIX_URL."""
+    configure(**{k: os.environ[f"LJB_{k}_URL"] for k in DEFAULTS if os.getenv(f"LJB_{k}_URL")})
+
+def is_overridden(key: str) -> bool:
+    return globals()[key] != DEFAULTS[key]
+
+def twitch_api_kwargs() -> dict:
+    """Extra keyword args for twitchAPI.Twitch(...) when Helix/ID are redirected."""
+    kw = {}
+    if is_overridden("TWITCH_HELIX"):
+        kw["base_url"] = TWITCH_HELIX + "/"
+    if is_overridden("TWITCH_ID"):
+        kw["auth_base_url"] = TWITCH_ID + "/oauth2/"
+    return kw
+
+def eventsub_kwargs() -> dict:
+    return {"connection_url": TWITCH_EVENTSUB} if is_overridden("TWITCH_EVENTSUB") else {}
+
+def patch_twitchio():
+    """
+    twitchio hard-codes its IRC host and token-validate URL; redirect both
+    when they are overridden. No-op against the real Twitch.
+    """
+    if is_overridden("TWITCH_IRC"):
+        import twitchio.websocket
+        twitchio.websocket.HOST = TWITCH_IRC
+    if is_overridden("TWITCH_ID"):
+        import aiohttp
+        from twitchio.http import TwitchHTTP
+        from twitchio.errors import AuthenticationError, HTTPException
+
+        async def validate(self, *, token: str | None = None) -> dict:
+            # TwitchHTTP.validate with the URL swapped: same session, same side effects
+            token = (token or self.token or "").removeprefix("oauth:")
+            if not self.session:
+                self.session = aiohttp.ClientSession()
+            async with self.session.get(f"{TWITCH_ID}/oauth2/validate",
+                                        headers={"Authorization": f"OAuth {token}"}) as r:
+                if r.status == 401:
+                    raise AuthenticationError("Invalid or unauthorized Access Token passed.")
+                if not 200 <= r.status < 300:
+                    raise HTTPException("Unable to validate Access Token: " + await r.text())
+                data = await r.json()
+            if not self.nick:
+                self.nick = data.get("login")
+                self.user_id = data.get("user_id") and int(data["user_id"])
+                self.client_id = data.get("client_id")
+            return data
+
+        TwitchHTTP.validate = validate
+
+load_env()
@@ -0,0 +1,254 @@
+"""
+events.py
+Core pub/sub bus for addons – bot.bus
+• typed events: chat, command, redemption, join, reconnect (Event, __slots__)
+• declarative filters per subscription – prefix, regex, roles, channel, key
+  (command name / reward title) – compiled into ONE dispatch table: every
+  subscriber is a bit; each filter value maps to the mask of subscribers it
+  admits, all regexes run as one combined pattern (unless they carry groups of
+  their own). A message costs one
+  regex match + a few dict lookups and integer ANDs, however many addons
+  are listening.
+• every subscriber has its own bounded queue + worker task; when it is full
+  the oldest event is dropped (and counted) – a slow addon never holds up
+  the bot or the other subscribers
+• subscribing again under the same explicit name replaces the old one
+"""
+
+from __future__ import annotations
+import asyncio, inspect, itertools, logging, re, time
+from typing import Callable, Iterable
+
+TYPES = ("chat", "command", "redemption", "join", "reconnect")
+
+_GLOBAL_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")     # "(?i)…" – already in .flags
+BROADCASTER, MOD, VIP, SUB = 1, 2, 4, 8
+ROLES = {"broadcaster": BROADCASTER, "mod": MOD, "vip": VIP, "sub": SUB}
+
+def role_mask(info) -> int:
+    """Role bits of a users.UserInfo (or anything with the same is_* flags)."""
+    if info is None:
+        return 0
+    return ((info.is_broadcaster and BROADCASTER) | (info.is_mod and MOD)
+            | (info.is_vip and VIP) | (info.is_sub and SUB))
+
+class Event:
+    __slots__ = ("type", "ts", "channel", "login", "user_id", "text", "roles", "key", "args", "raw")
+
+    def __init__(self, type: str, *, channel: str = "", login: str = "", user_id: str | None = None,
+                 text: str = "", roles: int = 0, key: str = "", args: list | None = None, raw=None):
+        self.type, self.ts = type, time.time()
+        self.channel, self.login, self.user_id = channel.lower(), login.lower(), user_id
+        self.text, self.roles, self.key = text, roles, key.lower()
+        self.args, self.raw = args or [], raw
+
+    def __repr__(self):
+        return f"Event({self.type!r}, {self.login!r}, {self.text[:40]!r})"
+
+class Subscription:
+    def __init__(self, bus: "EventBus", name: str, type: str, handler: Callable, *,
+                 prefix: str | Iterable[str] | None, regex, roles: Iterable[str] | None,
+                 channel: str | None, key: str | Iterable[str] | None, maxsize: int):
+        self.bus, self.name, self.type, self.handler = bus, name, type, handler
+        self.prefixes = (prefix,) if isinstance(prefix, str) else tuple(prefix or ())
+        self.regex    = re.compile(regex) if isinstance(regex, str) else regex
+        self.roles    = 0
+        for r in roles or ():
+            if r not in ROLES:
+                raise ValueError(f"unknown role {r!r} (one of {', '.join(ROLES)})")
+            self.roles |= ROLES[r]
+        self.channel  = channel.lower().lstrip("#") if channel else None
+        self.keys     = tuple(k.lower() for k in ((key,) if isinstance(key, str) else (key or ())))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.delivered = self.dropped = self.errors = 0
+        self._task: asyncio.Task | None = None
+
+    def put(self, ev: Event):
+        if self.queue.full():
+            self.queue.get_nowait()              # drop oldest – never block the publisher
+            self.dropped += 1
+        self.queue.put_nowait(ev)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        is_async = inspect.iscoroutinefunction(self.handler)
+        while True:
+            ev = await self.queue.get()
+            try:
+                res = self.handler(ev)
+                if is_async or inspect.isawaitable(res):
+                    await res
+                self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logging.error("[events] %s failed on %s: %s", self.name, ev.type, e)
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+    def stats(self) -> dict:
+        return {"type": self.type, "queued": self.queue.qsize(), "delivered": self.delivered,
+                "dropped": self.dropped, "errors": self.errors}
+
+class _Table:
+    """Compiled filters for one event type; subscriber i is bit 1 << i."""
+
+    def __init__(self, subs: list[Subscription]):
+        self.subs = subs
+        self.no_prefix = self.no_regex = self.no_role = self.no_key = 0
+        self.any_channel = 0
+        self.by_prefix: dict[int, dict[str, int]] = {}    # prefix length -> {prefix: mask}
+        self.by_channel: dict[str, int] = {}
+        self.by_role = [0] * 16                            # role bits -> admitted subscribers
+        self.by_key: dict[str, int] = {}
+        patterns = []
+        for i, s in enumerate(subs):
+            bit = 1 << i
+            if s.prefixes:
+                for p in s.prefixes:
+                    d = self.by_prefix.setdefault(len(p), {})
+                    d[p] = d.get(p, 0) | bit
+            else:
+                self.no_prefix |= bit
+            if s.regex is not None:
+                flags = "".join(f for f, v in (("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X))
+                                if s.regex.flags & v)
+                pat = _GLOBAL_FLAGS.sub("", s.regex.pattern)
+                body = f"(?{flags}:{pat})" if flags else f"(?:{pat})"
+                patterns.append(f"(?=(?P<s{i}>(?s:.*?){body}))?")
+            else:
+                self.no_regex |= bit
+            if s.channel:
+                self.by_channel[s.channel] = self.by_channel.get(s.channel, 0) | bit
+            else:
+                self.any_channel |= bit
+            if s.keys:
+                for k in s.keys:
+                    self.by_key[k] = self.by_key.get(k, 0) | bit
+            else:
+                self.no_key |= bit
+            if not s.roles:
+                self.no_role |= bit
+            for m in range(16):
+                if m & s.roles:
+                    self.by_role[m] |= bit
+        for m in range(16):
+            self.by_role[m] |= self.no_role
+        self.regex, self.separate = None, []
+        rx = [(1 << i, s.regex) for i, s in enumerate(subs) if s.regex is not None]
+        if any(r.groups for _, r in rx):
+            self.separate = rx            # their own groups / backrefs would clash: one by one
+        elif patterns:
+            try:
+                self.regex = re.compile("".join(patterns))
+                self.rx_groups = [(f"s{bit.bit_length() - 1}", bit) for bit, _ in rx]
+            except re.error:
+                self.separate = rx
+
+    def match(self, ev: Event) -> int:
+        m = self.any_channel | self.by_channel.get(ev.channel, 0)
+        m &= self.by_role[ev.roles & 15]
+        if not m:
+            return 0
+        if self.by_key:
+            m &= self.no_key | self.by_key.get(ev.key, 0)
+        if self.by_prefix:
+            hit = self.no_prefix
+            text = ev.text
+            for n, d in self.by_prefix.items():
+                hit |= d.get(text[:n], 0)
+            m &= hit
+        if m and self.regex is not None:
+            hit = self.no_regex
+            mo = self.regex.match(ev.text)
+            for g, bit in self.rx_groups:
+                if mo.group(g) is not None:
+                    hit |= bit
+            m &= hit
+        elif m and self.separate:
+            m &= self.no_regex | sum(bit for bit, rx in self.separate if rx.search(ev.text))
+        return m
+
+class EventBus:
+    def __init__(self):
+        self._subs: dict[str, list[Subscription]] = {t: [] for t in TYPES}
+        self._tables: dict[str, _Table | None] = {}
+        self.published = 0
+        self._ids = itertools.count(1)
+
+    def wants(self, type: str) -> bool:
+        """Cheap check so the core skips building events nobody listens to."""
+        return bool(self._subs.get(type))
+
+    def subscribe(self, type: str, handler: Callable, *, name: str | None = None,
+                  prefix: str | Iterable[str] | None = None, regex=None,
+                  roles: Iterable[str] | None = None, channel: str | None = None,
+                  key: str | Iterable[str] | None = None, maxsize: int = 100) -> Subscription:
+        """
+        handler(event) – sync or async – runs on the subscriber's own worker.
+        Filters are ANDed; prefix / key accept several values (any of them).
+        """
+        if type not in self._subs:
+            raise ValueError(f"unknown event type {type!r} (one of {', '.join(TYPES)})")
+        if name:
+            for subs in self._subs.values():
+                for old in [s for s in subs if s.name == name]:
+                    self.unsubscribe(old)
+        else:
+            name = f"{getattr(handler, '__qualname__', 'handler')}#{next(self._ids)}"
+        sub = Subscription(self, name, type, handler, prefix=prefix, regex=regex, roles=roles,
+                           channel=channel, key=key, maxsize=maxsize)
+        self._subs[type].append(sub)
+        self._tables[type] = None
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        if sub in self._subs.get(sub.type, ()):
+            self._subs[sub.type].remove(sub)
+            self._tables[sub.type] = None
+        if sub._task is not None:
+            sub._task.cancel()
+            sub._task = None
+
+    def publish(self, ev: Event) -> int:
+        """Queue ev for every matching subscriber; never blocks. Returns how many."""
+        subs = self._subs.get(ev.type)
+        if not subs:
+            return 0
+        table = self._tables.get(ev.type)
+        if table is None:
+            table = self._tables[ev.type] = _Table(list(subs))
+        m = table.match(ev)
+        n = 0
+        while m:
+            low = m & -m
+            table.subs[low.bit_length() - 1].put(ev)
+            m ^= low
+            n += 1
+        self.published += 1
+        return n
+
+    async def drain(self, timeout: float = 5.0):
+        """Wait until every subscriber queue is empty (tests, shutdown)."""
+        end = time.monotonic() + timeout
+        while any(s.queue.qsize() for subs in self._subs.values() for s in subs):
+            if time.monotonic() > end:
+                break
+            await asyncio.sleep(0.005)
+
+    async def close(self):
+        tasks = []
+        for subs in self._subs.values():
+            for s in subs:
+                if s._task is not None:
+                    s._task.cancel()
+                    tasks.append(s._task)
+                    s._task = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"published": self.published,
+                **{s.name: s.stats() for subs in self._subs.values() for s in subs}}
@@ -0,0 +1,287 @@
+"""
+eventsub.py
+Lightweight EventSub websocket client – bot.es when "eventsub_client" is "lite"
+• one aiohttp websocket on the bot's own loop (twitchAPI runs a second loop in
+  a thread and hops every callback back across)
+• welcome / keepalive / session_reconnect / revocation are handled here: a
+  missed keepalive or a dropped socket reconnects and re-creates the
+  subscriptions; a session_reconnect moves to the new URL and keeps them
+• frames are parsed with orjson when it is installed (json otherwise) and only
+  the fields a subscription declares are copied out, into a __slots__ record –
+  no model object tree per event
+• the surface the bot uses from EventSubWebsocket: start(), stop(),
+  active_session.id and listen_channel_points_custom_reward_redemption_add()
+"""
+
+from __future__ import annotations
+import asyncio, json, logging
+from collections import OrderedDict
+
+import aiohttp
+
+from . import endpoints
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+REDEMPTION_ADD = "channel.channel_points_custom_reward_redemption.add"
+
+# what a handler gets to read per subscription type ("a.b" → rec.a.b)
+FIELDS = {
+    REDEMPTION_ADD: ("id", "broadcaster_user_login", "user_id", "user_login", "user_name",
+                     "user_input", "reward.title"),
+}
+
+# ── event records ─────────────────────────────────────────────────────
+class Record:
+    """Base of the per-type records made by record_type()."""
+    __slots__ = ()
+    _flat: tuple = ()
+    _nested: tuple = ()      # (name, Record subclass)
+
+    @classmethod
+    def decode(cls, d: dict):
+        r = cls.__new__(cls)
+        get = d.get
+        for k in cls._flat:
+            setattr(r, k, get(k))
+        for k, sub in cls._nested:
+            setattr(r, k, sub.decode(get(k) or {}))
+        return r
+
+    def as_dict(self) -> dict:
+        out = {k: getattr(self, k) for k in self._flat}
+        out.update((k, getattr(self, k).as_dict()) for k, _ in self._nested)
+        return out
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+def record_type(name: str, fields) -> type[Record]:
+    """A Record subclass holding exactly `fields` (dotted paths nest)."""
+    flat, nested = [], {}
+    for f in fields:
+        head, _, rest = f.partition(".")
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        elif head not in flat:
+            flat.append(head)
+    subs = tuple((k, record_type(f"{name}_{k}", v)) for k, v in nested.items())
+    return type(name, (Record,), {"__slots__": tuple(flat) + tuple(k for k, _ in subs),
+                                  "_flat": tuple(flat), "_nested": subs})
+
+class Notification:
+    """What a callback receives: evt.event is the decoded Record."""
+    __slots__ = ("subscription_type", "message_id", "event")
+
+    def __init__(self, subscription_type: str, message_id: str, event: Record):
+        self.subscription_type, self.message_id, self.event = subscription_type, message_id, event
+
+class Session:
+    __slots__ = ("id", "status", "keepalive_timeout_seconds", "reconnect_url")
+
+    def __init__(self, d: dict):
+        self.id = d.get("id")
+        self.status = d.get("status")
+        self.keepalive_timeout_seconds = d.get("keepalive_timeout_seconds") or 10
+        self.reconnect_url = d.get("reconnect_url")
+
+class _Sub:
+    __slots__ = ("type", "version", "condition", "callback", "record")
+
+    def __init__(self, sub_type, version, condition, callback, record):
+        self.type, self.version, self.condition = sub_type, version, condition
+        self.callback, self.record = callback, record
+
+# ── client ────────────────────────────────────────────────────────────
+class EventSubLite:
+    def __init__(self, twitch, *, connection_url: str | None = None, keepalive_slack_s: float = 2.0):
+        self.twitch = twitch                 # twitchAPI.Twitch – app id + refreshed user token
+        self.connection_url = connection_url or endpoints.TWITCH_EVENTSUB
+        self.slack = keepalive_slack_s
+        self.active_session: Session | None = None
+        self._subs: dict[str, _Sub] = {}     # subscription id -> what to re-create on reconnect
+        self._records: dict[tuple, type[Record]] = {}
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._cb_tasks: set[asyncio.Task] = set()
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._http: aiohttp.ClientSession | None = None
+        self._task: asyncio.Task | None = None
+        self.counts = {"notifications": 0, "duplicates": 0, "keepalives": 0,
+                       "moves": 0, "reconnects": 0, "revoked": 0}
+
+    async def start(self):
+        """Connects and waits for the welcome; frames are read by a task from here on."""
+        if self._http is None:
+            self._http = aiohttp.ClientSession()
+        self._ws = await self._connect(self.connection_url)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    # ── subscriptions ─────────────────────────────────────────────────
+    async def listen(self, sub_type: str, version: str, condition: dict, callback,
+                     fields=None) -> str:
+        """Subscribe; callback(Notification) gets only `fields` (default: FIELDS[sub_type])."""
+        fields = tuple(fields or FIELDS.get(sub_type, ()))
+        if not fields:
+            raise ValueError(f"no fields declared for {sub_type!r}")
+        rec = self._records.get((sub_type, fields))
+        if rec is None:
+            name = "".join(p.title() for p in sub_type.replace("_", ".").split(".")) + "Event"
+            rec = self._records[(sub_type, fields)] = record_type(name, fields)
+        return await self._subscribe(_Sub(sub_type, version, condition, callback, rec))
+
+    def listen_channel_points_custom_reward_redemption_add(self, broadcaster_user_id: str, callback,
+                                                           reward_id: str | None = None):
+        cond = {"broadcaster_user_id": broadcaster_user_id}
+        if reward_id:
+            cond["reward_id"] = reward_id
+        return self.listen(REDEMPTION_ADD, "1", cond, callback)
+
+    async def _subscribe(self, sub: _Sub) -> str:
+        token = await self.twitch.get_refreshed_user_auth_token()
+        body = {"type": sub.type, "version": sub.version, "condition": sub.condition,
+                "transport": {"method": "websocket", "session_id": self.active_session.id}}
+        async with self._http.post(f"{endpoints.TWITCH_HELIX}/eventsub/subscriptions", json=body,
+                                   headers={"Client-ID": self.twitch.app_id,
+                                            "Authorization": f"Bearer {token}"}) as r:
+            data = _loads(await r.read() or b"{}")
+            if r.status >= 300:
+                raise RuntimeError(f"EventSub subscribe {sub.type}: {r.status} {data.get('message', '')}")
+        sid = data["data"][0]["id"]
+        self._subs[sid] = sub
+        return sid
+
+    async def _resubscribe(self):
+        subs, self._subs = list(self._subs.values()), {}
+        for sub in subs:
+            try:
+                await self._subscribe(sub)
+            except Exception as e:
+                logging.error("[eventsub] resubscribe %s: %s", sub.type, e)
+
+    # ── socket ────────────────────────────────────────────────────────
+    async def _connect(self, url: str) -> aiohttp.ClientWebSocketResponse:
+        ws = await self._http.ws_connect(url)
+        try:
+            msg = await ws.receive(timeout=10)
+            frame = _loads(msg.data) if msg.type == aiohttp.WSMsgType.TEXT else {}
+            if frame.get("metadata", {}).get("message_type") != "session_welcome":
+                raise RuntimeError(f"EventSub: no welcome from {url}")
+        except BaseException:
+            await ws.close()
+            raise
+        self.active_session = Session(frame["payload"]["session"])
+        return ws
+
+    async def _run(self):
+        while True:
+            ws = self._ws
+            try:
+                msg = await ws.receive(timeout=self.active_session.keepalive_timeout_seconds + self.slack)
+            except asyncio.TimeoutError:
+                logging.warning("[eventsub] keepalive missed – reconnecting")
+                await self._reconnect()
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                url = self._on_text(msg.data)
+                if url:
+                    await self._move(url)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                logging.warning("[eventsub] socket closed (%s) – reconnecting", ws.close_code)
+                await self._reconnect()
+
+    async def _move(self, url: str):
+        """session_reconnect: the old socket keeps delivering until the new one is welcomed."""
+        old = self._ws
+
+        async def drain():
+            async for msg in old:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._on_text(msg.data)
+        rest = asyncio.create_task(drain())
+        try:
+            self._ws = await self._connect(url)
+            self.counts["moves"] += 1
+        except Exception as e:
+            logging.warning("[eventsub] session_reconnect failed (%s) – reconnecting", e)
+            rest.cancel()
+            await self._reconnect()
+            return
+        await old.close()
+        await asyncio.gather(rest, return_exceptions=True)
+
+    async def _reconnect(self):
+        """Dropped or silent: a new session, so every subscription is created again."""
+        if self._ws is not None:
+            await self._ws.close()
+        delay = 1.0
+        while True:
+            try:
+                self._ws = await self._connect(self.connection_url)
+                break
+            except Exception as e:
+                logging.warning("[eventsub] connect failed (%s) – retrying in %.0fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        self.counts["reconnects"] += 1
+        await self._resubscribe()
+
+    def _on_text(self, raw) -> str | None:
+        """Handle one frame; returns the reconnect URL for a session_reconnect."""
+        frame = _loads(raw)
+        meta = frame["metadata"]
+        kind = meta["message_type"]
+        if kind == "notification":
+            self._notify(meta, frame["payload"])
+        elif kind == "session_keepalive":
+            self.counts["keepalives"] += 1
+        elif kind == "session_reconnect":
+            return frame["payload"]["session"]["reconnect_url"]
+        elif kind == "revocation":
+            sub = frame["payload"]["subscription"]
+            self._subs.pop(sub.get("id"), None)
+            self.counts["revoked"] += 1
+            logging.warning("[eventsub] %s revoked: %s", sub.get("type"), sub.get("status"))
+        return None
+
+    def _notify(self, meta: dict, payload: dict):
+        mid = meta.get("message_id")
+        if mid in self._seen:                # Twitch may deliver a message twice
+            self.counts["duplicates"] += 1
+            return
+        self._seen[mid] = None
+        if len(self._seen) > 500:
+            self._seen.popitem(last=False)
+        sub = self._subs.get(payload["subscription"]["id"])
+        if sub is None:
+            logging.debug("[eventsub] notification for unknown subscription %s", payload["subscription"]["id"])
+            return
+        self.counts["notifications"] += 1
+        t = asyncio.ensure_future(sub.callback(Notification(sub.type, mid, sub.record.decode(payload["event"]))))
+        self._cb_tasks.add(t)
+        t.add_done_callback(self._cb_done)
+
+    def _cb_done(self, t: asyncio.Task):
+        self._cb_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logging.error("[eventsub] callback failed: %r", t.exception())
+
+    def stats(self) -> dict:
+        return {"session": self.active_session.id if self.active_session else None,
+                "subscriptions": len(self._subs), **self.counts}
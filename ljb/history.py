@@ -0,0 +1,274 @@
+"""
+history.py
+Recent chat for addons – bot.history
+• fixed-size ring of __slots__ records (memory is capped by `capacity`,
+  whatever the message rate); text is clipped to Twitch's 500 chars
+• per-user and per-keyword indexes hold ring sequence numbers only and are
+  trimmed in the same step that overwrites a ring slot
+• async query API (recent / last_seen / count / scan_log)
+• optional append-only segment log (JSONL, size-rotated, oldest segments
+  dropped) for retention past the ring
+• snapshot() / restore(): the ring survives a restart (bot.snapshots); restored
+  records are not written to the segment log a second time
+"""
+
+from __future__ import annotations
+import asyncio, json, logging, re, time
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+
+F_MOD, F_BROADCASTER, F_SUB, F_VIP, F_CMD = 1, 2, 4, 8, 16
+MAX_TEXT = 500
+_WORD = re.compile(r"[\w']{3,32}")
+
+class ChatRecord:
+    __slots__ = ("seq", "ts", "login", "display", "user_id", "text", "flags")
+
+    def __init__(self, seq: int, ts: float, login: str, display: str, user_id: str | None,
+                 text: str, flags: int):
+        self.seq, self.ts, self.login, self.display = seq, ts, login, display
+        self.user_id, self.text, self.flags = user_id, text, flags
+
+    @property
+    def is_mod(self) -> bool:
+        return bool(self.flags & (F_MOD | F_BROADCASTER))
+
+    @property
+    def is_command(self) -> bool:
+        return bool(self.flags & F_CMD)
+
+    def as_dict(self) -> dict:
+        return {"seq": self.seq, "ts": self.ts, "login": self.login, "display": self.display,
+                "user_id": self.user_id, "text": self.text, "flags": self.flags}
+
+    def __repr__(self):
+        return f"ChatRecord({self.seq}, {self.login!r}, {self.text[:40]!r})"
+
+def keywords(text: str, limit: int = 8) -> tuple[str, ...]:
+    """Lower-cased distinct words (3+ chars) – at most `limit` per message."""
+    out: dict[str, None] = {}
+    for w in _WORD.findall(text.lower()):
+        out[w] = None
+        if len(out) >= limit:
+            break
+    return tuple(out)
+
+class SegmentLog:
+    """Append-only JSONL segments: chat_000001.jsonl, chat_000002.jsonl, …"""
+
+    def __init__(self, folder: str | Path, segment_mb: float = 8, keep: int = 10):
+        self.dir   = Path(folder)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.limit = int(segment_mb * 2**20)
+        self.keep  = keep
+        segs = self.segments()
+        self.n = int(segs[-1].stem.split("_")[1]) if segs else 1
+        self._fh = None
+
+    def segments(self) -> list[Path]:
+        return sorted(self.dir.glob("chat_*.jsonl"))
+
+    def _open(self):
+        self._fh = open(self.dir / f"chat_{self.n:06d}.jsonl", "a", encoding="utf-8", buffering=1 << 16)
+
+    def append(self, rec: ChatRecord):
+        if self._fh is None:
+            self._open()
+        self._fh.write(json.dumps(rec.as_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+        if self._fh.tell() >= self.limit:
+            self._fh.close()
+            self.n += 1
+            self._open()
+            for old in self.segments()[:-self.keep]:
+                old.unlink(missing_ok=True)
+
+    def flush(self):
+        if self._fh:
+            self._fh.flush()
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    def scan(self, login: str | None = None, keyword: str | None = None,
+             limit: int = 100) -> list[dict]:
+        """Newest-first matches from the on-disk segments."""
+        out: list[dict] = []
+        for seg in reversed(self.segments()):
+            try:
+                with open(seg, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:        # rotated away meanwhile
+                continue
+            for line in reversed(lines):
+                try:
+                    d = json.loads(line)
+                except ValueError:
+                    continue
+                if login and d["login"] != login:
+                    continue
+                if keyword and keyword not in keywords(d["text"], 64):
+                    continue
+                out.append(d)
+                if len(out) >= limit:
+                    return out
+        return out
+
+class ChatHistory:
+    def __init__(self, capacity: int = 5000, *, log_dir: str | Path | None = None,
+                 segment_mb: float = 8, keep_segments: int = 10, keywords_per_msg: int = 8):
+        self.capacity = max(1, int(capacity))
+        self.ring: list[ChatRecord | None] = [None] * self.capacity
+        self.seq      = 0                               # next sequence number
+        self.by_user: dict[str, deque[int]] = {}
+        self.by_word: dict[str, deque[int]] = {}
+        self.kw_limit = keywords_per_msg
+        self.log      = SegmentLog(log_dir, segment_mb, keep_segments) if log_dir else None
+
+    # ── writes ────────────────────────────────────────────────────────
+    def add(self, msg) -> ChatRecord:
+        """Record a twitchio Message (or anything shaped like one)."""
+        a = msg.author
+        flags = ((F_MOD if getattr(a, "is_mod", False) else 0)
+                 | (F_BROADCASTER if getattr(a, "is_broadcaster", False) else 0)
+                 | (F_SUB if getattr(a, "is_subscriber", False) else 0)
+                 | (F_VIP if getattr(a, "is_vip", False) else 0)
+                 | (F_CMD if msg.content.startswith("!") else 0))
+        login = a.name.lower()
+        uid = getattr(a, "id", None)
+        return self.append(login, getattr(a, "display_name", None) or a.name,
+                           str(uid) if uid else None, msg.content, flags)
+
+    def append(self, login: str, display: str, user_id: str | None, text: str,
+               flags: int = 0, ts: float | None = None) -> ChatRecord:
+        seq  = self.seq
+        slot = seq % self.capacity
+        old  = self.ring[slot]
+        if old is not None:
+            self._unindex(old)
+        text = text[:MAX_TEXT]
+        rec  = ChatRecord(seq, ts if ts is not None else time.time(), login, display, user_id, text, flags)
+        self.ring[slot] = rec
+        self.seq = seq + 1
+        self.by_user.setdefault(login, deque()).append(seq)
+        for w in keywords(text, self.kw_limit):
+            self.by_word.setdefault(w, deque()).append(seq)
+        if self.log:
+            try:
+                self.log.append(rec)
+            except OSError as e:
+                logging.error("[history] segment log write failed: %s", e)
+        return rec
+
+    def _unindex(self, rec: ChatRecord):
+        # rec is the oldest record in the ring, so its seq is at the head of every index deque
+        self._pop_head(self.by_user, rec.login, rec.seq)
+        for w in keywords(rec.text, self.kw_limit):
+            self._pop_head(self.by_word, w, rec.seq)
+
+    @staticmethod
+    def _pop_head(index: dict[str, deque[int]], key: str, seq: int):
+        dq = index.get(key)
+        if dq and dq[0] == seq:
+            dq.popleft()
+            if not dq:
+                del index[key]
+
+    # ── reads ─────────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return min(self.seq, self.capacity)
+
+    def _get(self, seq: int) -> ChatRecord | None:
+        if seq < self.seq - self.capacity or seq >= self.seq:
+            return None
+        return self.ring[seq % self.capacity]
+
+    def _iter_newest(self, seqs=None) -> Iterator[ChatRecord]:
+        if seqs is None:
+            seqs = range(self.seq - 1, max(-1, self.seq - self.capacity - 1), -1)
+        else:
+            seqs = reversed(seqs)
+        for s in seqs:
+            rec = self._get(s)
+            if rec is not None:
+                yield rec
+
+    def query(self, n: int = 50, *, user: str | None = None, keyword: str | None = None,
+              since: float | None = None, contains: str | None = None) -> list[ChatRecord]:
+        """Newest-first records matching every given filter (sync, O(matches))."""
+        if user is not None and keyword is not None:
+            ua = self.by_user.get(user.lower(), ())
+            kw = set(self.by_word.get(keyword.lower(), ()))
+            seqs = [s for s in ua if s in kw]
+        elif user is not None:
+            seqs = self.by_user.get(user.lower(), ())
+        elif keyword is not None:
+            seqs = self.by_word.get(keyword.lower(), ())
+        else:
+            seqs = None
+        needle = contains.lower() if contains else None
+        out = []
+        for rec in self._iter_newest(seqs):
+            if since is not None and rec.ts < since:
+                break
+            if needle and needle not in rec.text.lower():
+                continue
+            out.append(rec)
+            if len(out) >= n:
+                break
+        return out
+
+    async def recent(self, n: int = 50, **filters) -> list[ChatRecord]:
+        return self.query(n, **filters)
+
+    async def last_seen(self, user: str) -> ChatRecord | None:
+        dq = self.by_user.get(user.lower())
+        return self._get(dq[-1]) if dq else None
+
+    async def count(self, user: str, window_s: float) -> int:
+        """Messages from `user` in the last `window_s` seconds (spam checks)."""
+        cutoff, n = time.time() - window_s, 0
+        for rec in self._iter_newest(self.by_user.get(user.lower(), ())):
+            if rec.ts < cutoff:
+                break
+            n += 1
+        return n
+
+    async def scan_log(self, user: str | None = None, keyword: str | None = None,
+                       limit: int = 100) -> list[dict]:
+        """Search the on-disk segments (older than the ring); runs in a thread."""
+        if not self.log:
+            return []
+        self.log.flush()
+        return await asyncio.to_thread(self.log.scan, user.lower() if user else None,
+                                       keyword.lower() if keyword else None, limit)
+
+    # ── warm restart ──────────────────────────────────────────────────
+    def snapshot(self) -> list[list]:
+        """Ring contents oldest-first as [ts, login, display, user_id, text, flags]."""
+        return [[round(r.ts, 3), r.login, r.display if r.display != r.login else None,
+                 r.user_id, r.text, r.flags] for r in reversed(list(self._iter_newest()))]
+
+    def restore(self, rows: list[list]):
+        """Replay a snapshot ahead of anything recorded since start (call before chat flows)."""
+        live = list(reversed(list(self._iter_newest())))
+        log, self.log = self.log, None                  # all of it is on disk already
+        try:
+            self.ring = [None] * self.capacity
+            self.seq, self.by_user, self.by_word = 0, {}, {}
+            for ts, login, display, user_id, text, flags in rows[-self.capacity:]:
+                self.append(login, display or login, user_id, text, flags, ts)
+            for r in live:
+                self.append(r.login, r.display, r.user_id, r.text, r.flags, r.ts)
+        finally:
+            self.log = log
+
+    def stats(self) -> dict:
+        return {"records": len(self), "total": self.seq, "users": len(self.by_user),
+                "keywords": len(self.by_word)}
+
+    def close(self):
+        if self.log:
+            self.log.close()
@@ -0,0 +1,180 @@
+"""
+log_setup.py
+Non-blocking logging for the bot
+• every logging call only enqueues the record (QueueHandler); a background
+  QueueListener thread does the formatting + disk/console I/O
+• DailyRotatingHandler: bot_<date>.txt, rolls over at midnight *and* when the
+  file exceeds max_bytes, gzips closed files, enforces a retention budget
+• optional structured JSON-lines output (one object per record)
+"""
+
+from __future__ import annotations
+import atexit, datetime, gzip, json, logging, logging.handlers, os, queue, re, shutil, time
+from pathlib import Path
+
+# attributes every LogRecord has – anything else was passed via extra={...}
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra={...} fields are kept as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts":     datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level":  record.levelname,
+            "logger": record.name,
+            "msg":    record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS and not k.startswith("_"):
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+class DailyRotatingHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Writes to <dir>/<prefix>_<YYYY-MM-DD><suffix>.
+    Rolls over when the date changes or the file grows past max_bytes
+    (size roll-overs become <prefix>_<date>.<n><suffix>). Closed files are
+    gzipped; oldest archives are deleted once the total size of the log
+    directory exceeds keep_bytes or an archive is older than keep_days.
+    Only ever called from the listener thread, never from the event loop.
+    """
+
+    def __init__(self, log_dir: Path, prefix: str = "bot", suffix: str = ".txt",
+                 max_bytes: int = 10 * 1024 * 1024, keep_bytes: int = 100 * 1024 * 1024,
+                 keep_days: int = 14, compress: bool = True):
+        self.log_dir    = Path(log_dir)
+        self.prefix     = prefix
+        self.suffix     = suffix
+        self.max_bytes  = max_bytes
+        self.keep_bytes = keep_bytes
+        self.keep_days  = keep_days
+        self.compress   = compress
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._day = datetime.date.today()
+        super().__init__(self._path_for(self._day), "a", encoding="utf-8", delay=True)
+        # finish anything a previous run left behind (e.g. yesterday's file)
+        self._archive_stale()
+
+    def _path_for(self, day: datetime.date) -> str:
+        return str(self.log_dir / f"{self.prefix}_{day}{self.suffix}")
+
+    def shouldRollover(self, record) -> bool:
+        if datetime.date.today() != self._day:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.stream.tell() >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        today = datetime.date.today()
+        if today == self._day and os.path.exists(self.baseFilename):
+            # size roll-over: park the full file under the next free index
+            n = 1
+            while self._exists_any(f"{self.prefix}_{self._day}.{n}{self.suffix}"):
+                n += 1
+            os.replace(self.baseFilename, self.log_dir / f"{self.prefix}_{self._day}.{n}{self.suffix}")
+        self._day = today
+        self.baseFilename = self._path_for(today)
+        self._archive_stale()
+
+    def _exists_any(self, name: str) -> bool:
+        return (self.log_dir / name).exists() or (self.log_dir / (name + ".gz")).exists()
+
+    def _archive_stale(self):
+        """Gzip every closed plain log file, then enforce the retention budget."""
+        pat = re.compile(rf"^{re.escape(self.prefix)}_\d{{4}}-\d{{2}}-\d{{2}}(\.\d+)?{re.escape(self.suffix)}$")
+        active = os.path.basename(self.baseFilename)
+        for f in self.log_dir.iterdir():
+            if f.name == active or not pat.match(f.name):
+                continue
+            if self.compress:
+                try:
+                    with open(f, "rb") as src, gzip.open(str(f) + ".gz", "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    f.unlink()
+                except OSError:
+                    pass
+        self._enforce_retention()
+
+    def _enforce_retention(self):
+        archives = sorted(
+            (f for f in self.log_dir.glob(f"{self.prefix}_*")
+             if f.name != os.path.basename(self.baseFilename)),
+            key=lambda f: f.stat().st_mtime,
+        )
+        cutoff = time.time() - self.keep_days * 86400 if self.keep_days > 0 else None
+        total  = sum(f.stat().st_size for f in archives)
+        for f in archives:
+            too_old = cutoff is not None and f.stat().st_mtime < cutoff
+            if not too_old and (self.keep_bytes <= 0 or total <= self.keep_bytes):
+                continue
+            try:
+                size = f.stat().st_size
+                f.unlink()
+                total -= size
+            except OSError:
+                pass
+
+_listener: logging.handlers.QueueListener | None = None
+_atexit_registered = False
+
+def setup_logging(log_dir: Path, *, json_format: bool = False, level: int = logging.INFO,
+                  max_mb: float = 10, keep_mb: float = 100, keep_days: int = 14,
+                  console: bool = True) -> logging.handlers.QueueListener:
+    """
+    Route the root logger through a queue to a background writer thread.
+    Safe to call more than once – the previous listener is stopped and its
+    handlers closed first.
+    """
+    global _listener, _atexit_registered
+    stop_logging()
+
+    fmt = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    file_h = DailyRotatingHandler(
+        log_dir,
+        suffix=".jsonl" if json_format else ".txt",
+        max_bytes=int(max_mb * 1024 * 1024),
+        keep_bytes=int(keep_mb * 1024 * 1024),
+        keep_days=keep_days,
+    )
+    file_h.setFormatter(fmt)
+    handlers: list[logging.Handler] = [file_h]
+    if console:
+        con_h = logging.StreamHandler()
+        con_h.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(con_h)
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+    root.addHandler(logging.handlers.QueueHandler(q))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(stop_logging)
+        _atexit_registered = True
+    return _listener
+
+def stop_logging():
+    """Flush everything still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
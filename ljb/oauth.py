@@ -3,111 +3,68 @@
 """
 oauth.py
 • Handles FIRST-TIME OAuth flow for *streamer* account
-• Handles synchronous token refresh at launch for streamer
-• Provides a callable to refresh the bot’s IRC token at launch
-Now uses .env for all secrets. Only streamer tokens & channel are stored in config.json.
+• Launch checks over a shared httpx client, run concurrently by the
+  startup pipeline (startup.py): validate / refresh the bot's IRC token,
+  refresh the streamer's token
+• refresh_grant_async – the one refresh_token grant, also used by the
+  runtime token manager (tokens.py)
+CLIENT_ID/SECRET and the initial bot tokens come from .env; refreshed tokens
+and the streamer tokens are kept in the state store (store.py).
 """
 
 from __future__ import annotations
 import http.server
 import socketserver
 import threading
-import webbrowser
-import requests
 import time
-import json
-import asyncio
 import os
 from urllib.parse import urlparse, parse_qs, quote_plus
 from typing import Callable
 
-from twitchAPI.twitch import Twitch
-from twitchAPI.type import AuthScope
-
-from dotenv import load_dotenv
-load_dotenv()
+from . import endpoints
+from .atomic import atomic_write_text
 
 PORT         = 8765
 REDIRECT_URI = f"http://localhost:{PORT}/"
 
-# Load secrets from .env
-CLIENT_ID         = os.getenv("CLIENT_ID")
-CLIENT_SECRET     = os.getenv("CLIENT_SECRET")
-BOT_ACCESS_TOKEN  = os.getenv("BOT_ACCESS_TOKEN")
-BOT_REFRESH_TOKEN = os.getenv("BOT_REFRESH_TOKEN")
+# Secrets come from .env, loaded by twitch_bot.main() – always read them
+# with os.getenv() at call time. `requests` is imported lazily by the
+# first-time streamer authorisation only.
 
 # --- Helper: Update .env after token refresh ---
-def update_env_var(key, value, env_file=".env"):
+def update_env_vars(values: dict, env_file=".env"):
+    """Set several KEY=value lines in one atomic rewrite of .env."""
     import re
     if os.path.exists(env_file):
         with open(env_file, "r") as f:
             lines = f.readlines()
     else:
         lines = []
-    found = False
+    todo = dict(values)
     for i, line in enumerate(lines):
-        if re.match(rf"^{re.escape(key)}=", line):
-            lines[i] = f"{key}={value}\n"
-            found = True
-            break
-    if not found:
+        for key in list(todo):
+            if re.match(rf"^{re.escape(key)}=", line):
+                lines[i] = f"{key}={todo.pop(key)}\n"
+                break
+    for key, value in todo.items():
         lines.append(f"{key}={value}\n")
-    with open(env_file, "w") as f:
-        f.writelines(lines)
-
-def refresh_bot_token_env():
-    """Refresh the bot's access token using its refresh token, and update .env."""
-    global BOT_ACCESS_TOKEN, BOT_REFRESH_TOKEN
-    if not (CLIENT_ID and CLIENT_SECRET and BOT_REFRESH_TOKEN):
-        print("[OAuth] Cannot refresh: missing CLIENT_ID, CLIENT_SECRET, or BOT_REFRESH_TOKEN in .env")
-        return False
-    r = requests.post(
-        "https://id.twitch.tv/oauth2/token",
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": BOT_REFRESH_TOKEN,
-            "client_id": CLIENT_ID,
-            "client_secret": CLIENT_SECRET,
-        }
-    )
-    if r.status_code != 200:
-        print("[OAuth] Refresh failed! Status:", r.status_code, r.text)
-        return False
-    d = r.json()
-    update_env_var("BOT_ACCESS_TOKEN", d["access_token"])
-    update_env_var("BOT_REFRESH_TOKEN", d["refresh_token"])
-    os.environ["BOT_ACCESS_TOKEN"] = d["access_token"]
-    os.environ["BOT_REFRESH_TOKEN"] = d["refresh_token"]
-    print("[OAuth] Bot access token refreshed and saved to .env")
-    return True
+    atomic_write_text(env_file, "".join(lines))
 
-def ensure_valid_bot_token():
-    """
-    Validate the bot's access token, auto-refresh if needed, and update .env.
-    Returns True if valid, False if unable to recover.
-    """
-    token = os.getenv("BOT_ACCESS_TOKEN")
-    r = requests.get(
-        "https://id.twitch.tv/oauth2/validate",
-        headers={"Authorization": f"OAuth {token}"}
-    )
-    if r.status_code == 200:
-        return True  # Token is valid
-    print("[OAuth] Invalid bot access token; attempting to refresh...")
-    if refresh_bot_token_env():
-        # Re-check after refresh
-        token = os.getenv("BOT_ACCESS_TOKEN")
-        r = requests.get(
-            "https://id.twitch.tv/oauth2/validate",
-            headers={"Authorization": f"OAuth {token}"}
-        )
-        if r.status_code == 200:
-            print("[OAuth] Refreshed token is valid!")
-            return True
-    print("[OAuth] Unable to refresh bot token. Please re-authorize.")
-    return False
+def update_env_var(key, value, env_file=".env"):
+    update_env_vars({key: value}, env_file)
+
+def save_bot_tokens(access: str, refresh: str):
+    """Persist refreshed bot tokens: state store when open, else .env."""
+    from .store import current, save_bot_tokens as to_store
+    store = current()
+    if store is not None:
+        to_store(store, access, refresh)
+    else:
+        update_env_vars({"BOT_ACCESS_TOKEN": access, "BOT_REFRESH_TOKEN": refresh})
+        os.environ["BOT_ACCESS_TOKEN"] = access
+        os.environ["BOT_REFRESH_TOKEN"] = refresh
 
-# -- STREAMER OAUTH & REFRESH -- (UNCHANGED FROM YOURS)
+# -- STREAMER OAUTH -- (UNCHANGED FROM YOURS)
 
 def ensure_streamer_tokens(
     cfg: dict,
@@ -116,6 +73,7 @@ def ensure_streamer_tokens(
 ):
     if cfg.get("streamer_access_token"):
         return  # already authorised
+    import requests, webbrowser
 
     box = {}
     class Handler(http.server.BaseHTTPRequestHandler):
@@ -138,7 +96,7 @@ def ensure_streamer_tokens(
     threading.Thread(target=svr.serve_forever, daemon=True).start()
 
     auth_url = (
-        "https://id.twitch.tv/oauth2/authorize"
+        f"{endpoints.TWITCH_ID}/oauth2/authorize"
         f"?response_type=code"
         f"&client_id={os.getenv('CLIENT_ID')}"
         f"&redirect_uri={quote_plus(REDIRECT_URI)}"
@@ -152,7 +110,7 @@ def ensure_streamer_tokens(
     svr.server_close()
 
     resp = requests.post(
-        "https://id.twitch.tv/oauth2/token",
+        f"{endpoints.TWITCH_ID}/oauth2/token",
         data={
             "client_id":     os.getenv("CLIENT_ID"),
             "client_secret": os.getenv("CLIENT_SECRET"),
@@ -167,7 +125,7 @@ def ensure_streamer_tokens(
     cfg["streamer_refresh_token"] = d["refresh_token"]
 
     me = requests.get(
-        "https://api.twitch.tv/helix/users",
+        f"{endpoints.TWITCH_HELIX}/users",
         headers={
             "Client-ID":     os.getenv("CLIENT_ID"),
             "Authorization": f"Bearer {d['access_token']}"
@@ -178,29 +136,84 @@ def ensure_streamer_tokens(
     save_cfg(cfg)
     print("[OAuth] Streamer tokens stored.")
 
-def refresh_streamer_sync(
+# -- LAUNCH CHECKS (shared httpx.AsyncClient, used by startup.py) --
+
+async def validate_token_async(cli, token: str | None) -> dict | None:
+    """Return the /validate payload (login, user_id, scopes, expires_in) or None."""
+    if not token:
+        return None
+    r = await cli.get(
+        f"{endpoints.TWITCH_ID}/oauth2/validate",
+        headers={"Authorization": f"OAuth {token}"}
+    )
+    return r.json() if r.status_code == 200 else None
+
+async def refresh_grant_async(cli, refresh_token: str) -> dict:
+    """Plain refresh_token grant; returns the token response, raises on failure."""
+    r = await cli.post(
+        f"{endpoints.TWITCH_ID}/oauth2/token",
+        data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": os.getenv("CLIENT_ID"),
+            "client_secret": os.getenv("CLIENT_SECRET"),
+        }
+    )
+    r.raise_for_status()
+    return r.json()
+
+async def refresh_bot_token_async(cli) -> bool:
+    """Refresh the bot's IRC token from BOT_REFRESH_TOKEN and save both tokens; False on failure."""
+    refresh = os.getenv("BOT_REFRESH_TOKEN")
+    if not (os.getenv("CLIENT_ID") and os.getenv("CLIENT_SECRET") and refresh):
+        print("[OAuth] Cannot refresh: missing CLIENT_ID, CLIENT_SECRET, or BOT_REFRESH_TOKEN in .env")
+        return False
+    try:
+        d = await refresh_grant_async(cli, refresh)
+    except Exception as e:
+        print("[OAuth] Refresh failed!", e)
+        return False
+    save_bot_tokens(d["access_token"], d["refresh_token"])
+    print("[OAuth] Bot access token refreshed and saved.")
+    return True
+
+async def ensure_valid_bot_token_async(cli) -> dict | None:
+    """
+    Validate the bot's access token, refreshing (and saving) it once if
+    Twitch rejects it. Returns the validate payload, or None when the bot
+    has to be re-authorised (generate_bot_token.py).
+    """
+    info = await validate_token_async(cli, os.getenv("BOT_ACCESS_TOKEN"))
+    if info:
+        return info
+    print("[OAuth] Invalid bot access token; attempting to refresh...")
+    if await refresh_bot_token_async(cli):
+        info = await validate_token_async(cli, os.getenv("BOT_ACCESS_TOKEN"))
+        if info:
+            print("[OAuth] Refreshed token is valid!")
+            return info
+    print("[OAuth] Unable to refresh bot token. Please re-authorize.")
+    return None
+
+async def refresh_streamer_async(
+    cli,
     cfg: dict,
     save_cfg: Callable[[dict], None],
-):
+) -> dict | None:
+    """
+    Refresh the streamer's token at launch and save it through save_cfg.
+    Returns the token response, or None when there is no refresh token or
+    the refresh failed (the bot then starts with the stored access token).
+    """
     if not cfg.get("streamer_refresh_token"):
-        return
-
+        return None
     try:
-        resp = requests.post(
-            "https://id.twitch.tv/oauth2/token",
-            data={
-                "client_id":     os.getenv("CLIENT_ID"),
-                "client_secret": os.getenv("CLIENT_SECRET"),
-                "grant_type":    "refresh_token",
-                "refresh_token": cfg["streamer_refresh_token"],
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        j = resp.json()
+        j = await refresh_grant_async(cli, cfg["streamer_refresh_token"])
         cfg["streamer_access_token"]  = j["access_token"]
         cfg["streamer_refresh_token"] = j["refresh_token"]
         save_cfg(cfg)
         print("[OAuth] Streamer access token refreshed.")
+        return j
     except Exception as e:
         print("[OAuth] Streamer token refresh failed:", e)
+        return None
@@ -0,0 +1,223 @@
+"""
+quota.py
+Per-addon resource quotas – every addon gets an AddonContext instead of the
+bare bot (register / start / stop), so a misbehaving addon is throttled
+instead of starving the core or the other addons:
+• tasks  – ctx.create_task() / ctx.track(): at most `tasks` running at once,
+  the rest wait their turn; past `task_queue` waiting, new ones are dropped
+  (their future fails with QuotaExceeded; a dropped redemption is logged)
+• ctx.register – the addon's chat commands run through this context
+• http   – ctx.http: the shared httpx client (bot.http) behind a semaphore
+  of `http` concurrent requests
+• chat   – ctx.safe_send(): its own slice (`chat_share`) of the outbound
+  budget; past `chat_queue` waiting messages, new ones are dropped
+• ctx.pending_tasks – started by the core under the task quota
+• ctx.schedule – bot.schedule owned by the addon: its timer runs count as
+  tasks, and its jobs are cancelled when the addon is stopped
+Everything else is the bot itself (attribute access falls through).
+bot.quotas.stats(): usage + throttle / drop counters per addon.
+"""
+
+from __future__ import annotations
+import asyncio, logging, math, time
+
+from .rate_limit import Limiter
+
+DEFAULT_QUOTA = {"tasks": 50, "task_queue": 200, "http": 4, "chat_share": 0.5, "chat_queue": 20}
+_HTTP_VERBS = ("get", "post", "put", "patch", "delete", "head", "options")
+
+class QuotaExceeded(Exception):
+    """A task an addon started was dropped – its task queue was full."""
+
+class _Usage:
+    __slots__ = ("tasks_live", "tasks_pending", "tasks_started", "tasks_throttled", "tasks_dropped",
+                 "http_live", "http_calls", "http_throttled", "http_wait_s",
+                 "chat_waiting", "chat_sent", "chat_throttled", "chat_dropped")
+
+    def __init__(self):
+        for k in self.__slots__:
+            setattr(self, k, 0)
+
+    def as_dict(self) -> dict:
+        return {**{k: round(getattr(self, k), 3) for k in self.__slots__},
+                "tasks_waiting": self.tasks_pending - self.tasks_live}
+
+class LimitedClient:
+    """httpx.AsyncClient stand-in: the same calls, at most N in flight per addon."""
+
+    def __init__(self, ctx: "AddonContext"):
+        self._ctx = ctx
+
+    async def request(self, method: str, url, **kw):
+        ctx, u = self._ctx, self._ctx.usage
+        if ctx._http_sem.locked():
+            u.http_throttled += 1
+        t0 = time.perf_counter()
+        async with ctx._http_sem:
+            u.http_wait_s += time.perf_counter() - t0
+            u.http_live += 1
+            u.http_calls += 1
+            try:
+                return await (await ctx._client()).request(method, url, **kw)
+            finally:
+                u.http_live -= 1
+
+    def __getattr__(self, verb: str):
+        if verb not in _HTTP_VERBS:
+            raise AttributeError(verb)
+        async def call(url, **kw):
+            return await self.request(verb.upper(), url, **kw)
+        return call
+
+class AddonContext:
+    """The bot as one addon sees it."""
+    _OWN = frozenset(("_bot", "name", "quota", "usage", "pending_tasks", "http",
+                      "_task_sem", "_http_sem", "_chat", "_own_client"))
+
+    def __init__(self, bot, name: str, quota: dict):
+        q = {**DEFAULT_QUOTA, **quota}
+        o = object.__setattr__
+        o(self, "_bot", bot)
+        o(self, "name", name)
+        o(self, "quota", q)
+        o(self, "usage", _Usage())
+        o(self, "pending_tasks", [])
+        o(self, "_task_sem", asyncio.Semaphore(q["tasks"]))
+        o(self, "_http_sem", asyncio.Semaphore(q["http"]))
+        lim = bot.limiter
+        o(self, "_chat", Limiter(max(1, math.ceil(lim.burst * q["chat_share"])), lim.window))
+        o(self, "_own_client", None)
+        o(self, "http", LimitedClient(self))
+
+    def __getattr__(self, attr):
+        return getattr(self._bot, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in self._OWN:
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self._bot, attr, value)
+
+    def _warn(self, what: str, n: int):
+        # first drop, then every 1000th – a flood must not flood the log too
+        if n == 1 or n % 1000 == 0:
+            logging.warning("[quota] %s over its %s quota (%d so far)", self.name, what, n)
+
+    # ── tasks ─────────────────────────────────────────────────────────
+    async def _gated(self, coro):
+        u = self.usage
+        if self._task_sem.locked():
+            u.tasks_throttled += 1
+        await self._task_sem.acquire()
+        u.tasks_live += 1
+        u.tasks_started += 1
+        try:
+            return await coro
+        finally:
+            u.tasks_live -= 1
+            self._task_sem.release()
+
+    def _admit(self, coro) -> bool:
+        u = self.usage
+        if u.tasks_pending - u.tasks_live < self.quota["task_queue"]:
+            return True
+        coro.close()
+        u.tasks_dropped += 1
+        self._warn("task", u.tasks_dropped)
+        return False
+
+    def _start(self, coro, run) -> asyncio.Future:
+        if not self._admit(coro):
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_exception(QuotaExceeded(f"{self.name}: task queue full "
+                                            f"({self.quota['task_queue']} waiting)"))
+            fut.add_done_callback(asyncio.Future.exception)   # already logged by _warn – no "never retrieved"
+            return fut
+        self.usage.tasks_pending += 1
+        task = run(self._gated(coro))
+
+        def done(_):
+            self.usage.tasks_pending -= 1
+            coro.close()                      # no-op unless cancelled before it ran
+        task.add_done_callback(done)
+        return task
+
+    def create_task(self, coro, *, name: str | None = None) -> asyncio.Future:
+        """asyncio.create_task under the task quota (not waited for at shutdown);
+        a dropped one comes back as a future failed with QuotaExceeded."""
+        return self._start(coro, lambda c: asyncio.create_task(c, name=name))
+
+    def track(self, coro, replay=None) -> asyncio.Future:
+        """bot.track under the task quota."""
+        fut = self._start(coro, lambda c: self._bot.track(c, replay))
+        if replay is not None and fut.done():          # dropped before it ever ran
+            logging.error("[quota] %s dropped %s from %s: %r – handle it by hand",
+                          self.name, replay.type, replay.login or "?", replay.text)
+        return fut
+
+    def register(self, name, func, help_text):
+        """bot.register, but the command runs under this addon's quota."""
+        self._bot.register(name, func, help_text, owner=self)
+
+    @property
+    def schedule(self):
+        """bot.schedule for this addon: jobs run under its task quota and go when it stops."""
+        return self._bot.schedule.view(self.name, self.create_task)
+
+    def start_pending(self):
+        tasks, self.pending_tasks[:] = list(self.pending_tasks), []
+        for coro in tasks:
+            self.create_task(coro)
+
+    # ── chat ──────────────────────────────────────────────────────────
+    async def safe_send(self, txt: str, channel: str | None = None):
+        u = self.usage
+        if u.chat_waiting >= self.quota["chat_queue"]:
+            u.chat_dropped += 1
+            self._warn("chat", u.chat_dropped)
+            return
+        if self._chat.eta() > 0:
+            u.chat_throttled += 1
+        u.chat_waiting += 1
+        try:
+            await self._bot.safe_send(txt, channel, pace=self._chat)
+            u.chat_sent += 1
+        finally:
+            u.chat_waiting -= 1
+
+    # ── http ──────────────────────────────────────────────────────────
+    async def _client(self):
+        if self._bot.http is not None:
+            return self._bot.http
+        if self._own_client is None:          # bot run without startup.run_bot
+            import httpx
+            self._own_client = httpx.AsyncClient(timeout=10)
+        return self._own_client
+
+    async def aclose(self):
+        if self._own_client is not None:
+            await self._own_client.aclose()
+            self._own_client = None
+
+    def stats(self) -> dict:
+        return {**self.usage.as_dict(), "quota": self.quota}
+
+class Quotas:
+    """One AddonContext per addon name; quotas from cfg["addon_quota"] + per-addon overrides."""
+
+    def __init__(self, cfg: dict):
+        self.default   = {**DEFAULT_QUOTA, **(cfg.get("addon_quota") or {})}
+        self.overrides = cfg.get("addon_quota_overrides") or {}
+        self.contexts: dict[str, AddonContext] = {}
+
+    def context(self, bot, name: str) -> AddonContext:
+        if name not in self.contexts:
+            self.contexts[name] = AddonContext(bot, name, {**self.default, **self.overrides.get(name, {})})
+        return self.contexts[name]
+
+    def stats(self) -> dict:
+        return {name: ctx.stats() for name, ctx in self.contexts.items()}
+
+    async def aclose(self):
+        for ctx in self.contexts.values():
+            await ctx.aclose()
@@ -1,20 +1,37 @@
 """
 rate_limit.py
 Simple token-bucket limiter: 20 messages / 30 seconds (Twitch default)
+Send times live in a deque pruned from the left – no per-call list rebuild,
+memory bounded by `burst`.
 """
 
 import time, asyncio
+from collections import deque
 
 class Limiter:
     def __init__(self, burst: int = 20, window: int = 30):
         self.burst = burst
         self.window = window
-        self.timestamps: list[float] = []
+        self.timestamps: deque[float] = deque()
+
+    def _prune(self, now: float):
+        ts = self.timestamps
+        while ts and now - ts[0] >= self.window:
+            ts.popleft()
 
     async def wait(self):
-        now = time.time()
-        # prune old stamps
-        self.timestamps = [t for t in self.timestamps if now - t < self.window]
-        if len(self.timestamps) >= self.burst:
+        while True:
+            now = time.time()
+            self._prune(now)
+            if len(self.timestamps) < self.burst:
+                break
+            # re-check after sleeping: concurrent senders may have taken the slot
             await asyncio.sleep(self.window - (now - self.timestamps[0]))
         self.timestamps.append(time.time())
+
+    def eta(self) -> float:
+        """Seconds until wait() would return at once (0 = a slot is free now)."""
+        now = time.time()
+        self._prune(now)
+        ts = self.timestamps
+        return 0.0 if len(ts) < self.burst else self.window - (now - ts[0])
@@ -0,0 +1,360 @@
+"""
+scheduler.py
+One timer driver for the bot and its addons – bot.schedule
+• after(delay, fn)       one-shot
+  every(interval, fn)    fixed rate (phase kept; first run after `first_in`)
+  cron("*/5 * * * *", fn) minute hour day-of-month month day-of-week, local time
+• every job sits in ONE heap served by ONE driver task – no sleeping task
+  per timer; a run is a task only while it is running
+• jitter_s spreads runs (0..jitter_s later); a late driver (blocked loop,
+  suspended machine) coalesces the missed runs into one unless coalesce=False;
+  max_running caps overlapping runs of a job (a run due while the cap is
+  reached is skipped and counted)
+• the same name from the same owner replaces the job; cancel_owner() drops
+  all of an owner's jobs – an addon's (it sees an owner-bound view whose runs
+  count against its task quota) go when it is stopped
+• jobs() / upcoming(): next due time, runs, errors, skips and run durations
+Jobs only fire once start() was called – the bot does that when it goes live,
+so a standby keeps its timers until it takes over.
+"""
+
+from __future__ import annotations
+import asyncio, heapq, inspect, itertools, logging, random, time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+JobFn = Callable[[], Awaitable[Any] | Any]
+
+# ── cron ──────────────────────────────────────────────────────────────
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+_CRON_ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 0",
+                 "@monthly": "0 0 1 * *"}
+
+def parse_cron(expr: str) -> tuple[frozenset, ...]:
+    fields = _CRON_ALIASES.get(expr.strip(), expr).split()
+    if len(fields) != 5:
+        raise ValueError(f"cron needs 5 fields: {expr!r}")
+    out = []
+    for field, (lo, hi) in zip(fields, _CRON_RANGES):
+        vals = set()
+        for part in field.split(","):
+            rng, _, step = part.partition("/")
+            if rng == "*":
+                a, b = lo, hi
+            elif "-" in rng:
+                a, b = map(int, rng.split("-"))
+            else:
+                a = b = int(rng)
+                if step:
+                    b = hi
+            if hi == 6 and b == 7:          # day of week: 7 is Sunday too
+                vals.add(0)
+                a, b = min(a, 6), 6
+                if rng == "7":
+                    continue
+            if not lo <= a <= b <= hi:
+                raise ValueError(f"cron field {part!r} out of range {lo}-{hi}")
+            vals.update(range(a, b + 1, int(step) if step else 1))
+        out.append(frozenset(vals))
+    return tuple(out)
+
+def next_cron(spec: tuple[frozenset, ...], after: float) -> float:
+    """The first matching minute strictly after `after` (a time.time())."""
+    minute, hour, dom, month, dow = spec
+    any_dom, any_dow = len(dom) == 31, len(dow) == 7
+    t = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    end = t + timedelta(days=366 * 5)
+    while t < end:
+        if t.month not in month:
+            t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        d_ok, w_ok = t.day in dom, (t.weekday() + 1) % 7 in dow
+        # cron: when both day fields are restricted, either one matching is enough
+        day_ok = (d_ok or w_ok) if not (any_dom or any_dow) else (d_ok and w_ok)
+        if not day_ok:
+            t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if t.hour not in hour:
+            t = t.replace(minute=0) + timedelta(hours=1)
+            continue
+        if t.minute not in minute:
+            t += timedelta(minutes=1)
+            continue
+        return t.timestamp()
+    raise ValueError("cron expression never matches")
+
+# ── jobs ──────────────────────────────────────────────────────────────
+class Job:
+    __slots__ = ("id", "name", "owner", "fn", "kind", "interval", "cron", "expr", "jitter",
+                 "coalesce", "max_running", "spawn", "base", "due", "running", "runs", "errors",
+                 "skipped", "missed", "last_ms", "total_ms", "max_ms", "last_run", "cancelled")
+
+    def __init__(self, id: int, name: str, owner: str, fn: JobFn, kind: str, *,
+                 interval: float = 0.0, expr: str | None = None, jitter: float = 0.0,
+                 coalesce: bool = True, max_running: int = 1, spawn=None):
+        self.id, self.name, self.owner, self.fn, self.kind = id, name, owner, fn, kind
+        self.interval, self.expr = interval, expr
+        self.cron = parse_cron(expr) if expr else None
+        self.jitter, self.coalesce, self.max_running = jitter, coalesce, max(1, max_running)
+        self.spawn = spawn
+        self.base = self.due = 0.0           # nominal / actual (jittered) due, monotonic
+        self.running = self.runs = self.errors = self.skipped = self.missed = 0
+        self.last_ms: float | None = None
+        self.total_ms = self.max_ms = 0.0
+        self.last_run: float | None = None   # time.time() of the last start
+        self.cancelled = False
+
+    def info(self, now: float) -> dict:
+        d = {"id": self.id, "name": self.name, "owner": self.owner, "kind": self.kind,
+             "due_in_s": None if self.cancelled else round(self.due - now, 3),
+             "running": self.running, "runs": self.runs, "errors": self.errors,
+             "skipped": self.skipped, "missed": self.missed,
+             "last_ms": None if self.last_ms is None else round(self.last_ms, 2),
+             "avg_ms": round(self.total_ms / self.runs, 2) if self.runs else None,
+             "max_ms": round(self.max_ms, 2)}
+        if self.kind == "every":
+            d["every_s"] = self.interval
+        elif self.kind == "cron":
+            d["cron"] = self.expr
+        return d
+
+    def __repr__(self):
+        return f"Job({self.owner}/{self.name}, {self.kind})"
+
+class Scheduler:
+    def __init__(self):
+        self._heap: list[tuple[float, int, Job]] = []
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()        # heap tie-break
+        self._jobs: dict[int, Job] = {}
+        self._named: dict[tuple[str, str], Job] = {}
+        self._views: dict[str, ScheduleView] = {}
+        self._runs: set[asyncio.Future] = set()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.fired = 0
+
+    # ── adding ────────────────────────────────────────────────────────
+    def after(self, delay_s: float, fn: JobFn, *, name: str | None = None, owner: str = "core",
+              spawn=None) -> Job:
+        job = self._new(name, owner, fn, "once", spawn=spawn)
+        return self._add(job, time.monotonic() + max(0.0, delay_s))
+
+    def every(self, interval_s: float, fn: JobFn, *, name: str | None = None, owner: str = "core",
+              first_in: float | None = None, jitter_s: float = 0.0, coalesce: bool = True,
+              max_running: int = 1, spawn=None) -> Job:
+        if interval_s <= 0:
+            raise ValueError("interval must be > 0")
+        job = self._new(name, owner, fn, "every", interval=interval_s, jitter=jitter_s,
+                        coalesce=coalesce, max_running=max_running, spawn=spawn)
+        return self._add(job, time.monotonic() + (interval_s if first_in is None else first_in))
+
+    def cron(self, expr: str, fn: JobFn, *, name: str | None = None, owner: str = "core",
+             jitter_s: float = 0.0, coalesce: bool = True, max_running: int = 1, spawn=None) -> Job:
+        job = self._new(name, owner, fn, "cron", expr=expr, jitter=jitter_s,
+                        coalesce=coalesce, max_running=max_running, spawn=spawn)
+        return self._add(job, self._cron_due(job, time.time()))
+
+    def _new(self, name, owner, fn, kind, **kw) -> Job:
+        jid = next(self._ids)
+        name = name or getattr(fn, "__qualname__", None) or f"job{jid}"
+        old = self._named.get((owner, name))
+        if old is not None:
+            self.cancel(old)
+        return Job(jid, name, owner, fn, kind, **kw)
+
+    def _add(self, job: Job, base: float) -> Job:
+        self._jobs[job.id] = job
+        self._named[(job.owner, job.name)] = job
+        self._push(job, base)
+        return job
+
+    def _push(self, job: Job, base: float):
+        job.base = base
+        job.due = base + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        first = not self._heap or job.due < self._heap[0][0]
+        heapq.heappush(self._heap, (job.due, next(self._seq), job))
+        if first and self._wake is not None:
+            self._wake.set()
+
+    @staticmethod
+    def _cron_due(job: Job, after_wall: float) -> float:
+        return time.monotonic() + (next_cron(job.cron, after_wall) - time.time())
+
+    # ── cancelling ────────────────────────────────────────────────────
+    def cancel(self, job: Job | int) -> bool:
+        job = self._jobs.get(job if isinstance(job, int) else job.id)
+        if job is None:
+            return False
+        job.cancelled = True                 # its heap entry is skipped when it comes up
+        del self._jobs[job.id]
+        if self._named.get((job.owner, job.name)) is job:
+            del self._named[(job.owner, job.name)]
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._jobs):
+            self._heap = [e for e in self._heap if not e[2].cancelled and e[0] == e[2].due]
+            heapq.heapify(self._heap)
+        return True
+
+    def cancel_owner(self, owner: str) -> int:
+        jobs = [j for j in self._jobs.values() if j.owner == owner]
+        for j in jobs:
+            self.cancel(j)
+        if jobs:
+            logging.info("[sched] cancelled %d job(s) of %s", len(jobs), owner)
+        return len(jobs)
+
+    def view(self, owner: str, spawn=None) -> ScheduleView:
+        v = self._views.get(owner)
+        if v is None:
+            v = self._views[owner] = ScheduleView(self, owner, spawn)
+        return v
+
+    # ── driver ────────────────────────────────────────────────────────
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._drive())
+
+    def stop(self):
+        """Stops firing; runs in progress are cancelled."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for fut in list(self._runs):
+            fut.cancel()
+
+    async def _drive(self):
+        loop, wake = asyncio.get_running_loop(), self._wake
+        while True:
+            heap = self._heap
+            while heap and (heap[0][2].cancelled or heap[0][0] != heap[0][2].due):
+                heapq.heappop(heap)          # cancelled, or rescheduled since it was pushed
+            wake.clear()
+            if not heap:
+                await wake.wait()
+                continue
+            delay = heap[0][0] - time.monotonic()
+            if delay > 0:
+                timer = loop.call_later(delay, wake.set)
+                try:
+                    await wake.wait()
+                finally:
+                    timer.cancel()
+                continue
+            _, _, job = heapq.heappop(heap)
+            self._fire(job)
+
+    def _fire(self, job: Job):
+        now = time.monotonic()
+        self.fired += 1
+        if job.kind == "once":
+            self._jobs.pop(job.id, None)
+            if self._named.get((job.owner, job.name)) is job:
+                del self._named[(job.owner, job.name)]
+        elif job.kind == "every":
+            nxt = job.base + job.interval
+            if nxt <= now and job.coalesce:
+                behind = int((now - nxt) // job.interval) + 1
+                job.missed += behind
+                nxt += behind * job.interval
+            self._push(job, nxt)
+        else:
+            wall = time.time()
+            after = wall if job.coalesce else wall - (now - job.base)
+            self._push(job, self._cron_due(job, after))
+        if job.running >= job.max_running:
+            job.skipped += 1
+            return
+        started = t0 = None
+        if job.spawn is None and not inspect.iscoroutinefunction(job.fn):
+            started, t0 = self._call(job)    # plain function: called right here, no task
+            if started is None:
+                return
+        job.running += 1
+        fut = (job.spawn or asyncio.ensure_future)(self._run(job, started, t0))
+        self._runs.add(fut)
+
+        def done(f, job=job):
+            job.running -= 1
+            self._runs.discard(f)
+        fut.add_done_callback(done)
+
+    def _call(self, job: Job):
+        """(awaitable it returned, start) – or (None, start) when the run is already over."""
+        job.last_run = time.time()
+        t0 = time.perf_counter()
+        try:
+            res = job.fn()
+        except Exception as e:
+            self._failed(job, e)
+            res = None
+        if inspect.isawaitable(res):
+            return res, t0
+        self._timed(job, t0)
+        return None, t0
+
+    async def _run(self, job: Job, started=None, t0: float | None = None):
+        if started is None:
+            job.last_run = time.time()
+            t0 = time.perf_counter()
+        try:
+            res = job.fn() if started is None else started
+            if inspect.isawaitable(res):
+                await res
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            self._timed(job, t0)
+
+    @staticmethod
+    def _failed(job: Job, e: Exception):
+        job.errors += 1
+        logging.error("[sched] %s/%s failed: %r", job.owner, job.name, e)
+
+    @staticmethod
+    def _timed(job: Job, t0: float):
+        ms = (time.perf_counter() - t0) * 1000
+        job.runs += 1
+        job.last_ms, job.total_ms = ms, job.total_ms + ms
+        job.max_ms = max(job.max_ms, ms)
+
+    # ── introspection ─────────────────────────────────────────────────
+    def jobs(self, owner: str | None = None) -> list[dict]:
+        now = time.monotonic()
+        return sorted((j.info(now) for j in self._jobs.values() if owner is None or j.owner == owner),
+                      key=lambda d: d["due_in_s"])
+
+    def upcoming(self, n: int = 10) -> list[dict]:
+        return self.jobs()[:n]
+
+    def stats(self) -> dict:
+        return {"jobs": len(self._jobs), "heap": len(self._heap), "running": len(self._runs),
+                "fired": self.fired, "driver": self._task is not None}
+
+class ScheduleView:
+    """bot.schedule as one addon sees it: jobs are owned by the addon and its
+    runs start through `spawn` (the addon's quota-limited create_task)."""
+
+    def __init__(self, sched: Scheduler, owner: str, spawn=None):
+        self._s, self.owner, self._spawn = sched, owner, spawn
+
+    def after(self, delay_s: float, fn: JobFn, **kw) -> Job:
+        return self._s.after(delay_s, fn, owner=self.owner, spawn=self._spawn, **kw)
+
+    def every(self, interval_s: float, fn: JobFn, **kw) -> Job:
+        return self._s.every(interval_s, fn, owner=self.owner, spawn=self._spawn, **kw)
+
+    def cron(self, expr: str, fn: JobFn, **kw) -> Job:
+        return self._s.cron(expr, fn, owner=self.owner, spawn=self._spawn, **kw)
+
+    def cancel(self, job: Job | int) -> bool:
+        j = self._s._jobs.get(job if isinstance(job, int) else job.id)
+        return j is not None and j.owner == self.owner and self._s.cancel(j)
+
+    def cancel_all(self) -> int:
+        return self._s.cancel_owner(self.owner)
+
+    def jobs(self) -> list[dict]:
+        return self._s.jobs(self.owner)
@@ -0,0 +1,85 @@
+"""
+snapshot.py
+Warm state across restarts – bot.snapshots
+• sections register by name: dump() -> JSON-able, load(data)
+  (core: users, history, redemption ids, unsent chat, unfinished
+  redemptions; addons add their own from start())
+• saved once at shutdown, after the drain: one zlib-compressed JSON file
+  (warm_state.snap next to state.db), written atomically
+• read at start; each section goes to its loader the moment it registers
+  (addons register after the core), then the file is deleted – a snapshot
+  is never applied twice. load_file() again later (a standby taking over
+  from a leader that shut down cleanly) hands sections straight to the
+  loaders already registered
+• older than max_age → ignored; a cold start beats stale state
+"""
+
+from __future__ import annotations
+import json, logging, time, zlib
+from pathlib import Path
+from typing import Any, Callable
+
+from .atomic import atomic_write_bytes
+
+VERSION = 1
+
+class Snapshots:
+    def __init__(self, path: str | Path | None, *, max_age: float = 3600.0):
+        self.path     = Path(path) if path else None      # None: in-memory bot, nothing persisted
+        self.max_age  = max_age
+        self.saved_at: float | None = None                # of the snapshot we started from
+        self._dumpers: dict[str, Callable[[], Any]] = {}
+        self._loaders: dict[str, Callable[[Any], None]] = {}
+        self._loaded: dict[str, Any] = {}
+
+    def load_file(self) -> "Snapshots":
+        if self.path is None or not self.path.exists():
+            return self
+        try:
+            data = json.loads(zlib.decompress(self.path.read_bytes()))
+            age = time.time() - data["ts"]
+            if data.get("v") != VERSION or age > self.max_age:
+                logging.info("[snapshot] ignoring %s (version %s, %.0fs old)", self.path.name, data.get("v"), age)
+            else:
+                self._loaded, self.saved_at = data["sections"], data["ts"]
+                logging.info("[snapshot] warm start from %.0fs ago: %s", age, ", ".join(self._loaded) or "empty")
+                for name in [n for n in self._loaded if n in self._loaders]:
+                    self._apply(name, self._loaders[name])
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            logging.error("[snapshot] unreadable, starting cold: %s", e)
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+        return self
+
+    def register(self, name: str, dump: Callable[[], Any], load: Callable[[Any], None] | None = None):
+        """dump() runs at shutdown; load(data) runs now if the last snapshot had this section."""
+        self._dumpers[name] = dump
+        if load is not None:
+            self._loaders[name] = load
+            if name in self._loaded:
+                self._apply(name, load)
+
+    def _apply(self, name: str, load: Callable[[Any], None]):
+        data = self._loaded.pop(name)
+        try:
+            load(data)
+        except Exception as e:
+            logging.error("[snapshot] restoring %s failed: %s", name, e)
+
+    def save(self) -> int:
+        """Dump every section; returns the compressed size in bytes (0 when disabled)."""
+        if self.path is None:
+            return 0
+        sections = {}
+        for name, dump in self._dumpers.items():
+            try:
+                sections[name] = dump()
+            except Exception as e:
+                logging.error("[snapshot] dumping %s failed: %s", name, e)
+        blob = zlib.compress(json.dumps({"v": VERSION, "ts": time.time(), "sections": sections},
+                                        separators=(",", ":")).encode(), 6)
+        atomic_write_bytes(self.path, blob)
+        logging.info("[snapshot] saved %s (%d bytes)", ", ".join(sections), len(blob))
+        return len(blob)
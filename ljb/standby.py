@@ -0,0 +1,183 @@
+"""
+standby.py
+Hot standby on one host – bot.standby
+• leadership is an OS file lock on leader.lock next to state.db (fcntl.flock /
+  msvcrt.locking): the kernel drops it the instant the leader process dies,
+  however it dies – there is no lease to time out
+• the leader stamps a heartbeat into the store (meta "leader") every
+  `heartbeat_s`, journals redemptions it has not finished yet
+  (meta "leader_inflight") and records the chat commands it has started /
+  finished by IRC message id (meta "leader_commands")
+• a second instance finds the lock taken and waits as standby: IRC connected,
+  addons registered, user / chat caches warm – but it never replies, runs
+  commands, starts addons or touches EventSub (LJB checks bot.leading)
+• it retries the lock every `poll_s`; once it has it, LJB.promote() brings up
+  EventSub + subscriptions, starts the addons and backfills: journaled
+  redemptions, and the chat commands it saw that the old leader left in
+  flight or never got to (commands older than the record are never rerun)
+"""
+
+from __future__ import annotations
+import asyncio, logging, os, time
+from collections import OrderedDict
+from pathlib import Path
+
+COMMANDS_KEPT = 200         # finished command ids the leader remembers
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock(fh):
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(fh):
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(fh):
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(fh):
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+class LeaderLock:
+    """Non-blocking exclusive lock on a file, held for the life of the process."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def try_acquire(self) -> bool:
+        if self._fh is not None:
+            return True
+        fh = open(self.path, "a+b")
+        try:
+            _lock(fh)
+        except OSError:
+            fh.close()
+            return False
+        self._fh = fh
+        return True
+
+    def release(self):
+        if self._fh is not None:
+            try:
+                _unlock(self._fh)
+            except OSError:
+                pass
+            self._fh.close()
+            self._fh = None
+
+class Standby:
+    def __init__(self, lock_path: str | Path, meta, *, poll_s: float = 0.5, heartbeat_s: float = 1.0):
+        self.lock        = LeaderLock(lock_path)
+        self.meta        = meta                 # store.meta (shared by both instances)
+        self.poll_s      = poll_s
+        self.heartbeat_s = heartbeat_s
+        self.started_as: str | None = None      # "leader" / "standby"
+        self.promoted_at: float | None = None
+        self.failover_s: float | None = None    # old leader's last heartbeat → we are live
+        self._journal: dict[str, list] = {}
+        self._cmds_inflight: dict[str, float] = {}
+        self._cmds_done: OrderedDict[str, float] = OrderedDict()
+        self._cmds_since: float | None = None     # the record is complete from here on
+        self._hb_task: asyncio.Task | None = None
+
+    @property
+    def leading(self) -> bool:
+        return self.lock.held
+
+    def try_lead(self) -> bool:
+        ok = self.lock.try_acquire()
+        if self.started_as is None:
+            self.started_as = "leader" if ok else "standby"
+        return ok
+
+    async def wait_for_leadership(self):
+        while not self.lock.try_acquire():
+            await asyncio.sleep(self.poll_s)
+
+    # ── leader side ───────────────────────────────────────────────────
+    def start_heartbeat(self):
+        if self._hb_task is None:
+            self._hb_task = asyncio.ensure_future(self._heartbeat())
+
+    async def _heartbeat(self):
+        while True:
+            self.meta.set("leader", {"pid": os.getpid(), "ts": time.time()})
+            await asyncio.sleep(self.heartbeat_s)
+
+    def journal(self, key: str, row: list):
+        self._journal[key] = row
+        self.meta.set("leader_inflight", self._journal)
+
+    def settle(self, key: str):
+        if self._journal.pop(key, None) is not None:
+            self.meta.set("leader_inflight", self._journal)
+
+    def command_started(self, msg_id: str, ts: float):
+        if self._cmds_since is None:
+            self._cmds_since = ts
+        self._cmds_inflight[msg_id] = ts
+        self._save_commands()
+
+    def command_done(self, msg_id: str):
+        ts = self._cmds_inflight.pop(msg_id, None)
+        if ts is None:
+            return
+        self._cmds_done[msg_id] = ts
+        while len(self._cmds_done) > COMMANDS_KEPT:
+            _, old = self._cmds_done.popitem(last=False)
+            # forgotten from here back (+1 s: the standby stamped it on its own receipt)
+            self._cmds_since = max(self._cmds_since, old + 1.0)
+        self._save_commands()
+
+    def _save_commands(self):
+        self.meta.set("leader_commands", {"since": self._cmds_since, "inflight": self._cmds_inflight,
+                                          "done": list(self._cmds_done)})
+
+    # ── standby side ──────────────────────────────────────────────────
+    def last_heartbeat(self) -> float | None:
+        hb = self.meta.get("leader")
+        return hb.get("ts") if isinstance(hb, dict) else None
+
+    def take_journal(self) -> list[list]:
+        """The old leader's unfinished redemptions (cleared – replayed once)."""
+        rows = list((self.meta.get("leader_inflight") or {}).values())
+        self.meta.set("leader_inflight", {})
+        return rows
+
+    def take_commands(self) -> dict:
+        """The old leader's command record: since / inflight {id: ts} / done [id] (cleared)."""
+        rec = self.meta.get("leader_commands")
+        self.meta.set("leader_commands", {})
+        rec = rec if isinstance(rec, dict) else {}
+        return {"since": rec.get("since"), "inflight": rec.get("inflight") or {},
+                "done": set(rec.get("done") or ())}
+
+    def promoted(self, leader_hb: float | None):
+        self.promoted_at = time.time()
+        if leader_hb:
+            self.failover_s = self.promoted_at - leader_hb
+        logging.warning("[standby] now leading%s",
+                        f" – {self.failover_s:.2f}s after the old leader's last heartbeat"
+                        if self.failover_s is not None else "")
+
+    def stop(self):
+        if self._hb_task is not None:
+            self._hb_task.cancel()
+            self._hb_task = None
+        if self.lock.held:
+            self.meta.set("leader", {"pid": os.getpid(), "ts": time.time(), "stopped": True})
+        self.lock.release()
+
+    def stats(self) -> dict:
+        return {"leading": self.leading, "started_as": self.started_as,
+                "promoted_at": self.promoted_at, "failover_s": self.failover_s}
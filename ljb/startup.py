@@ -0,0 +1,97 @@
+"""
+startup.py
+Concurrent async startup pipeline
+  ┌ bot token validate/refresh ─┐
+  ├ addon discovery (thread) ───┼─► LJB() ─► IRC connect + JOIN ──────────┐
+  └ streamer token refresh ─────┴─► Twitch() auth, broadcaster id, EventSub ┴─► addons ─► ready
+Independent steps run side by side over one shared httpx.AsyncClient
+(kept on the bot as bot.http); EventSub comes up while IRC joins.
+Token expiry from those first calls seeds the background rotator (tokens.py).
+PhaseTimer records every phase; the summary is logged and kept on bot.timer.
+"""
+
+from __future__ import annotations
+import asyncio, logging, time
+from pathlib import Path
+from typing import Callable
+
+class PhaseTimer:
+    """Start/end offsets (seconds since t0) for named startup phases."""
+
+    def __init__(self, t0: float | None = None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.phases: dict[str, tuple[float, float]] = {}
+
+    async def time(self, name: str, aw):
+        start = time.perf_counter() - self.t0
+        try:
+            return await aw
+        finally:
+            self.phases[name] = (start, time.perf_counter() - self.t0)
+
+    def mark(self, name: str):
+        now = time.perf_counter() - self.t0
+        self.phases[name] = (now, now)
+
+    @property
+    def time_to_ready(self) -> float | None:
+        return self.phases.get("ready", (None, None))[1]
+
+    def as_ms(self) -> dict:
+        return {k: {"start_ms": round(a * 1e3, 1), "took_ms": round((b - a) * 1e3, 1)}
+                for k, (a, b) in sorted(self.phases.items(), key=lambda kv: kv[1][0])}
+
+    def report(self):
+        parts = ", ".join(f"{k} {(b - a) * 1e3:.0f}ms@{a * 1e3:.0f}"
+                          for k, (a, b) in sorted(self.phases.items(), key=lambda kv: kv[1][0]) if b > a)
+        ttr = self.time_to_ready
+        logging.info("[startup] time-to-ready %s (%s)",
+                     f"{ttr:.2f}s" if ttr is not None else "n/a", parts,
+                     extra={"startup_ms": self.as_ms(),
+                            "time_to_ready_ms": round(ttr * 1e3, 1) if ttr is not None else None})
+
+async def run_bot(cfg: dict, addons_dir: Path, save_cfg: Callable[[dict], None],
+                  core_scopes, *, t0: float | None = None, limiter=None, on_bot=None,
+                  store=None):
+    """Run the whole startup pipeline, then the bot until it is closed."""
+    import httpx
+    from .addon_loader import discover
+    from .bot import LJB
+    from .oauth import ensure_valid_bot_token_async, refresh_streamer_async
+    from .tokens import setup_rotation
+
+    timer = PhaseTimer(t0)
+    cli = httpx.AsyncClient(timeout=10)
+    try:
+        token_t    = asyncio.create_task(timer.time("bot_token", ensure_valid_bot_token_async(cli)))
+        streamer_t = asyncio.create_task(timer.time("streamer_refresh",
+                                                    refresh_streamer_async(cli, cfg, save_cfg)))
+        discover_t = asyncio.create_task(timer.time("addon_discovery",
+                                                    asyncio.to_thread(discover, addons_dir)))
+
+        bot_info = await token_t
+        if not bot_info:
+            for t in (streamer_t, discover_t):
+                t.cancel()
+            raise SystemExit("[fatal] Could not get a valid bot access token after refresh attempt.")
+        mods, dirs, extra = await discover_t
+        scopes = sorted({*core_scopes, *extra}, key=lambda s: s.value)
+
+        bot = LJB(cfg, mods, dirs, scopes, limiter, store)
+        bot.timer, bot.http, bot.bot_info = timer, cli, bot_info
+        if bot_info.get("login") and bot_info.get("user_id"):
+            bot.users.seed(bot_info["login"], bot_info["user_id"])
+        if on_bot:
+            on_bot(bot)
+        timer.mark("irc_connect")
+        irc_t = asyncio.create_task(bot.start())
+
+        streamer_info = await streamer_t
+        setup_rotation(bot, cli, cfg, save_cfg, bot_info, streamer_info).start()
+        bot.start_api()          # Helix + EventSub in parallel with the IRC join
+        try:
+            await irc_t
+        finally:
+            bot.tokens.stop()
+    finally:
+        await cli.aclose()
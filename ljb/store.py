@@ -0,0 +1,294 @@
+"""
+store.py
+Embedded state store (SQLite, WAL mode) – one file, state.db, for
+  • config   – settings the bot writes itself (the OAuth channel);
+               config.json stays the hand-edited settings file
+  • tokens   – bot + streamer OAuth tokens (no more .env / config.json rewrites)
+  • addon.*  – per-addon key/value state via bot.store.addon(name)
+Values are JSON. set() is write-behind: writes landing within `coalesce_s`
+are committed together in ONE transaction; transaction() / flush() commit
+right away. Every commit is atomic – a crash leaves the old or the new
+state, never half a file.
+"""
+
+from __future__ import annotations
+import atexit, json, logging, os, sqlite3, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+_MISSING = object()
+TOKEN_FIELDS = ("streamer_access_token", "streamer_refresh_token")
+RUNTIME_FIELDS = (*TOKEN_FIELDS, "twitch_channel")    # written by the bot (OAuth), not by hand
+
+def _runtime_ns(key: str) -> str:
+    return "tokens" if key in TOKEN_FIELDS else "config"
+
+class Namespace:
+    """Typed key/value view on one namespace of the store."""
+
+    def __init__(self, store: "Store", ns: str):
+        self.store = store
+        self.ns    = ns
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.store.get(self.ns, key, default)
+
+    def get_str(self, key: str, default: str | None = None) -> str | None:
+        v = self.get(key, default)
+        return default if v is None else str(v)
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        try:
+            return int(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        try:
+            return float(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        v = self.get(key, default)
+        if isinstance(v, str):
+            return v.strip().lower() in ("1", "true", "yes", "on")
+        return bool(v)
+
+    def get_dict(self, key: str) -> dict:
+        v = self.get(key)
+        return dict(v) if isinstance(v, dict) else {}
+
+    def set(self, key: str, value: Any):
+        self.store.set(self.ns, key, value)
+
+    def update(self, values: dict):
+        """Set several keys in one atomic commit."""
+        with self.store.transaction() as tx:
+            for k, v in values.items():
+                tx.set(self.ns, k, v)
+
+    def delete(self, key: str):
+        self.store.delete(self.ns, key)
+
+    def items(self) -> dict:
+        return self.store.items(self.ns)
+
+    def clear(self):
+        self.store.clear(self.ns)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+class Store:
+    def __init__(self, path: str | Path = ":memory:", *, coalesce_s: float = 0.25):
+        self.path       = str(path)
+        self.coalesce_s = coalesce_s
+        self._lock      = threading.RLock()
+        self._pending: dict[tuple[str, str], Any] = {}   # (ns, key) -> value | _MISSING (delete)
+        self._timer: threading.Timer | None = None
+        self._hold      = 0          # >0 inside transaction(): stage only
+        self.commits    = 0
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")    # durable at checkpoints; WAL keeps it consistent
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kv ("
+                        " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                        " updated REAL NOT NULL, PRIMARY KEY (ns, key)) WITHOUT ROWID")
+        self.config = Namespace(self, "config")
+        self.tokens = Namespace(self, "tokens")
+        self.meta   = Namespace(self, "meta")
+        atexit.register(self.close)
+
+    # ── reads (pending writes are visible immediately) ────────────────
+    def get(self, ns: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if (ns, key) in self._pending:
+                v = self._pending[(ns, key)]
+                return default if v is _MISSING else v
+            row = self.db.execute("SELECT value FROM kv WHERE ns=? AND key=?", (ns, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def items(self, ns: str) -> dict:
+        with self._lock:
+            out = {k: json.loads(v) for k, v in
+                   self.db.execute("SELECT key, value FROM kv WHERE ns=?", (ns,))}
+            for (n, k), v in self._pending.items():
+                if n != ns:
+                    continue
+                if v is _MISSING:
+                    out.pop(k, None)
+                else:
+                    out[k] = v
+        return out
+
+    def namespaces(self) -> list[str]:
+        with self._lock:
+            self.flush()
+            return [r[0] for r in self.db.execute("SELECT DISTINCT ns FROM kv ORDER BY ns")]
+
+    def addon(self, name: str) -> Namespace:
+        return Namespace(self, f"addon.{name}")
+
+    # ── writes ────────────────────────────────────────────────────────
+    def set(self, ns: str, key: str, value: Any):
+        json.dumps(value)                    # fail at the call site, not in the flush
+        self._stage(ns, key, value)
+
+    def delete(self, ns: str, key: str):
+        self._stage(ns, key, _MISSING)
+
+    def clear(self, ns: str):
+        with self.transaction() as tx:
+            for k in self.items(ns):
+                tx.delete(ns, k)
+
+    def _stage(self, ns: str, key: str, value: Any):
+        with self._lock:
+            self._pending[(ns, key)] = value
+            if self._hold:
+                return
+            if self.coalesce_s <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.coalesce_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Commit every pending write in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            now = time.time()
+            try:
+                self.db.execute("BEGIN IMMEDIATE")
+                for (ns, key), v in batch.items():
+                    if v is _MISSING:
+                        self.db.execute("DELETE FROM kv WHERE ns=? AND key=?", (ns, key))
+                    else:
+                        self.db.execute("INSERT INTO kv (ns, key, value, updated) VALUES (?,?,?,?) "
+                                        "ON CONFLICT(ns, key) DO UPDATE SET value=excluded.value,"
+                                        " updated=excluded.updated",
+                                        (ns, key, json.dumps(v), now))
+                self.db.execute("COMMIT")
+                self.commits += 1
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                batch.update(self._pending)      # keep newer writes on top
+                self._pending = batch
+                raise
+
+    @contextmanager
+    def transaction(self) -> Iterator["Store"]:
+        """Group writes; everything staged inside commits together on exit
+        (or is discarded if the block raises)."""
+        with self._lock:
+            before = dict(self._pending)
+            self._hold += 1
+            try:
+                yield self
+            except BaseException:
+                self._pending = before           # drop everything staged in the block
+                raise
+            finally:
+                self._hold -= 1
+            if not self._hold:
+                self.flush()
+
+    def close(self):
+        with self._lock:
+            if self.db is None:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.error("[store] final flush failed: %s", e)
+            self.db.close()
+            self.db = None
+        atexit.unregister(self.close)
+
+_current: Store | None = None
+
+def open_default(path: str | Path) -> Store:
+    """Open the process-wide store (state.db); later calls return the same one."""
+    global _current
+    if _current is None or _current.db is None:
+        _current = Store(path)
+    return _current
+
+def current() -> Store | None:
+    return _current if _current is not None and _current.db is not None else None
+
+# ── config / tokens glue for twitch_bot.py ────────────────────────────
+def merged_config(store: Store, file_cfg: dict, defaults: dict) -> dict:
+    """
+    Runtime cfg dict: defaults < the runtime-managed keys kept in the store
+    < config.json. A config.json value always wins, null included – except
+    null on a RUNTIME_FIELDS key, which only means "not set by hand".
+    """
+    cfg = dict(defaults)
+    for k in RUNTIME_FIELDS:
+        v = store.get(_runtime_ns(k), k)
+        if v is not None:
+            cfg[k] = v
+    cfg.update({k: v for k, v in file_cfg.items() if v is not None or k not in RUNTIME_FIELDS})
+    return cfg
+
+def save_config(store: Store, cfg: dict):
+    """Persist the runtime-managed keys of a cfg dict (tokens, OAuth channel) in one commit."""
+    with store.transaction() as tx:
+        for k in RUNTIME_FIELDS:
+            if k in cfg:
+                tx.set(_runtime_ns(k), k, cfg[k])
+
+def save_bot_tokens(store: Store, access: str, refresh: str):
+    store.tokens.update({"bot_access_token": access, "bot_refresh_token": refresh})
+    os.environ["BOT_ACCESS_TOKEN"]  = access
+    os.environ["BOT_REFRESH_TOKEN"] = refresh
+
+def load_bot_tokens(store: Store, env_access: str | None, env_refresh: str | None):
+    """
+    Bot tokens: the store holds the rotated ones. A token pasted into .env
+    (e.g. by generate_bot_token.py) differs from the one we last imported
+    and wins over the stored copy.
+    """
+    seed = store.tokens.get("bot_env_seed")
+    if env_access and env_access != seed:
+        store.tokens.update({"bot_access_token": env_access, "bot_refresh_token": env_refresh,
+                             "bot_env_seed": env_access})
+    access = store.tokens.get("bot_access_token")
+    if access:
+        os.environ["BOT_ACCESS_TOKEN"]  = access
+        os.environ["BOT_REFRESH_TOKEN"] = store.tokens.get("bot_refresh_token") or ""
+
+def migrate_legacy(store: Store, cfg_fn: Path, addons_dir: Path):
+    """One-time import of config.json tokens / channel and addons/*/addon_tokens.json."""
+    if store.meta.get("migrated"):
+        return
+    with store.transaction() as tx:
+        if cfg_fn.exists():
+            try:
+                old = json.loads(cfg_fn.read_text())
+            except ValueError as e:
+                logging.error("[store] config.json unreadable, not migrated: %s", e)
+                old = {}
+            for k in RUNTIME_FIELDS:
+                if old.get(k) is not None:
+                    tx.set(_runtime_ns(k), k, old[k])
+        if addons_dir.exists():
+            for f in sorted(addons_dir.glob("*/addon_tokens.json")):
+                try:
+                    tx.set(f"addon.{f.parent.name}", "tokens", json.loads(f.read_text()))
+                except ValueError as e:
+                    logging.error("[store] %s unreadable, not migrated: %s", f, e)
+        tx.set("meta", "migrated", time.time())
+    logging.info("[store] migrated legacy JSON state into %s", store.path)
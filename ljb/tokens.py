@@ -0,0 +1,208 @@
+"""
+tokens.py
+Proactive background rotation of the bot (IRC) and streamer (Helix/EventSub)
+credentials.
+• Credential tracks access/refresh token + expiry (from /validate or the
+  refresh response) and refreshes single-flight: every caller that needs the
+  token while a refresh is running awaits that same refresh.
+• TokenRotator runs one small task per credential that refreshes ahead of
+  expiry, then pushes the new token into the live clients (appliers) and
+  persists it (persist) – one atomic commit to the state store.
+"""
+
+from __future__ import annotations
+import asyncio, logging, time
+from typing import Awaitable, Callable
+
+Applier = Callable[[str, str], "Awaitable[None] | None"]
+
+class Credential:
+    def __init__(self, name: str, access: str, refresh: str, expires_at: float,
+                 refresh_fn: Callable[[str], Awaitable[dict]],
+                 persist: Callable[[str, str], None] | None = None):
+        self.name       = name
+        self.access     = access
+        self.refresh_token = refresh
+        self.expires_at = expires_at
+        self.refresh_fn = refresh_fn
+        self.persist    = persist
+        self.appliers: list[Applier] = []
+        self.refreshes  = 0
+        self.failures   = 0
+        self._inflight: asyncio.Future | None = None
+
+    @property
+    def ttl(self) -> float:
+        return self.expires_at - time.time()
+
+    async def token(self) -> str:
+        """Current access token; waits for a refresh that is already running."""
+        if self._inflight is not None:
+            await asyncio.shield(self._inflight)
+        return self.access
+
+    def update(self, access: str, refresh: str | None, expires_in: float | None):
+        """Record a token obtained elsewhere (e.g. twitchAPI's own auto-refresh)."""
+        self.access = access
+        if refresh:
+            self.refresh_token = refresh
+        self.expires_at = time.time() + (expires_in or 3600)
+
+    async def refresh(self) -> str:
+        """Refresh now – concurrent callers share one refresh."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._do_refresh())
+            self._inflight.add_done_callback(self._refresh_done)
+        return await asyncio.shield(self._inflight)
+
+    def _refresh_done(self, fut: asyncio.Future):
+        # cleared by the refresh itself, not by a caller that may have been cancelled
+        if self._inflight is fut:
+            self._inflight = None
+        if not fut.cancelled():
+            fut.exception()              # callers that awaited it got it; nobody else will
+
+    async def _do_refresh(self) -> str:
+        try:
+            d = await self.refresh_fn(self.refresh_token)
+        except Exception:
+            self.failures += 1
+            raise
+        self.update(d["access_token"], d.get("refresh_token"), d.get("expires_in"))
+        self.refreshes += 1
+        if self.persist:
+            try:
+                self.persist(self.access, self.refresh_token)
+            except Exception as e:
+                logging.error("[tokens] persisting %s failed: %s", self.name, e)
+        for apply in self.appliers:
+            try:
+                res = apply(self.access, self.refresh_token)
+                if asyncio.iscoroutine(res):
+                    await res
+            except Exception as e:
+                logging.error("[tokens] applying new %s token failed: %s", self.name, e)
+        logging.info("[tokens] %s token refreshed; valid for %.0f min", self.name, self.ttl / 60)
+        return self.access
+
+class TokenRotator:
+    """Refresh every credential `lead` seconds (or 10% of its lifetime) before expiry."""
+
+    RETRY = (15, 30, 60, 120, 300)
+    MIN_INTERVAL = 30.0          # never refresh the same credential faster than this
+
+    def __init__(self, lead: float = 600.0):
+        self.lead  = lead
+        self.creds: dict[str, Credential] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def add(self, cred: Credential) -> Credential:
+        self.creds[cred.name] = cred
+        return cred
+
+    def __getitem__(self, name: str) -> Credential:
+        return self.creds[name]
+
+    def get(self, name: str) -> Credential | None:
+        return self.creds.get(name)
+
+    def due_in(self, cred: Credential) -> float:
+        ttl  = cred.ttl
+        lead = min(self.lead, max(60.0, ttl * 0.1))
+        return max(0.0, ttl - lead)
+
+    async def _run(self, cred: Credential):
+        attempt, floor = 0, 0.0
+        while True:
+            await asyncio.sleep(max(floor, self.due_in(cred)) if attempt == 0
+                                else self.RETRY[min(attempt - 1, len(self.RETRY) - 1)])
+            try:
+                await cred.refresh()
+                attempt, floor = 0, self.MIN_INTERVAL
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                attempt += 1
+                logging.error("[tokens] %s refresh failed (attempt %d): %s", cred.name, attempt, e)
+
+    def start(self):
+        for name, cred in self.creds.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._run(cred))
+
+    def stop(self):
+        for t in self._tasks.values():
+            t.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {n: {"ttl_s": round(c.ttl), "refreshes": c.refreshes, "failures": c.failures}
+                for n, c in self.creds.items()}
+
+# ── wiring for LJB ─────────────────────────────────────────────────────
+def _swap_token(obj, attr: str, new: str):
+    """Replace a token attribute, keeping an existing 'oauth:' prefix style."""
+    if obj is None or not hasattr(obj, attr):
+        return
+    old = getattr(obj, attr) or ""
+    setattr(obj, attr, f"oauth:{new}" if str(old).startswith("oauth:") else new)
+
+def setup_rotation(bot, cli, cfg: dict, save_cfg, bot_info: dict | None,
+                   streamer_info: dict | None) -> TokenRotator:
+    """Build the rotator for the bot + streamer tokens and attach it as bot.tokens."""
+    import os
+    from .oauth import refresh_grant_async
+    from .store import save_bot_tokens
+
+    rot = TokenRotator()
+    now = time.time()
+
+    async def refresh(rt: str) -> dict:
+        return await refresh_grant_async(cli, rt)
+
+    # bot / IRC token – lives in the store (seeded from .env)
+    def persist_bot(access: str, refresh_token: str):
+        save_bot_tokens(bot.store, access, refresh_token)
+
+    def apply_irc(access: str, _refresh: str):
+        # twitchio re-sends PASS with these on every reconnect
+        _swap_token(getattr(bot, "_connection", None), "_token", access)
+        _swap_token(getattr(bot, "_http", None), "token", access)
+
+    botc = rot.add(Credential(
+        "bot", os.getenv("BOT_ACCESS_TOKEN", ""), os.getenv("BOT_REFRESH_TOKEN", ""),
+        now + float((bot_info or {}).get("expires_in") or 3600), refresh, persist_bot))
+    botc.appliers.append(apply_irc)
+
+    # streamer token – saved via save_cfg, used by twitchAPI (Helix + EventSub)
+    if cfg.get("streamer_refresh_token"):
+        def persist_streamer(access: str, refresh_token: str):
+            cfg["streamer_access_token"]  = access
+            cfg["streamer_refresh_token"] = refresh_token
+            save_cfg(cfg)
+
+        async def apply_helix(access: str, refresh_token: str):
+            if getattr(bot, "t_api", None) is not None:
+                await bot.t_api.set_user_authentication(access, bot.all_scopes, refresh_token,
+                                                        validate=False)
+
+        sc = rot.add(Credential(
+            "streamer", cfg["streamer_access_token"], cfg["streamer_refresh_token"],
+            now + float((streamer_info or {}).get("expires_in") or 3600), refresh, persist_streamer))
+        sc.appliers.append(apply_helix)
+
+    bot.tokens = rot
+    return rot
+
+def follow_twitchapi_refresh(bot):
+    """Keep our streamer credential in sync when twitchAPI refreshes on its own."""
+    sc = getattr(bot, "tokens", None) and bot.tokens.get("streamer")
+    if sc is None or getattr(bot, "t_api", None) is None:
+        return
+
+    async def on_refresh(access: str, refresh_token: str):
+        sc.update(access, refresh_token, None)
+        if sc.persist:
+            sc.persist(access, refresh_token)
+        logging.info("[tokens] twitchAPI refreshed the streamer token itself")
+    bot.t_api.user_auth_refresh_callback = on_refresh
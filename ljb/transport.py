@@ -0,0 +1,292 @@
+"""
+transport.py
+Outbound chat paths behind LJB.safe_send – bot.chat
+• IrcTransport   – twitchio channel.send, paced by the bot's Limiter;
+  twitchio's own per-channel bucket is kept in step with it
+• HelixTransport – POST /helix/chat/messages over the shared httpx client
+  (bot.http) with the bot token; its own Limiter plus Twitch's
+  Ratelimit-Remaining / Ratelimit-Reset headers (429 → hold until reset).
+  Needs the user:write:chat scope on the bot token (generate_bot_token.py)
+• ChatRouter picks a transport per channel:
+    "irc" / "helix"  preferred path, the other one only on failure
+    "auto"           whichever healthy path can send soonest (pacing ETA and
+                     the sends already queued on it, then latency) – both
+                     budgets in use
+  A path that fails FAIL_LIMIT times in a row is benched with exponential
+  cooldown; auth errors bench it for AUTH_COOLDOWN. A path that is only out
+  of budget (RateLimited) is held until its reset – not a failure – and the
+  message goes on the next path or waits for it. Messages Twitch rejects
+  on content (automod, duplicate, …) are dropped, not retried elsewhere.
+"""
+
+from __future__ import annotations
+import asyncio, logging, os, time
+
+from twitchio import Channel, abcs as tio_abcs
+from twitchio.errors import IRCCooldownError
+
+from . import endpoints
+from .rate_limit import Limiter
+
+FAIL_LIMIT    = 3
+COOLDOWN_MAX  = 300.0
+AUTH_COOLDOWN = 600.0
+
+class TransportError(Exception):
+    """The path failed – try another one."""
+
+class RateLimited(TransportError):
+    """The path works but has no budget left before `until` (epoch seconds)."""
+
+    def __init__(self, msg: str, until: float):
+        super().__init__(msg)
+        self.until = until
+
+class MessageDropped(Exception):
+    """Twitch accepted the call but refused the message itself (no failover)."""
+
+class Transport:
+    name = "?"
+
+    def __init__(self, limiter: Limiter):
+        self.limiter = limiter
+        self.sent = self.failed = self.dropped = self.held = 0
+        self.fails = 0                 # consecutive
+        self.waiting = 0               # sends queued on the limiter / hold
+        self.down_until = 0.0
+        self.hold_until = 0.0          # server-side rate limit reset
+        self.latency_ms: float | None = None   # EWMA of the send call
+        self.last_error: str | None = None
+
+    def ready(self) -> bool:
+        return True
+
+    def available(self) -> bool:
+        return time.time() >= self.down_until and self.ready()
+
+    def eta(self) -> float:
+        return max(self.limiter.eta(), self.hold_until - time.time(), 0.0)
+
+    def backlog_eta(self) -> float:
+        """eta() plus the sends already queued here, at the limiter's pace."""
+        return self.eta() + self.waiting * self.limiter.window / self.limiter.burst
+
+    async def send(self, channel: str, text: str):
+        self.waiting += 1
+        try:
+            await self.limiter.wait()
+            wait = self.hold_until - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+        t0 = time.perf_counter()
+        try:
+            await self._send(channel, text)
+        except MessageDropped as e:
+            self.dropped += 1
+            logging.warning("[chat] %s dropped a message: %s", self.name, e)
+            raise
+        except RateLimited as e:
+            self.held += 1
+            self.hold_until = max(self.hold_until, e.until, time.time() + 0.1)   # a reset already past must not spin
+            raise
+        except TransportError:
+            raise                      # already accounted for by _send
+        except Exception as e:
+            self.fail(e)
+            raise TransportError(f"{self.name}: {e}") from e
+        ms = (time.perf_counter() - t0) * 1000
+        self.latency_ms = ms if self.latency_ms is None else self.latency_ms * 0.8 + ms * 0.2
+        self.sent += 1
+        self.fails = 0
+
+    async def _send(self, channel: str, text: str):
+        raise NotImplementedError
+
+    def fail(self, err: Exception, cooldown: float | None = None):
+        self.failed += 1
+        self.fails += 1
+        self.last_error = str(err)
+        if cooldown is None and self.fails >= FAIL_LIMIT:
+            cooldown = min(COOLDOWN_MAX, 5.0 * 2 ** (self.fails - FAIL_LIMIT))
+        if cooldown:
+            self.down_until = time.time() + cooldown
+            logging.warning("[chat] %s benched for %.0fs: %s", self.name, cooldown, err)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "dropped": self.dropped, "held": self.held,
+                "available": self.available(), "eta_s": round(self.eta(), 2),
+                "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+                "last_error": self.last_error}
+
+class IrcTransport(Transport):
+    name = "irc"
+
+    def __init__(self, bot, limiter: Limiter):
+        super().__init__(limiter)
+        self.bot = bot
+
+    def ready(self) -> bool:
+        conn = getattr(self.bot, "_connection", None)
+        alive = getattr(conn, "is_alive", True) if conn is not None else True
+        return bool(alive and self.bot.connected_channels)
+
+    def _channel(self, channel: str):
+        # not bot.get_channel: twitchio memoises it per name for the whole process,
+        # so once a second client has run it hands back a Channel on a dead socket
+        conn = self.bot._connection
+        joined = list(conn._cache)
+        if not joined:
+            raise ConnectionError("not joined")
+        name = channel.lower() if channel and channel.lower() in joined else joined[0]
+        return Channel(name=name, websocket=conn)
+
+    async def _send(self, channel: str, text: str):
+        ch = self._channel(channel)
+        self._sync_bucket(ch)
+        try:
+            await ch.send(text)
+        except IRCCooldownError as e:
+            raise RateLimited(f"irc: {e}", self._bucket(ch)._reset) from e
+
+    @staticmethod
+    def _bucket(ch):
+        return tio_abcs.limiter.get_bucket(channel=ch.name, method="mod" if ch._bot_is_mod() else "irc")
+
+    def _sync_bucket(self, ch):
+        # twitchio counts sends in its own fixed 30 s window (20, or 100 as mod)
+        # and refuses past it; self.limiter already paces to Twitch's limit, so
+        # the bucket gets the same window and budget (+1: it counts a send
+        # before checking) and only trips if something else sends on the socket
+        b = self._bucket(ch)
+        b.limit = self.limiter.burst + 1
+        if b.reset_time != self.limiter.window:
+            b.reset_time = self.limiter.window
+            b.reset()
+
+class HelixTransport(Transport):
+    name = "helix"
+    SCOPE = "user:write:chat"
+
+    def __init__(self, bot, limiter: Limiter):
+        super().__init__(limiter)
+        self.bot = bot
+        self._cli = None               # own client only when bot.http is not there
+
+    def ready(self) -> bool:
+        scopes = (getattr(self.bot, "bot_info", None) or {}).get("scopes")
+        return self.bot.b_id is not None and (scopes is None or self.SCOPE in scopes)
+
+    async def _token(self) -> str:
+        cred = self.bot.tokens.get("bot") if self.bot.tokens else None
+        return await cred.token() if cred else os.getenv("BOT_ACCESS_TOKEN", "")
+
+    async def _broadcaster_id(self, channel: str) -> str:
+        if not channel or channel.lower() == self.bot.cfg["twitch_channel"].lower():
+            return self.bot.b_id
+        user = await self.bot.users.get(login=channel)
+        if user is None:
+            raise MessageDropped(f"unknown channel {channel!r}")
+        return user.id
+
+    def _sender_id(self) -> str | None:
+        info = getattr(self.bot, "bot_info", None) or {}
+        if info.get("user_id"):
+            return info["user_id"]
+        user = self.bot.users.peek(login=self.bot.bot_nick)
+        return user.id if user else None
+
+    async def _send(self, channel: str, text: str):
+        cli = self.bot.http
+        if cli is None:
+            import httpx
+            cli = self._cli = self._cli or httpx.AsyncClient(timeout=10)
+        sender = self._sender_id()
+        if sender is None:
+            raise RuntimeError("bot user id unknown")
+        r = await cli.post(f"{endpoints.TWITCH_HELIX}/chat/messages",
+                           headers={"Client-Id": os.getenv("CLIENT_ID", ""),
+                                    "Authorization": f"Bearer {await self._token()}"},
+                           json={"broadcaster_id": await self._broadcaster_id(channel),
+                                 "sender_id": sender, "message": text})
+        remaining, reset = r.headers.get("Ratelimit-Remaining"), r.headers.get("Ratelimit-Reset")
+        if reset and remaining == "0":
+            self.hold_until = float(reset)
+        if r.status_code == 429:
+            raise RateLimited("helix: HTTP 429", float(reset) if reset else time.time() + 1.0)
+        if r.status_code in (401, 403):
+            err = TransportError(f"helix: HTTP {r.status_code} (bot token needs {self.SCOPE}?)")
+            self.fail(err, AUTH_COOLDOWN)
+            raise err
+        if r.status_code >= 300:
+            raise RuntimeError(f"HTTP {r.status_code}: {r.text[:200]}")
+        data = (r.json().get("data") or [{}])[0]
+        if not data.get("is_sent", True):
+            reason = data.get("drop_reason") or {}
+            raise MessageDropped(reason.get("message") or reason.get("code") or "not sent")
+
+    async def close(self):
+        if self._cli is not None:
+            await self._cli.aclose()
+            self._cli = None
+
+class ChatRouter:
+    MODES = ("irc", "helix", "auto")
+
+    def __init__(self, transports: list[Transport], mode: str = "irc",
+                 per_channel: dict[str, str] | None = None):
+        self.transports = {t.name: t for t in transports}
+        self.mode = mode if mode in self.MODES else "irc"
+        self.per_channel = {k.lower(): v for k, v in (per_channel or {}).items() if v in self.MODES}
+        self.failovers = 0
+
+    def order(self, channel: str) -> list[Transport]:
+        """Healthy paths in preference order; every path when none is healthy."""
+        mode = self.per_channel.get((channel or "").lower(), self.mode)
+        ts = list(self.transports.values())
+        if mode == "auto":
+            ts.sort(key=lambda t: (t.backlog_eta(), t.latency_ms or 0.0))
+        else:
+            ts.sort(key=lambda t: t.name != mode)
+        return [t for t in ts if t.available()] or ts
+
+    async def send(self, channel: str, text: str) -> str | None:
+        """Send via the best path; returns its name (None if Twitch dropped the message).
+        While some path was only rate limited, go round again – send() waits out its hold."""
+        while True:
+            err: Exception | None = None
+            held = False
+            for t in self.order(channel):
+                try:
+                    await t.send(channel, text)
+                except MessageDropped:
+                    return None
+                except RateLimited as e:
+                    held = True
+                    err = err or e
+                    continue
+                except TransportError as e:
+                    err = e
+                    continue
+                if err is not None and not isinstance(err, RateLimited):
+                    self.failovers += 1
+                    logging.info("[chat] failed over to %s (%s)", t.name, err)
+                return t.name
+            if not held:
+                raise err or RuntimeError("no chat transport")
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "failovers": self.failovers,
+                **{n: t.stats() for n, t in self.transports.items()}}
+
+    async def close(self):
+        for t in self.transports.values():
+            if hasattr(t, "close"):
+                await t.close()
+
+def for_bot(bot) -> ChatRouter:
+    cfg = bot.cfg
+    burst, window = cfg.get("chat_helix_rate") or (20, 30)
+    return ChatRouter([IrcTransport(bot, bot.limiter), HelixTransport(bot, Limiter(burst, window))],
+                      cfg.get("chat_transport", "irc"), cfg.get("chat_transport_channels"))
@@ -1,4 +1,9 @@
 # twitch_bot.py
+"""
+Launch entry point. Importing this module is cheap and side-effect free:
+.env loading, folder creation, logging setup and every heavy dependency
+(twitchio, twitchAPI, httpx, addons) happen inside main().
+"""
 
 from __future__ import annotations
 
@@ -6,42 +11,54 @@ import os
 import sys
 import json
 import asyncio
-import time
 import logging
-import datetime
 import signal
+import time
 from pathlib import Path
 from urllib.parse import quote_plus
 
-import requests
-from twitchio.ext import commands
-from twitchAPI.twitch import Twitch
-from twitchAPI.eventsub.websocket import EventSubWebsocket
-from twitchAPI.type import AuthScope
-from twitchAPI.helper import first
-
-from .oauth import ensure_streamer_tokens, refresh_streamer_sync, ensure_valid_bot_token
-from .rate_limit import Limiter
-from .addon_loader import discover
-
-from dotenv import load_dotenv
+from . import endpoints
+from .log_setup import setup_logging
+from .atomic import atomic_write_text
 
 ROOT   = Path(__file__).resolve().parent.parent
 CFG_FN = ROOT / "config.json"
+STATE  = ROOT / "state.db"       # tokens + addon state (store.py)
 ADDONS = ROOT / "addons"
-ADDONS.mkdir(parents=True, exist_ok=True)
-load_dotenv()
-
-CLIENT_ID        = os.getenv("CLIENT_ID")
-CLIENT_SECRET    = os.getenv("CLIENT_SECRET")
-BOT_ACCESS_TOKEN = os.getenv("BOT_ACCESS_TOKEN")
-BOT_REFRESH_TOKEN = os.getenv("BOT_REFRESH_TOKEN")
 
 DEFAULT = {
     "streamer_access_token":  None,
     "streamer_refresh_token": None,
     "twitch_channel":         None,
-    "bot_nick":               "liljuicerbot"
+    "bot_nick":               "liljuicerbot",
+    "log_format":             "text",   # "text" or "json"
+    "log_max_mb":             10,       # roll over when today's file exceeds this
+    "log_keep_mb":            100,      # total budget for logs/ (archives are gzipped)
+    "log_keep_days":          14,
+    "capture_file":           None,     # e.g. "logs/capture.jsonl" – record traffic for bench/replay.py
+    "chat_history_size":      5000,     # messages kept in memory for addons (bot.history)
+    "chat_log_dir":           None,     # e.g. "logs/chat" – also append chat to segment files
+    "chat_log_segment_mb":    8,
+    "chat_log_keep_segments": 10,
+    "user_cache_size":        5000,     # bot.users directory (LRU bound)
+    "user_cache_ttl_s":       3600,
+    "chat_transport":         "irc",    # "irc", "helix" (Send Chat Message) or "auto" – the other is the fallback
+    "chat_transport_channels": {},      # per-channel override, e.g. {"somechannel": "auto"}
+    "chat_helix_rate":        [20, 30], # Helix sends per window (s); raise if the bot is a mod
+    # per addon: live tasks (+ waiting), concurrent HTTP calls, share of the chat budget (+ waiting)
+    "addon_quota":            {"tasks": 50, "task_queue": 200, "http": 4, "chat_share": 0.5, "chat_queue": 20},
+    "addon_quota_overrides":  {},       # e.g. {"ljb_spotify_request": {"chat_share": 0.8}}
+    "blocked_terms_file":     None,     # e.g. "blocked_terms.txt" – one term per line, checked on every bot message
+    "blocked_terms_mode":     "mask",   # "mask" (***) or "suppress" (don't send the message)
+    "blocked_terms_poll_s":   5,        # how often the term file is checked for changes
+    "eventsub_client":        "twitchapi",  # or "lite": built-in client, decodes only the fields used (eventsub.py)
+    "eventsub_watch_s":       30,       # how often to check for an EventSub session change (reconnect events)
+    "hot_standby":            True,     # a 2nd instance on this host waits as standby and takes over
+    "standby_poll_s":         0.5,      # how often a standby retries the leader lock
+    "shutdown_drain_s":       10,       # Ctrl-C: time for in-flight requests + queued chat to finish
+    "snapshot_max_age_s":     3600,     # warm_state.snap older than this → cold start
+    "snapshot_replay_max_s":  300,      # resend / re-run cut-off chat + redemptions up to this old
+    "import_report":          False     # log per-package import times at startup
 }
 
 def load_cfg() -> dict:
@@ -49,9 +66,17 @@ def load_cfg() -> dict:
         CFG_FN.write_text(json.dumps(DEFAULT, indent=2))
         print(f"Config created at {CFG_FN}. Please fill in twitch_channel & bot_nick.")
         sys.exit(0)
-    cfg = json.loads(CFG_FN.read_text())
-    for k, v in DEFAULT.items():
-        cfg.setdefault(k, v)
+    from .store import open_default, migrate_legacy, merged_config, load_bot_tokens, TOKEN_FIELDS
+    store = open_default(STATE)
+    migrate_legacy(store, CFG_FN, ADDONS)
+    file_cfg = json.loads(CFG_FN.read_text())
+    pasted = {k: file_cfg[k] for k in TOKEN_FIELDS if file_cfg.get(k)}
+    if pasted:
+        # tokens live in state.db now – take them over, keep them out of the hand-edited file
+        store.tokens.update(pasted)
+        atomic_write_text(CFG_FN, json.dumps({**file_cfg, **dict.fromkeys(TOKEN_FIELDS)}, indent=2))
+    cfg = merged_config(store, file_cfg, DEFAULT)
+    load_bot_tokens(store, os.getenv("BOT_ACCESS_TOKEN"), os.getenv("BOT_REFRESH_TOKEN"))
     # Check for required secrets in environment
     missing = []
     for var in ["CLIENT_ID", "CLIENT_SECRET", "BOT_ACCESS_TOKEN", "BOT_REFRESH_TOKEN"]:
@@ -60,162 +85,81 @@ def load_cfg() -> dict:
     if missing:
         print(f"Missing required secret(s) in .env: {', '.join(missing)}. Please fill in and restart.")
         sys.exit(1)
-    # Validate token (with auto-refresh)
-    if not ensure_valid_bot_token():
-        print("[fatal] Could not get a valid bot access token after refresh attempt.")
-        sys.exit(1)
+    # bot token validation (with auto-refresh) runs in the async startup pipeline
     return cfg
 
 def save_cfg(c: dict):
-    CFG_FN.write_text(json.dumps(c, indent=2))
+    from .store import open_default, save_config
+    save_config(open_default(STATE), c)
 
 LOG_DIR = ROOT / "logs"
-LOG_DIR.mkdir(exist_ok=True)
-logfile = LOG_DIR / f"bot_{datetime.date.today()}.txt"
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(logfile, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logging.info("------------- bot starting -------------")
 
-def main():
-    cfg = load_cfg()
-    mods, dirs, extra = discover(ADDONS)
-    core = [
+def configure_logging(cfg: dict):
+    setup_logging(
+        LOG_DIR,
+        json_format=str(cfg.get("log_format", "text")).lower() == "json",
+        max_mb=cfg["log_max_mb"],
+        keep_mb=cfg["log_keep_mb"],
+        keep_days=cfg["log_keep_days"],
+    )
+
+def core_scopes() -> list:
+    from twitchAPI.type import AuthScope
+    return [
         AuthScope.CHAT_READ,
         AuthScope.CHAT_EDIT,
         AuthScope.CHANNEL_READ_REDEMPTIONS
     ]
-    all_scopes = sorted({*core, *extra}, key=lambda s: s.value)
-    scope_str  = quote_plus(" ".join(s.value for s in all_scopes))
-    ensure_streamer_tokens(cfg, scope_str, save_cfg)
-    refresh_streamer_sync(cfg, save_cfg)
-    limiter = Limiter()
 
-    import asyncio
+def main():
+    t0 = time.perf_counter()
+    from dotenv import load_dotenv
+    load_dotenv()
+    endpoints.load_env()
+    ADDONS.mkdir(parents=True, exist_ok=True)
+    cfg = load_cfg()
+    configure_logging(cfg)
+    logging.info("------------- bot starting -------------")
+    tracker = None
+    if cfg.get("import_report"):
+        from .diagnostics import ImportTracker
+        tracker = ImportTracker().start()
+
+    from .startup import run_bot
+    from .store import open_default
+    if not cfg.get("streamer_access_token"):
+        # first run: the browser authorisation needs every addon scope up front
+        from .addon_loader import discover
+        from .oauth import ensure_streamer_tokens
+        _, _, extra = discover(ADDONS)
+        all_scopes = sorted({*core_scopes(), *extra}, key=lambda s: s.value)
+        scope_str  = quote_plus(" ".join(s.value for s in all_scopes))
+        ensure_streamer_tokens(cfg, scope_str, save_cfg)
+
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
+    endpoints.patch_twitchio()
 
-    class LJB(commands.Bot):
-        def __init__(self):
-            token = f"oauth:{os.getenv('BOT_ACCESS_TOKEN')}"
-            super().__init__(
-                token=token,
-                prefix="!",
-                initial_channels=[cfg["twitch_channel"]]
-            )
-            self.bot_nick      = cfg["bot_nick"]
-            self.cmds: dict[str, tuple] = {}
-            self.pending_subs  = []
-            self.pending_tasks = []
-            self.es = None
-            self.b_id = None
-
-        async def safe_send(self, txt: str):
-            await limiter.wait()
-            await self.connected_channels[0].send(txt)
-
-        async def event_ready(self):
-            print(f"Connected as {self.bot_nick} in {cfg['twitch_channel']}")
-            logging.info("IRC ready; requesting channel JOIN")
-
-            async def _ping():
-                try:
-                    await self.connected_channels[0].send("i'm alive!")
-                    logging.info("Successfully sent 'i'm alive!' to chat")
-                except Exception as e:
-                    logging.error("JOIN failed: %s", e)
-            asyncio.create_task(_ping())
-
-            twitch = await Twitch(CLIENT_ID, CLIENT_SECRET)
-            await twitch.set_user_authentication(
-                cfg["streamer_access_token"],
-                all_scopes,
-                cfg["streamer_refresh_token"]
-            )
-            self.t_api = twitch
-            self.b_id = (await first(
-                twitch.get_users(logins=[cfg["twitch_channel"]])
-            )).id
-
-            self.es = EventSubWebsocket(twitch)
-            self.es.start()
-            logging.info("EventSub websocket started")
-
-            for mod, folder in zip(mods, dirs):
-                if hasattr(mod, "register"):
-                    try:
-                        mod.register(self, folder)
-                    except Exception as e:
-                        logging.error("[%s] register %s", mod.__name__, e)
-                if hasattr(mod, "start"):
-                    try:
-                        coro = mod.start(self, folder)
-                        if asyncio.iscoroutine(coro):
-                            asyncio.create_task(coro)
-                    except Exception as e:
-                        logging.error("[%s] start %s", mod.__name__, e)
-            if self.pending_subs:
-                await asyncio.gather(*self.pending_subs)
-            for task in self.pending_tasks:
-                asyncio.create_task(task)
-            async def resub_loop():
-                last = getattr(self.es, "_session_id", None)
-                while True:
-                    await asyncio.sleep(30)
-                    cur = getattr(self.es, "_session_id", None)
-                    if cur and cur != last:
-                        logging.warning("EventSub reconnected (session %s)", cur)
-                        last = cur
-                        for mod, folder in zip(mods, dirs):
-                            if hasattr(mod, "register"):
-                                try:
-                                    mod.register(self, folder)
-                                except Exception as e:
-                                    logging.error("[%s] re-reg %s", mod.__name__, e)
-            asyncio.create_task(resub_loop())
-            self.register("lilhelp", self.cmd_help, "List commands")
-
-        async def event_message(self, msg):
-            if msg.echo or msg.author.name.lower() == self.bot_nick.lower():
-                return
-            if not msg.content.startswith("!"):
-                return
-            cmd, *args = msg.content[1:].split()
-            if (entry := self.cmds.get(cmd.lower())):
-                func, _ = entry
-                try:
-                    await func(msg, args)
-                except Exception as e:
-                    await self.safe_send(f"Error: {e}")
-
-        def register(self, name, func, help_text):
-            self.cmds[name.lower()] = (func, help_text)
-
-        async def cmd_help(self, msg, _):
-            await self.safe_send("Commands: " + ", ".join(sorted(self.cmds)))
-
-    bot = LJB()
-
-    async def _shutdown():
-        print("\n[liljuicerbot] Shutting down …")
-        try:
-            if bot.es:
-                await bot.es.stop()
-            if hasattr(bot, "t_api"):
-                await bot.t_api.close()
-        finally:
-            await bot.close()
+    box = {}
+    def _on_bot(bot):
+        box["bot"] = bot
+        bot.import_tracker = tracker
 
     def _sigint(_sig, _frm):
-        if bot.loop.is_running():
-            asyncio.run_coroutine_threadsafe(_shutdown(), bot.loop)
+        bot = box.get("bot")
+        if bot and loop.is_running():
+            asyncio.run_coroutine_threadsafe(bot.shutdown(), loop)
 
     signal.signal(signal.SIGINT, _sigint)
 
-    bot.run()
+    try:
+        loop.run_until_complete(run_bot(
+            cfg, ADDONS, save_cfg, core_scopes(), t0=t0, on_bot=_on_bot,
+            store=open_default(STATE),
+        ))
+    except SystemExit as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        loop.close()
     print("Good-bye.")
@@ -0,0 +1,260 @@
+"""
+users.py
+User directory for core + addons – bot.users
+• TTL cache bounded by LRU (by login, with an id -> login map)
+• concurrent misses are batched into ONE Helix /users call (≤100 logins/ids)
+  after a short window, single-flight per key; unknown users are cached
+  negatively for a minute
+• seeded for free from IRC tags on every chat message (id, display name,
+  badges → mod / sub / VIP / broadcaster)
+• follower status via Helix /channels/followers, cached per user
+  (needs moderator:read:followers – an addon that uses it lists the scope)
+• stats(): hit ratio, Helix call counts
+• snapshot() / restore(): unexpired entries survive a restart (bot.snapshots)
+"""
+
+from __future__ import annotations
+import asyncio, logging, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable
+
+HELIX_BATCH = 100
+
+class UserInfo:
+    __slots__ = ("id", "login", "display_name", "broadcaster_type", "badges",
+                 "is_mod", "is_sub", "is_vip", "is_broadcaster", "roles_ts", "expires")
+
+    def __init__(self, id: str | None, login: str, display_name: str | None = None):
+        self.id, self.login = id, login
+        self.display_name = display_name or login
+        self.broadcaster_type = None
+        self.badges: dict = {}
+        self.is_mod = self.is_sub = self.is_vip = self.is_broadcaster = False
+        self.roles_ts = 0.0              # when roles were last seen in IRC tags (0 = never)
+        self.expires  = 0.0
+
+    def __repr__(self):
+        return f"UserInfo({self.id!r}, {self.login!r})"
+
+Fetch = Callable[[list[str], list[str]], Awaitable[list]]
+
+class UserDirectory:
+    def __init__(self, fetch: Fetch, *, ttl: float = 3600.0, maxsize: int = 5000,
+                 negative_ttl: float = 60.0, batch_window: float = 0.01,
+                 follower_fetch: Callable[[str], Awaitable[bool]] | None = None):
+        self.fetch          = fetch
+        self.follower_fetch = follower_fetch
+        self.ttl, self.maxsize = ttl, maxsize
+        self.negative_ttl   = negative_ttl
+        self.batch_window   = batch_window
+        self._by_login: OrderedDict[str, UserInfo] = OrderedDict()
+        self._by_id: dict[str, str] = {}
+        self._negative: dict[tuple[str, str], float] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self._queue: list[tuple[str, str]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._followers: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self.hits = self.misses = self.helix_calls = self.helix_users = self.follower_calls = 0
+
+    # ── cache ─────────────────────────────────────────────────────────
+    def _put(self, info: UserInfo, ttl: float | None = None) -> UserInfo:
+        info.expires = time.time() + (self.ttl if ttl is None else ttl)
+        self._by_login[info.login] = info
+        self._by_login.move_to_end(info.login)
+        if info.id:
+            self._by_id[info.id] = info.login
+        while len(self._by_login) > self.maxsize:
+            _, old = self._by_login.popitem(last=False)
+            if old.id and self._by_id.get(old.id) == old.login:
+                del self._by_id[old.id]
+        return info
+
+    def peek(self, login: str | None = None, id: str | None = None) -> UserInfo | None:
+        """Cached entry (even if expired) without touching Helix or the stats."""
+        if login is None and id is not None:
+            login = self._by_id.get(str(id))
+        return self._by_login.get(login.lower()) if login else None
+
+    def _fresh(self, key: tuple[str, str]) -> UserInfo | None:
+        info = self.peek(**{key[0]: key[1]})
+        if info is not None and info.expires > time.time():
+            self._by_login.move_to_end(info.login)
+            return info
+        return None
+
+    def seed(self, login: str, id: str | None = None, display_name: str | None = None) -> UserInfo:
+        login = login.lower()
+        info = self._by_login.get(login) or UserInfo(id, login, display_name)
+        if id:
+            info.id = str(id)
+        if display_name:
+            info.display_name = display_name
+        self._negative.pop(("login", login), None)
+        return self._put(info)
+
+    def observe(self, msg) -> UserInfo:
+        """Update from the IRC tags of a chat message (called for every message)."""
+        a = msg.author
+        uid = getattr(a, "id", None)
+        info = self.seed(a.name, str(uid) if uid else None, getattr(a, "display_name", None))
+        badges = getattr(a, "badges", None) or {}
+        info.badges = dict(badges)
+        info.is_broadcaster = bool(getattr(a, "is_broadcaster", False) or "broadcaster" in badges)
+        info.is_mod = bool(getattr(a, "is_mod", False) or "moderator" in badges) or info.is_broadcaster
+        info.is_sub = bool(getattr(a, "is_subscriber", False) or "subscriber" in badges
+                           or "founder" in badges)
+        info.is_vip = bool(getattr(a, "is_vip", False) or "vip" in badges)
+        info.roles_ts = time.time()
+        return info
+
+    # ── lookups ───────────────────────────────────────────────────────
+    async def get(self, login: str | None = None, id: str | None = None) -> UserInfo | None:
+        if login is not None:
+            res = await self.get_many(logins=[login])
+        elif id is not None:
+            res = await self.get_many(ids=[id])
+        else:
+            raise ValueError("get() needs login or id")
+        return next(iter(res.values()), None)
+
+    async def get_many(self, logins: Iterable[str] = (), ids: Iterable[str] = ()) -> dict[str, UserInfo]:
+        """{login: UserInfo} for every user that exists; cache first, then batched Helix."""
+        out: dict[str, UserInfo] = {}
+        wait = []
+        now = time.time()
+        keys = [("login", l.lower()) for l in logins] + [("id", str(i)) for i in ids]
+        for key in keys:
+            info = self._fresh(key)
+            if info is not None:
+                self.hits += 1
+                out[info.login] = info
+            elif self._negative.get(key, 0) > now:
+                self.hits += 1
+            else:
+                self.misses += 1
+                wait.append(self._want(key))
+        for info in await asyncio.gather(*wait):
+            if info is not None:
+                out[info.login] = info
+        return out
+
+    def _want(self, key: tuple[str, str]) -> asyncio.Future:
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return fut                                  # single-flight
+        loop = asyncio.get_running_loop()
+        fut = self._inflight[key] = loop.create_future()
+        self._queue.append(key)
+        if len(self._queue) >= HELIX_BATCH:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return fut
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        queue, self._queue = self._queue, []
+        for i in range(0, len(queue), HELIX_BATCH):
+            asyncio.ensure_future(self._fetch(queue[i:i + HELIX_BATCH]))
+
+    async def _fetch(self, keys: list[tuple[str, str]]):
+        logins = [v for k, v in keys if k == "login"]
+        ids    = [v for k, v in keys if k == "id"]
+        self.helix_calls += 1
+        try:
+            users = await self.fetch(logins, ids)
+        except Exception as e:
+            logging.error("[users] Helix lookup failed (%d keys): %s", len(keys), e)
+            for key in keys:
+                fut = self._inflight.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_result(None)
+            return
+        self.helix_users += len(users)
+        for u in users:
+            login = u.login.lower()
+            info = self._by_login.get(login) or UserInfo(u.id, login)
+            info.id, info.display_name = str(u.id), u.display_name or login
+            info.broadcaster_type = getattr(u, "broadcaster_type", None)
+            self._put(info)
+        until = time.time() + self.negative_ttl
+        for key in keys:
+            info = self.peek(**{key[0]: key[1]})
+            if info is None:
+                self._negative[key] = until
+            fut = self._inflight.pop(key, None)
+            if fut is not None and not fut.done():
+                fut.set_result(info)
+        if len(self._negative) > self.maxsize:
+            now = time.time()
+            self._negative = {k: t for k, t in self._negative.items() if t > now}
+
+    async def is_follower(self, user_id: str, ttl: float = 600.0) -> bool | None:
+        """True/False, or None when follower lookups are unavailable (scope / API)."""
+        if self.follower_fetch is None:
+            return None
+        hit = self._followers.get(user_id)
+        if hit and hit[1] > time.time():
+            self.hits += 1
+            return hit[0]
+        self.misses += 1
+        self.follower_calls += 1
+        try:
+            res = await self.follower_fetch(user_id)
+        except Exception as e:
+            logging.warning("[users] follower lookup failed: %s", e)
+            return None
+        self._followers[user_id] = (res, time.time() + ttl)
+        while len(self._followers) > self.maxsize:
+            self._followers.popitem(last=False)
+        return res
+
+    # ── warm restart ──────────────────────────────────────────────────
+    def snapshot(self) -> dict:
+        """Unexpired entries as compact rows, LRU order (oldest first)."""
+        now = time.time()
+        return {"users": [[i.login, i.id, i.display_name if i.display_name != i.login else None,
+                           i.broadcaster_type,
+                           i.is_broadcaster | i.is_mod << 1 | i.is_vip << 2 | i.is_sub << 3,
+                           round(i.roles_ts), round(i.expires)]
+                          for i in self._by_login.values() if i.expires > now],
+                "followers": [[uid, v, round(t)] for uid, (v, t) in self._followers.items() if t > now]}
+
+    def restore(self, data: dict):
+        now = time.time()
+        for login, id, display, btype, roles, roles_ts, expires in data.get("users", ()):
+            if expires <= now or login in self._by_login:
+                continue                    # what we learnt since start wins
+            info = UserInfo(id, login, display)
+            info.broadcaster_type = btype
+            info.is_broadcaster, info.is_mod = bool(roles & 1), bool(roles & 2)
+            info.is_vip, info.is_sub = bool(roles & 4), bool(roles & 8)
+            info.roles_ts = roles_ts
+            self._put(info, expires - now)
+        for uid, v, t in data.get("followers", ()):
+            if t > now:
+                self._followers.setdefault(uid, (v, t))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"cached": len(self._by_login), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "helix_calls": self.helix_calls, "helix_users": self.helix_users,
+                "follower_calls": self.follower_calls}
+
+# ── twitchAPI glue for LJB ────────────────────────────────────────────
+def for_bot(bot) -> UserDirectory:
+    async def fetch(logins: list[str], ids: list[str]) -> list:
+        if getattr(bot, "t_api", None) is None:
+            raise RuntimeError("Helix client not ready")
+        return [u async for u in bot.t_api.get_users(logins=logins or None, user_ids=ids or None)]
+
+    async def follower(user_id: str) -> bool:
+        res = await bot.t_api.get_channel_followers(bot.b_id, user_id=user_id, first=1)
+        return bool(res.data)
+
+    return UserDirectory(fetch, follower_fetch=follower,
+                         ttl=bot.cfg.get("user_cache_ttl_s", 3600),
+                         maxsize=bot.cfg.get("user_cache_size", 5000))
@@ -1,25 +1,61 @@
 # update_checker.py
+"""
+update_checker.py
+• Compares versions.json against the local core/addon versions
+• Delta update: manifest.json (written by update_versions_json.py) lists a
+  sha256 + size for every file; only files whose hash differs are fetched
+  (or one addon zip when most of an addon changed), verified, staged, then
+  swapped in with a journal so a failed/interrupted update is rolled back
+• Falls back to the full repository zip when no manifest is published
+"""
 
 import requests
 import zipfile
 import shutil
 import os
+import re
 import sys
+import json
+import time
+import fnmatch
+import hashlib
 import tempfile
+import io
 from pathlib import Path
-import glob
 
-GITHUB_VERSIONS_URL = "https://raw.githubusercontent.com/MickeyRotten/rotbot/refs/heads/main/versions.json"
+GITHUB_RAW_BASE = "https://raw.githubusercontent.com/MickeyRotten/rotbot/refs/heads/main"
+GITHUB_VERSIONS_URL = f"{GITHUB_RAW_BASE}/versions.json"
+GITHUB_MANIFEST_URL = f"{GITHUB_RAW_BASE}/manifest.json"
 GITHUB_ZIP_URL = "https://github.com/MickeyRotten/rotbot/archive/refs/heads/main.zip"
 
 PRESERVE_FILES = [
     ".env",
-    "config.json"
+    "config.json",
+    "state.db",
+    "state.db-wal",
+    "state.db-shm",
+    "song_requests.db",
+    "song_requests.db-wal",
+    "song_requests.db-shm",
+    "warm_state.snap"
 ]
 PRESERVE_PATTERNS = [
     "addons/*/addon_tokens.json",
     "logs/*"
 ]
+# compiled once – matched against "/"-separated relative paths
+_PRESERVE_SET = frozenset(PRESERVE_FILES)
+_PRESERVE_RE = re.compile("|".join(fnmatch.translate(p) for p in PRESERVE_PATTERNS))
+
+def is_preserved(rel_path):
+    rel = Path(rel_path).as_posix()
+    return rel in _PRESERVE_SET or _PRESERVE_RE.match(rel) is not None
+
+INSTALLED_MANIFEST = Path(".installed_manifest.json")   # manifest of the last applied update
+STAGING_DIR = Path(".update_staging")
+BACKUP_DIR  = Path(".update_backup")
+JOURNAL     = BACKUP_DIR / "journal.json"
+ARCHIVE_MIN_FILES = 4      # fetch the addon zip instead once this many of its files changed
 
 def version_tuple(v):
     return tuple(map(int, (v.split("."))))
@@ -65,6 +101,170 @@ def check_and_perform_update(core_version: str, addon_versions: dict):
         print("All core and addon versions are up to date.")
 
 def update_rotbot():
+    """Delta update from manifest.json; full zip when there is no manifest."""
+    try:
+        manifest = fetch_manifest()
+    except Exception as e:
+        print(f"No update manifest available ({e}); downloading the full package.")
+        return update_rotbot_full()
+    stats = update_from_manifest(manifest)
+    print(f"Update installed! {stats['files']} file(s) changed, {stats['removed']} removed, "
+          f"{stats['bytes'] / 1024:.1f} KiB downloaded in {stats['seconds']:.1f}s.")
+    relaunch()
+
+def fetch_manifest(session=None):
+    r = (session or requests).get(GITHUB_MANIFEST_URL, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+# ── delta update ──────────────────────────────────────────────────────
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _all_files(manifest):
+    files = dict(manifest["core"]["files"])
+    for addon in manifest.get("addons", {}).values():
+        files.update(addon["files"])
+    return files
+
+def _differs(rel, entry):
+    path = Path(rel)
+    try:
+        return path.stat().st_size != entry["size"] or file_sha256(path) != entry["sha256"]
+    except OSError:
+        return True
+
+def plan_update(manifest, installed=None):
+    """
+    Returns (changed, removed): manifest entries whose local copy differs, and
+    files from the previously installed manifest that are gone upstream and
+    were not modified locally.
+    """
+    wanted = _all_files(manifest)
+    changed = {rel: e for rel, e in wanted.items() if not is_preserved(rel) and _differs(rel, e)}
+    removed = []
+    for rel, e in _all_files(installed).items() if installed else ():
+        if rel not in wanted and not is_preserved(rel) and Path(rel).exists() and not _differs(rel, e):
+            removed.append(rel)
+    return changed, removed
+
+class IntegrityError(Exception):
+    pass
+
+def _verified(data, entry, what):
+    if len(data) != entry["size"] or hashlib.sha256(data).hexdigest() != entry["sha256"]:
+        raise IntegrityError(f"{what}: size/hash mismatch")
+    return data
+
+def _stage(rel, data):
+    dst = STAGING_DIR / rel
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.write_bytes(data)
+
+def download_changes(manifest, changed, session):
+    """Fetch + verify every changed file into STAGING_DIR. Returns bytes downloaded."""
+    total = 0
+    def get(path, entry):
+        nonlocal total
+        r = session.get(f"{GITHUB_RAW_BASE}/{path}", timeout=60)
+        r.raise_for_status()
+        total += len(r.content)
+        return _verified(r.content, entry, path)
+
+    todo = dict(changed)
+    for name, addon in manifest.get("addons", {}).items():
+        mine = [rel for rel in todo if rel in addon["files"]]
+        archive = addon.get("archive")
+        if not archive or not mine:
+            continue
+        if len(mine) >= ARCHIVE_MIN_FILES or archive["size"] <= sum(todo[r]["size"] for r in mine):
+            data = get(archive["path"], archive)
+            with zipfile.ZipFile(io.BytesIO(data)) as z:
+                for rel in mine:
+                    member = rel[len(f"addons/{name}/"):]
+                    _stage(rel, _verified(z.read(member), todo.pop(rel), rel))
+    for rel, entry in todo.items():
+        _stage(rel, get(rel, entry))
+    return total
+
+def _write_journal(ops):
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = JOURNAL.with_suffix(".tmp")
+    tmp.write_text(json.dumps(ops))
+    os.replace(tmp, JOURNAL)
+
+def rollback():
+    """Undo a partially applied update using the journal in BACKUP_DIR."""
+    if not JOURNAL.exists():
+        return False
+    ops = json.loads(JOURNAL.read_text())
+    for op in reversed(ops):
+        dst, bak = Path(op["path"]), BACKUP_DIR / op["path"]
+        if op["new"] and dst.exists() and not op["had"]:
+            dst.unlink()
+        if op["had"] and bak.exists():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(bak, dst)
+    shutil.rmtree(BACKUP_DIR, ignore_errors=True)
+    print(f"Rolled back {len(ops)} file(s) from an unfinished update.")
+    return True
+
+def apply_staged(changed, removed):
+    """
+    Swap staged files in (os.replace, same filesystem) and delete removed
+    ones. Every original is moved to BACKUP_DIR first and the journal is
+    written before touching anything, so any failure – or a crash – is rolled
+    back to the previous install.
+    """
+    ops = [{"path": rel, "had": Path(rel).exists(), "new": True} for rel in changed]
+    ops += [{"path": rel, "had": True, "new": False} for rel in removed]
+    _write_journal(ops)
+    try:
+        for op in ops:
+            dst = Path(op["path"])
+            if op["had"]:
+                bak = BACKUP_DIR / op["path"]
+                bak.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(dst, bak)
+            if op["new"]:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(STAGING_DIR / op["path"], dst)
+            else:
+                dst.unlink()
+    except BaseException:
+        rollback()
+        raise
+    shutil.rmtree(BACKUP_DIR, ignore_errors=True)
+
+def update_from_manifest(manifest, session=None):
+    t0 = time.perf_counter()
+    session = session or requests.Session()
+    rollback()                                   # leftovers from an interrupted run
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    installed = None
+    if INSTALLED_MANIFEST.exists():
+        try:
+            installed = json.loads(INSTALLED_MANIFEST.read_text())
+        except ValueError:
+            pass
+    changed, removed = plan_update(manifest, installed)
+    try:
+        nbytes = download_changes(manifest, changed, session) if changed else 0
+        apply_staged(changed, removed)
+    finally:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    tmp = INSTALLED_MANIFEST.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, INSTALLED_MANIFEST)
+    return {"files": len(changed), "removed": len(removed), "bytes": nbytes,
+            "seconds": time.perf_counter() - t0}
+
+# ── full package fallback ─────────────────────────────────────────────
+def update_rotbot_full():
     print("Downloading and installing latest version...")
     with tempfile.TemporaryDirectory() as tmpdir:
         zip_path = os.path.join(tmpdir, "main.zip")
@@ -75,39 +275,21 @@ def update_rotbot():
         with zipfile.ZipFile(zip_path, "r") as zip_ref:
             zip_ref.extractall(tmpdir)
         extracted_dir = next(Path(tmpdir).glob("rotbot-*"))
-        preserved = {}
-        for filename in PRESERVE_FILES:
-            file_path = Path(filename)
-            if file_path.exists():
-                preserved[filename] = file_path.read_bytes()
-        for pattern in PRESERVE_PATTERNS:
-            for found in glob.glob(pattern, recursive=True):
-                path = Path(found)
-                preserved[found] = path.read_bytes()
         for root, dirs, files in os.walk(extracted_dir):
             rel_dir = os.path.relpath(root, extracted_dir)
             if rel_dir == ".":
                 rel_dir = ""
             for file in files:
-                src_file = os.path.join(root, file)
-                dst_file = os.path.join(os.getcwd(), rel_dir, file)
-                preserve = False
-                rel_path = os.path.normpath(os.path.join(rel_dir, file))
-                if rel_path in preserved:
-                    preserve = True
-                for pattern in PRESERVE_PATTERNS:
-                    for found in glob.glob(pattern, recursive=True):
-                        if rel_path == os.path.normpath(found):
-                            preserve = True
-                if preserve:
+                rel_path = Path(rel_dir, file).as_posix()
+                if is_preserved(rel_path):
                     continue
+                dst_file = os.path.join(os.getcwd(), rel_dir, file)
                 os.makedirs(os.path.dirname(dst_file), exist_ok=True)
-                shutil.copy2(src_file, dst_file)
-        for filename, content in preserved.items():
-            path = Path(filename)
-            os.makedirs(path.parent, exist_ok=True)
-            path.write_bytes(content)
+                shutil.copy2(os.path.join(root, file), dst_file)
     print("Update installed!")
+    relaunch()
+
+def relaunch():
     try:
         if sys.platform == "win32":
             print("Relaunching launch_bot.bat ...")
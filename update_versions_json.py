@@ -1,8 +1,73 @@
 # update_versions_json.py
+"""
+Writes versions.json (core + addon versions) and manifest.json, the per-file
+content manifest the delta updater (update_checker.py) works from:
+  { "core":   {"version", "files": {path: {"sha256", "size"}}},
+    "addons": {name: {"version", "files": {...}, "archive": {"path", "sha256", "size"}}} }
+Paths are repo-relative with "/" separators. Each addon is also packed into
+dist/addons/<name>.zip (deterministic) so an addon with many changed files is
+one download.
+"""
 
+import hashlib
 import json
+import subprocess
+import zipfile
 from pathlib import Path
 
+MANIFEST_FN = "manifest.json"
+DIST_ADDONS = "dist/addons"
+SKIP_PREFIXES = ("dist/", "bench/results/")
+SKIP_NAMES = {MANIFEST_FN, ".gitignore"}
+
+def file_entry(path: Path) -> dict:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return {"sha256": h.hexdigest(), "size": path.stat().st_size}
+
+def tracked_files(root: Path) -> list[str]:
+    """Files under version control (falls back to a plain walk outside git)."""
+    try:
+        out = subprocess.run(["git", "ls-files", "-z"], cwd=root, capture_output=True, check=True)
+        files = [p for p in out.stdout.decode().split("\0") if p]
+    except (OSError, subprocess.CalledProcessError):
+        files = [p.relative_to(root).as_posix() for p in root.rglob("*")
+                 if p.is_file() and not any(part.startswith(".") or part == "__pycache__"
+                                            for part in p.relative_to(root).parts)]
+    return sorted(p for p in files
+                  if p not in SKIP_NAMES and not p.startswith(SKIP_PREFIXES) and (root / p).is_file())
+
+def build_addon_archive(root: Path, name: str, files: list[str]) -> dict:
+    """Pack one addon (paths relative to its folder) into dist/addons/<name>.zip."""
+    out = root / DIST_ADDONS / f"{name}.zip"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    prefix = f"addons/{name}/"
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        for rel in files:
+            info = zipfile.ZipInfo(rel[len(prefix):], date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            z.writestr(info, (root / rel).read_bytes())
+    return {"path": f"{DIST_ADDONS}/{name}.zip", **file_entry(out)}
+
+def build_manifest(root: Path, versions: dict) -> dict:
+    core, addon_files = {}, {}
+    for rel in tracked_files(root):
+        parts = rel.split("/")
+        if parts[0] == "addons" and len(parts) > 2:
+            addon_files.setdefault(parts[1], {})[rel] = file_entry(root / rel)
+        else:
+            core[rel] = file_entry(root / rel)
+    addons = {}
+    for name, files in sorted(addon_files.items()):
+        addons[name] = {
+            "version": versions["addons"].get(name, "unknown"),
+            "files": files,
+            "archive": build_addon_archive(root, name, sorted(files)),
+        }
+    return {"core": {"version": versions["core"], "files": core}, "addons": addons}
+
 def main():
     root = Path(__file__).parent
     # Read core version
@@ -16,11 +81,6 @@ def main():
             if addon.is_dir():
                 vfile = addon / "version.txt"
                 if vfile.exists():
-                    # Optionally add download_url if needed:
-                    # addons[addon.name] = {
-                    #     "version": vfile.read_text().strip(),
-                    #     "download_url": f"https://github.com/MickeyRotten/rotbot/releases/latest/download/{addon.name}.zip"
-                    # }
                     addons[addon.name] = vfile.read_text().strip()
     versions = {
         "core": core_version,
@@ -30,5 +90,11 @@ def main():
         json.dump(versions, f, indent=2)
     print("versions.json updated!")
 
+    manifest = build_manifest(root, versions)
+    with open(root / MANIFEST_FN, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    n = len(manifest["core"]["files"]) + sum(len(a["files"]) for a in manifest["addons"].values())
+    print(f"{MANIFEST_FN} updated! ({n} files, {len(manifest['addons'])} addon archive(s))")
+
 if __name__ == "__main__":
     main()